@@ -1,63 +1,733 @@
-from typing import List, Optional
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
+import csv
+import io
+import json
+import math
+from typing import Any, AsyncIterator, List, Literal, Optional
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db.session import get_db
-from ..db.crud import event, category, epoch
+from ..core.changes import sse_message
+from ..core.config import settings
+from ..core.layout import (
+    DEFAULT_GAP, DEFAULT_MAX_LANES, MAX_ZOOM, LayoutCache, compute_layout, snap_gap, viewport_payload
+)
+from ..core.http_cache import http_date, if_match_versions, is_not_modified, make_etag, make_version_etag
+from ..core.pagination import (
+    encode_cursor, decode_cursor, encode_search_cursor, decode_search_cursor
+)
+from ..core.serialization import (
+    EventEncoder, JSONBytesResponse, MsgpackResponse, dumps, encoded_response, wants_msgpack
+)
+from ..core.timeline import BINARY_MEDIA_TYPE, build_payload, encode_binary, to_epoch_ms
+from ..db.session import get_db, get_read_db, read_your_writes
+from ..db.crud import VersionConflict, event, category, epoch, get_table_versions
+from ..db import stats
 from ..schemas.event import (
-    Event, EventCreate,
+    Event, EventCreate, EventUpdate, EventUpsertRequest, EventUpsertResult,
+    EventBulkResult, EventHistogram, HistogramBucket,
+    EventChangeList, BatchRequest, EventBatch, CategoryBatch, EpochBatch, EventStats,
     Category, CategoryCreate,
     Epoch, EpochCreate
 )
 
 router = APIRouter()
 
+# Handlers that write pin the client's reads to the primary for a while.
+# Read-only POST endpoints (the batch lookups) must not, or clients that
+# only read would never be served by a replica.
+WRITES = [Depends(read_your_writes)]
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl", "application/ndjson")
+
+EXPORT_COLUMNS = [
+    "id", "title", "description", "date", "location", "importance",
+    "latitude", "longitude", "media_url", "epoch_id", "category_ids",
+    "created_at", "updated_at",
+]
+# Events per chunk written to the socket by the export endpoint
+EXPORT_FLUSH_ROWS = 500
+
+MAX_HISTOGRAM_BUCKETS = 10000
+
+layout_cache = LayoutCache(settings.LAYOUT_CACHE_EVENTS)
+
+
+def _not_modified(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    *,
+    negotiated: bool = False
+) -> Optional[Response]:
+    """Set the validators on ``response``, or return a 304 if the client's copy is current.
+
+    ``negotiated`` endpoints also serve MessagePack, which gets its own ETag.
+    """
+    if negotiated:
+        etag = _negotiated_etag(request, etag)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    if is_not_modified(request, etag, last_modified):
+        if negotiated:
+            headers["Vary"] = "Accept"
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def _negotiated_etag(request: Request, etag: str) -> str:
+    # Keeps the leading version of make_version_etag tags intact for If-Match
+    return f'{etag[:-1]}+msgpack"' if wants_msgpack(request) else etag
+
+
+def _rows_etag(rows) -> str:
+    # Category and epoch rows are immutable, so (id, created_at) identifies their content
+    return make_etag([(row.id, row.created_at) for row in rows])
+
+
+def _event_response(request: Request, response: Response, content: Any) -> Response:
+    """Respond with ``content`` (built by ``EventEncoder``) and the headers set on ``response``.
+
+    JSON, or MessagePack if the client asks for it. Returning a response
+    object skips ``response_model`` validation; the declared models still
+    document the endpoints.
+    """
+    return encoded_response(request, content, dict(response.headers))
+
+
+def _reference_response(request: Request, response: Response, content: Any) -> Any:
+    """Categories and epochs as MessagePack if asked for; else left to ``response_model``."""
+    if wants_msgpack(request):
+        return MsgpackResponse(jsonable_encoder(content), headers={**response.headers, "Vary": "Accept"})
+    response.headers["Vary"] = "Accept"
+    return content
+
+
+def _coordinates(value: Optional[str], name: str, count: int) -> Optional[tuple]:
+    if value is None:
+        return None
+    try:
+        parts = tuple(float(part) for part in value.split(","))
+    except ValueError:
+        parts = ()
+    if len(parts) != count:
+        raise HTTPException(status_code=400, detail=f"{name} must be {count} comma-separated numbers")
+    return parts
+
+
+async def event_filters(
+    category_id: Optional[List[int]] = Query(None),
+    category_match: Literal["any", "all"] = "any",
+    epoch_id: Optional[List[int]] = Query(None),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    near: Optional[str] = Query(None, description="lat,lon; requires radius_km"),
+    radius_km: Optional[float] = Query(None, gt=0, le=20000),
+) -> dict:
+    """Event filters shared by the list, export, timeline, histogram and search endpoints.
+
+    ``category_id`` and ``epoch_id`` may be repeated. Events match any of
+    the given epochs, and any (or with ``category_match=all``, every one)
+    of the given categories. ``bbox`` and ``near``/``radius_km`` select
+    events by coordinates.
+    """
+    bbox_values = _coordinates(bbox, "bbox", 4)
+    if bbox_values is not None:
+        min_lon, min_lat, max_lon, max_lat = bbox_values
+        if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+            raise HTTPException(status_code=400, detail="bbox is out of range")
+    near_values = _coordinates(near, "near", 2)
+    if near_values is not None:
+        if radius_km is None:
+            raise HTTPException(status_code=400, detail="near requires radius_km")
+        if not (-90 <= near_values[0] <= 90 and -180 <= near_values[1] <= 180):
+            raise HTTPException(status_code=400, detail="near is out of range")
+    elif radius_km is not None:
+        raise HTTPException(status_code=400, detail="radius_km requires near")
+    return dict(
+        category_ids=category_id,
+        category_match=category_match,
+        epoch_ids=epoch_id,
+        start_date=start_date,
+        end_date=end_date,
+        bbox=bbox_values,
+        near=near_values,
+        radius_km=radius_km,
+    )
+
+
+def _missing(ids: List[int], items: list) -> List[int]:
+    missing = []
+    for id, item in zip(ids, items):
+        if item is None and id not in missing:
+            missing.append(id)
+    return missing
+
+
+async def _ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a streamed request body into non-empty lines."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
 # Event endpoints
-@router.post("/events/", response_model=Event)
+@router.post("/events/", response_model=Event, dependencies=WRITES)
 async def create_event(
     event_in: EventCreate,
     db: AsyncSession = Depends(get_db)
 ):
-    return await event.create(db=db, obj_in=event_in)
+    try:
+        return await event.create(db=db, obj_in=event_in)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@router.post("/events/upsert", response_model=EventUpsertResult, dependencies=WRITES)
+async def upsert_events(
+    body: EventUpsertRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Create or update up to ``MAX_UPSERT_ROWS`` events by ``external_id``.
+
+    Safe to retry: rows identical to the stored event are counted as
+    ``unchanged`` and not written. A row with ``version`` only applies
+    while the event is still at that version. Rejected rows are reported
+    in ``errors`` by index; 409 if a concurrent write got in between.
+    """
+    try:
+        return await event.upsert_bulk(db, rows=body.events)
+    except VersionConflict as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+@router.post("/events/bulk", response_model=EventBulkResult, dependencies=WRITES)
+async def create_events_bulk(
+    request: Request,
+    chunk_size: int = Query(settings.BULK_CHUNK_SIZE, ge=1, le=50000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create many events from a JSON array or an NDJSON stream.
+
+    NDJSON bodies (``Content-Type: application/x-ndjson``) are consumed as
+    they arrive. Invalid rows are reported in ``errors`` by index and do
+    not abort the rest of the batch.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in NDJSON_MEDIA_TYPES:
+        rows = _ndjson_lines(request.stream())
+    else:
+        try:
+            rows = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    return await event.create_bulk(db, rows=rows, chunk_size=chunk_size)
+
+@router.post("/events/batch", response_model=EventBatch)
+async def read_events_batch(
+    batch: BatchRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Fetch up to ``MAX_BATCH_IDS`` events by id in one round trip.
+
+    ``items`` follows the order of ``ids``, with ``null`` for ids that do
+    not exist; those are also listed in ``missing``.
+    """
+    items = await event.get_many(db, batch.ids)
+    return encoded_response(request, {
+        "items": EventEncoder().events(items),
+        "missing": _missing(batch.ids, items)
+    })
 
 @router.get("/events/", response_model=List[Event])
 async def read_events(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    category_id: Optional[int] = None,
-    epoch_id: Optional[int] = None,
-    start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None,
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = None,
+    filters: dict = Depends(event_filters),
+    db: AsyncSession = Depends(get_read_db)
 ):
+    """List events ordered by ``(date, id)``.
+
+    Pass the ``X-Next-Cursor`` header of a response back as ``cursor`` to
+    fetch the following page; ``skip`` is ignored in cursor mode.
+    See ``event_filters`` for the filter parameters.
+
+    Answers conditional requests with 304 based on the table write
+    counters, before running the list query.
+    """
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    versions, last_modified = await get_table_versions(db, "events", "categories", "epochs")
+    etag = make_etag(versions, sorted(request.query_params.multi_items()))
+    not_modified = _not_modified(request, response, etag, last_modified, negotiated=True)
+    if not_modified is not None:
+        return not_modified
+
+    # Fetch one extra row to find out whether another page exists
     events = await event.get_multi(
         db,
         skip=skip,
-        limit=limit,
-        category_id=category_id,
-        epoch_id=epoch_id,
+        limit=limit + 1,
+        **filters,
+        after=after
+    )
+    page = events[:limit]
+    if len(events) > limit and page:
+        response.headers["X-Next-Cursor"] = encode_cursor(page[-1].date, page[-1].id)
+    return _event_response(request, response, EventEncoder().events(page))
+
+@router.delete("/events/", dependencies=WRITES)
+async def delete_events(
+    before: Optional[datetime] = None,
+    filters: dict = Depends(event_filters),
+    db: AsyncSession = Depends(get_db)
+):
+    """Delete every event matching the filters, e.g. ``?epoch_id=3&before=1900-01-01``.
+
+    Takes the ``event_filters`` plus ``before`` (exclusive) and refuses to
+    run without any of them. The events, their category links, change log
+    entries and statistics are handled by a fixed number of statements in
+    one transaction, however many events match.
+    """
+    constrained = before is not None or any(
+        filters[key] for key in ("category_ids", "epoch_ids", "start_date", "end_date", "bbox", "near")
+    )
+    if not constrained:
+        raise HTTPException(status_code=400, detail="Give at least one filter or before")
+    deleted = await event.delete_where(db, before=before, **filters)
+    return {"status": "success", "deleted": deleted}
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def _export_ndjson(rows: AsyncIterator[dict]) -> AsyncIterator[str]:
+    lines = []
+    async for row in rows:
+        lines.append(json.dumps({key: _export_value(row[key]) for key in EXPORT_COLUMNS}))
+        if len(lines) >= EXPORT_FLUSH_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+async def _export_csv(rows: AsyncIterator[dict]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    async for row in rows:
+        row["category_ids"] = ";".join(str(c) for c in row["category_ids"])
+        writer.writerow([_export_value(row[key]) for key in EXPORT_COLUMNS])
+        count += 1
+        if count % EXPORT_FLUSH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+@router.get("/events/export")
+async def export_events(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    filters: dict = Depends(event_filters),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Stream every matching event as NDJSON or CSV, ordered by ``(date, id)``.
+
+    Takes the same filters as ``GET /events/``. Rows are written as they
+    are read from the database instead of being collected first.
+    """
+    rows = event.stream_rows(
+        db,
+        **filters
+    )
+    if format == "csv":
+        body, media_type = _export_csv(rows), "text/csv"
+    else:
+        body, media_type = _export_ndjson(rows), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="events.{format}"'}
+    )
+
+@router.get("/events/timeline")
+async def read_timeline(
+    request: Request,
+    response: Response,
+    format: Optional[Literal["json", "binary"]] = None,
+    filters: dict = Depends(event_filters),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Column-oriented event positions for rendering the timeline.
+
+    Returns parallel arrays (ids, epoch-millisecond dates, importance,
+    epoch ids and CSR-encoded category ids) plus the referenced epochs and
+    categories once each. Send ``format=binary`` or
+    ``Accept: application/octet-stream`` for packed little-endian arrays
+    (see ``core.timeline.encode_binary``). Filters match ``GET /events/``.
+    """
+    if format is None:
+        accept = request.headers.get("accept", "")
+        format = "binary" if BINARY_MEDIA_TYPE in accept else "json"
+
+    versions, last_modified = await get_table_versions(db, "events", "categories", "epochs")
+    etag = make_etag("timeline", format, versions, sorted(request.query_params.multi_items()))
+    not_modified = _not_modified(request, response, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    columns = await event.get_columns(
+        db,
+        **filters
+    )
+    payload = build_payload(
+        columns,
+        epochs=await epoch.get_all(db),
+        categories=await category.get_all(db)
+    )
+    if format == "binary":
+        content, media_type = encode_binary(payload), BINARY_MEDIA_TYPE
+    else:
+        content, media_type = json.dumps(payload, separators=(",", ":")), "application/json"
+    headers = {**response.headers, "Vary": "Accept"}
+    return Response(content=content, media_type=media_type, headers=headers)
+
+@router.get("/events/layout")
+async def read_layout(
+    request: Request,
+    response: Response,
+    zoom: int = Query(0, ge=0, le=MAX_ZOOM),
+    gap: float = Query(DEFAULT_GAP, gt=0, le=1000),
+    max_lanes: int = Query(DEFAULT_MAX_LANES, ge=1, le=1024),
+    filters: dict = Depends(event_filters),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Precomputed 3D timeline positions of the events in a viewport.
+
+    ``x`` is proportional to the date, ``ms_per_unit`` milliseconds per
+    scene unit (one century at ``zoom=0``, halved by every zoom level),
+    counted from 1970-01-01. Events closer than ``gap`` units are spread
+    over lanes in the y/z plane (see ``core.layout``); ``gap`` is snapped
+    to the nearest power of two, which the response reports. ``start_date``
+    and ``end_date`` select the viewport; the layout itself covers every
+    event matching the other filters and is cached by filters, zoom and
+    data version, so panning reuses it and positions stay put.
+    """
+    start_date = filters.pop("start_date")
+    end_date = filters.pop("end_date")
+    gap = snap_gap(gap)
+
+    versions, last_modified = await get_table_versions(db, "events")
+    etag = make_etag("layout", versions, sorted(request.query_params.multi_items()))
+    not_modified = _not_modified(request, response, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    key = (
+        tuple(sorted(
+            (name, tuple(sorted(value)) if isinstance(value, list) else value)
+            for name, value in filters.items()
+        )),
+        zoom, gap, max_lanes, versions,
+    )
+    layout = layout_cache.get(key)
+    if layout is None:
+        ids, dates = await event.get_dates(db, **filters)
+        layout = compute_layout(ids, dates, zoom, gap, max_lanes)
+        layout_cache.put(key, layout)
+
+    payload = viewport_payload(
+        layout,
+        to_epoch_ms(start_date) if start_date is not None else None,
+        to_epoch_ms(end_date) if end_date is not None else None,
+    )
+    return JSONBytesResponse(dumps(payload), headers=dict(response.headers))
+
+@router.get("/events/histogram", response_model=EventHistogram)
+async def read_histogram(
+    request: Request,
+    response: Response,
+    buckets: Optional[int] = Query(None, ge=1, le=MAX_HISTOGRAM_BUCKETS),
+    bucket_seconds: Optional[float] = Query(None, gt=0),
+    top_k: int = Query(3, ge=0, le=50),
+    filters: dict = Depends(event_filters),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Event counts per time bucket for zoomed-out views.
+
+    Split ``[start_date, end_date]`` into ``buckets`` equal buckets (100 by
+    default) or buckets of ``bucket_seconds``; missing bounds default to
+    the filtered events' date range. Each bucket reports its event count,
+    highest importance and the ids of its ``top_k`` most important events.
+    Filters match ``GET /events/``.
+    """
+    start_date = filters.pop("start_date")
+    end_date = filters.pop("end_date")
+
+    versions, last_modified = await get_table_versions(db, "events", "categories", "epochs")
+    etag = make_etag("histogram", versions, sorted(request.query_params.multi_items()))
+    not_modified = _not_modified(request, response, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    if start_date is None or end_date is None:
+        first, last = await event.get_date_range(
+            db, start_date=start_date, end_date=end_date, **filters
+        )
+        if first is None:
+            return EventHistogram(start_date=start_date, end_date=end_date)
+        start_date = start_date or first
+        end_date = end_date or last
+
+    span = (end_date - start_date).total_seconds()
+    if span < 0:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if bucket_seconds is not None:
+        count = max(1, math.ceil(span / bucket_seconds))
+        if count > MAX_HISTOGRAM_BUCKETS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"bucket_seconds yields more than {MAX_HISTOGRAM_BUCKETS} buckets"
+            )
+    elif span > 0:
+        count = buckets or 100
+        bucket_seconds = span / count
+    else:
+        # Every event on one date: a single [start, end] bucket holds them all
+        count = 1
+        bucket_seconds = 1.0
+
+    found = await event.get_histogram(
+        db,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        bucket_seconds=bucket_seconds,
+        bucket_count=count,
+        top_k=top_k,
+        **filters
+    )
+    width = timedelta(seconds=bucket_seconds)
+    return EventHistogram(
+        start_date=start_date,
+        end_date=end_date,
+        bucket_seconds=bucket_seconds,
+        buckets=[
+            HistogramBucket(
+                start=start_date + width * i,
+                end=min(start_date + width * (i + 1), end_date),
+                **found.get(i, {})
+            )
+            for i in range(count)
+        ]
+    )
+
+@router.get("/events/search", response_model=List[Event])
+async def search_events(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    filters: dict = Depends(event_filters),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Full-text search over event titles, descriptions and locations.
+
+    Results are ranked best match first and every word of ``q`` must
+    match. Paginate with the ``X-Next-Cursor`` header as for
+    ``GET /events/``; filters match it too.
+    """
+    after = None
+    if cursor:
+        try:
+            after = decode_search_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Fetch one extra row to find out whether another page exists
+    found = await event.search(
+        db,
+        q=q,
+        limit=limit + 1,
+        after=after,
+        **filters
+    )
+    page = found[:limit]
+    if len(found) > limit:
+        last, score = page[-1]
+        response.headers["X-Next-Cursor"] = encode_search_cursor(score, last.id)
+    return _event_response(request, response, EventEncoder().events(db_event for db_event, _ in page))
+
+@router.get("/events/changes", response_model=EventChangeList)
+async def read_event_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Event creations and deletions logged after sequence number ``since``.
+
+    Lets a client catch up on what it missed, e.g. after the live stream
+    told it to ``reset``.
+    """
+    changes = await event.get_changes(db, since=since, limit=limit + 1)
+    page = changes[:limit]
+    return EventChangeList(
+        changes=page,
+        last_seq=page[-1]["seq"] if page else since,
+        more=len(changes) > limit
+    )
+
+def _reset_message(since: int) -> str:
+    return f"event: reset\ndata: {json.dumps({'since': since})}\n\n"
+
+
+async def _reset_stream(since: int) -> AsyncIterator[str]:
+    yield _reset_message(since)
+
+
+async def _change_stream(subscription, backlog: List[dict], since: int) -> AsyncIterator[str]:
+    # Sequence number of the last change sent; everything up to it reached the client
+    last_seq = since
+    try:
+        for change in backlog:
+            yield sse_message(change, json.dumps(change))
+            last_seq = change["seq"]
+        while True:
+            change = await subscription.get(timeout=settings.CHANGE_FEED_HEARTBEAT)
+            if change is None:
+                if subscription.overflowed:
+                    yield _reset_message(last_seq)
+                    return
+                yield ": keep-alive\n\n"
+            elif change["seq"] > last_seq:
+                yield sse_message(change, json.dumps(change))
+                last_seq = change["seq"]
+    finally:
+        event.feed.unsubscribe(subscription)
+
+@router.get("/events/stream")
+async def stream_event_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+    # The backlog must reach the live feed, which follows the primary's commits
+    db: AsyncSession = Depends(get_db)
+):
+    """Live feed of event creations, updates and deletions as Server-Sent Events.
+
+    Every message carries the change's sequence number as its ``id``.
+    Reconnecting with ``since=`` (or the ``Last-Event-ID`` header sent by
+    ``EventSource``) first replays the changes logged after it. A client
+    that falls too far behind, live or on replay, gets a ``reset`` event
+    and should catch up through ``GET /events/changes`` before
+    reconnecting.
+    """
+    if since is None:
+        last_event_id = request.headers.get("last-event-id", "")
+        since = int(last_event_id) if last_event_id.isdigit() else None
+
+    # Subscribe before reading the backlog so that nothing falls in between;
+    # duplicates are skipped by sequence number
+    subscription = event.feed.subscribe()
+    limit = settings.CHANGE_FEED_QUEUE_SIZE
+    backlog = []
+    if since is not None:
+        backlog = await event.get_changes(db, since=since, limit=limit + 1)
+    if len(backlog) > limit:
+        # Too far behind: send nothing, not even live changes queued
+        # meanwhile, so that the client resumes from its own position
+        event.feed.unsubscribe(subscription)
+        stream = _reset_stream(since)
+    else:
+        stream = _change_stream(subscription, backlog, since or 0)
+    # Release the connection: the stream itself never touches the database
+    await db.close()
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    return events
 
 @router.get("/events/{event_id}", response_model=Event)
-async def read_event(event_id: int, db: AsyncSession = Depends(get_db)):
+async def read_event(
+    event_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
+):
+    validator = await event.get_validator(db, event_id)
+    if validator is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    parts, last_modified = validator
+    not_modified = _not_modified(request, response, make_version_etag(*parts), last_modified, negotiated=True)
+    if not_modified is not None:
+        return not_modified
+
     db_event = await event.get(db=db, id=event_id)
     if db_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
-    return db_event
+    return _event_response(request, response, EventEncoder().event(db_event))
+
+@router.patch("/events/{event_id}", response_model=Event, dependencies=WRITES)
+async def update_event(
+    event_id: int,
+    event_in: EventUpdate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    """Change the given fields of an event.
+
+    Send the event's ``ETag`` as ``If-Match`` to update only if nobody
+    changed it since (412 otherwise); the check and the write are one
+    conditional ``UPDATE``. The response carries the new ``ETag``.
+    """
+    try:
+        db_event = await event.update(db, id=event_id, obj_in=event_in, versions=if_match_versions(request))
+    except VersionConflict as exc:
+        raise HTTPException(status_code=412, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if db_event is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    parts, _ = await event.get_validator(db, event_id)
+    response.headers["ETag"] = _negotiated_etag(request, make_version_etag(*parts))
+    return _event_response(request, response, EventEncoder().event(db_event))
 
-@router.delete("/events/{event_id}")
+@router.delete("/events/{event_id}", dependencies=WRITES)
 async def delete_event(event_id: int, db: AsyncSession = Depends(get_db)):
     deleted = await event.delete(db=db, id=event_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Event not found")
     return {"status": "success"}
 
+# Category and epoch endpoints read through the reference caches on the
+# primary: a cache filled from a lagging replica would keep stale rows
+
 # Category endpoints
-@router.post("/categories/", response_model=Category)
+@router.post("/categories/", response_model=Category, dependencies=WRITES)
 async def create_category(
     category_in: CategoryCreate,
     db: AsyncSession = Depends(get_db)
@@ -70,23 +740,59 @@ async def create_category(
         )
     return await category.create(db=db, obj_in=category_in)
 
+@router.post("/categories/batch", response_model=CategoryBatch)
+async def read_categories_batch(
+    batch: BatchRequest,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    items = await category.get_many(db, batch.ids)
+    return _reference_response(request, response, {"items": items, "missing": _missing(batch.ids, items)})
+
 @router.get("/categories/", response_model=List[Category])
 async def read_categories(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     db: AsyncSession = Depends(get_db)
 ):
     categories = await category.get_multi(db, skip=skip, limit=limit)
-    return categories
+    not_modified = _not_modified(request, response, _rows_etag(categories), negotiated=True)
+    if not_modified is not None:
+        return not_modified
+    return _reference_response(request, response, categories)
+
+@router.get("/categories/stats", response_model=List[EventStats])
+async def read_category_stats(db: AsyncSession = Depends(get_db)):
+    """Event count, date range and importance distribution of every category.
+
+    Read from the maintained ``event_stats`` rows, not aggregated per request.
+    """
+    categories = await category.get_all(db)
+    stored = await stats.get_stats(db, stats.CATEGORY)
+    return [
+        EventStats(id=c.id, **stored.get(c.id) or stats.empty_stats())
+        for c in categories
+    ]
 
 @router.get("/categories/{category_id}", response_model=Category)
-async def read_category(category_id: int, db: AsyncSession = Depends(get_db)):
+async def read_category(
+    category_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
     db_category = await category.get(db=db, id=category_id)
     if db_category is None:
         raise HTTPException(status_code=404, detail="Category not found")
-    return db_category
+    not_modified = _not_modified(request, response, _rows_etag([db_category]), negotiated=True)
+    if not_modified is not None:
+        return not_modified
+    return _reference_response(request, response, db_category)
 
-@router.delete("/categories/{category_id}")
+@router.delete("/categories/{category_id}", dependencies=WRITES)
 async def delete_category(category_id: int, db: AsyncSession = Depends(get_db)):
     deleted = await category.delete(db=db, id=category_id)
     if not deleted:
@@ -94,7 +800,7 @@ async def delete_category(category_id: int, db: AsyncSession = Depends(get_db)):
     return {"status": "success"}
 
 # Epoch endpoints
-@router.post("/epochs/", response_model=Epoch)
+@router.post("/epochs/", response_model=Epoch, dependencies=WRITES)
 async def create_epoch(
     epoch_in: EpochCreate,
     db: AsyncSession = Depends(get_db)
@@ -107,25 +813,60 @@ async def create_epoch(
         )
     return await epoch.create(db=db, obj_in=epoch_in)
 
+@router.post("/epochs/batch", response_model=EpochBatch)
+async def read_epochs_batch(
+    batch: BatchRequest,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    items = await epoch.get_many(db, batch.ids)
+    return _reference_response(request, response, {"items": items, "missing": _missing(batch.ids, items)})
+
 @router.get("/epochs/", response_model=List[Epoch])
 async def read_epochs(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     db: AsyncSession = Depends(get_db)
 ):
     epochs = await epoch.get_multi(db, skip=skip, limit=limit)
-    return epochs
+    not_modified = _not_modified(request, response, _rows_etag(epochs), negotiated=True)
+    if not_modified is not None:
+        return not_modified
+    return _reference_response(request, response, epochs)
 
 @router.get("/epochs/{epoch_id}", response_model=Epoch)
-async def read_epoch(epoch_id: int, db: AsyncSession = Depends(get_db)):
+async def read_epoch(
+    epoch_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
     db_epoch = await epoch.get(db=db, id=epoch_id)
     if db_epoch is None:
         raise HTTPException(status_code=404, detail="Epoch not found")
-    return db_epoch
+    not_modified = _not_modified(request, response, _rows_etag([db_epoch]), negotiated=True)
+    if not_modified is not None:
+        return not_modified
+    return _reference_response(request, response, db_epoch)
 
-@router.delete("/epochs/{epoch_id}")
-async def delete_epoch(epoch_id: int, db: AsyncSession = Depends(get_db)):
-    deleted = await epoch.delete(db=db, id=epoch_id)
-    if not deleted:
+@router.get("/epochs/{epoch_id}/stats", response_model=EventStats)
+async def read_epoch_stats(epoch_id: int, db: AsyncSession = Depends(get_db)):
+    """Event count, date range and importance distribution of one epoch."""
+    if await epoch.get(db=db, id=epoch_id) is None:
         raise HTTPException(status_code=404, detail="Epoch not found")
-    return {"status": "success"}
+    stored = await stats.get_stats(db, stats.EPOCH, [epoch_id])
+    return EventStats(id=epoch_id, **stored.get(epoch_id) or stats.empty_stats())
+
+@router.delete("/epochs/{epoch_id}", dependencies=WRITES)
+async def delete_epoch(epoch_id: int, cascade: bool = False, db: AsyncSession = Depends(get_db)):
+    """Delete an epoch; one that still has events needs ``cascade=true``, which deletes them too."""
+    try:
+        deleted_events = await epoch.delete(db=db, id=epoch_id, cascade=cascade)
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=f"{exc}; pass cascade=true to delete them")
+    if deleted_events is None:
+        raise HTTPException(status_code=404, detail="Epoch not found")
+    return {"status": "success", "deleted_events": deleted_events}
@@ -1,40 +1,16 @@
-from fastapi import FastAPI
-from starlette.middleware.cors import CORSMiddleware
-from app.core.config import settings
-from app.api import events
-
-# Support both package-relative imports (production) and absolute imports
-# when tests run with PYTHONPATH pointing to backend/app.
-try:
-    from .core.config import settings
-    from .api import events
-except Exception:
-    # Fallback to absolute imports when module is loaded as top-level
-    from core.config import settings  # type: ignore
-    from api import events  # type: ignore
-
-
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
-)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.include_router(events.router, prefix=settings.API_V1_STR)
-
-
-@app.get("/", tags=["meta"])
-async def root():
-    return {"project": settings.PROJECT_NAME, "api": settings.API_V1_STR}
-
-
-@app.get("/health", tags=["meta"])
-async def health():
-    return {"status": "ok"}
+"""``app`` for ASGI servers: ``uvicorn app.app_main:app`` from ``backend``.
+
+Also works as ``uvicorn app_main:app`` from this directory; the module
+then imports the package under its one name, ``app``, so settings, caches
+and engines are never loaded twice under different module names.
+"""
+if __package__:
+    from .application import create_app
+else:
+    import sys
+    from pathlib import Path
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from app.application import create_app
+
+app = create_app()
@@ -0,0 +1,113 @@
+"""The ASGI application.
+
+``create_app`` assembles the app; ``app_main`` and ``main`` expose the
+instance servers import. Database engines are not built on import: the
+lifespan builds them once per process, opens and warms the connection
+pools before the first request is accepted, and disposes of them on
+shutdown.
+"""
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.middleware.cors import CORSMiddleware
+
+from .api import events
+from .core.compression import CompressionMiddleware
+from .core.config import settings
+from .core.metrics import MetricsMiddleware, metrics
+from .db import crud
+from .db.models import VERSIONED_TABLES
+from .db.pool import pool_stats
+from .db.session import dispose_router, get_router
+
+meta = APIRouter(tags=["meta"])
+
+
+@meta.get("/")
+async def root():
+    return {"project": settings.PROJECT_NAME, "api": settings.API_V1_STR}
+
+
+@meta.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@meta.get("/cache/stats")
+async def cache_stats():
+    return {
+        "categories": crud.category.cache.stats(),
+        "epochs": crud.epoch.cache.stats(),
+        "layouts": events.layout_cache.stats(),
+    }
+
+
+@meta.get("/diagnostics/db")
+async def db_diagnostics():
+    router = get_router()
+    engine = router.primary
+    return {
+        "dialect": engine.dialect.name,
+        "driver": engine.dialect.driver,
+        "environment": settings.ENVIRONMENT,
+        "pool": pool_stats(engine.pool),
+        "replicas": [
+            {**status, "pool": pool_stats(replica.pool)}
+            for replica, status in zip(router.replicas.engines, await router.replicas.check())
+        ],
+    }
+
+
+@meta.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+async def _prepare(db: AsyncSession) -> None:
+    # The statements nearly every request runs: validators and the event list
+    await crud.get_table_versions(db, *VERSIONED_TABLES)
+    await crud.event.get_multi(db, limit=1)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    router = get_router()
+    await router.warm_up(settings.DB_WARMUP_CONNECTIONS, _prepare)
+    try:
+        yield
+    finally:
+        await dispose_router()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        openapi_url=f"{settings.API_V1_STR}/openapi.json",
+        lifespan=lifespan,
+    )
+
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_BYTES,
+        encodings=settings.compression_encodings,
+    )
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag", "Last-Modified", "Server-Timing"],
+    )
+    app.add_middleware(
+        MetricsMiddleware,
+        registry=metrics,
+        server_timing=settings.SERVER_TIMING,
+        slow_request_seconds=settings.SLOW_REQUEST_MS / 1000 if settings.SLOW_REQUEST_MS else None,
+    )
+
+    app.include_router(events.router, prefix=settings.API_V1_STR)
+    app.include_router(meta)
+    return app
@@ -0,0 +1,332 @@
+"""Load test of the HTTP API against a synthetic SQLite database.
+
+Run from the ``backend`` directory::
+
+    python -m app.benchmarks.api --events 100000 --output bench.json
+    python -m app.benchmarks.api --events 100000 --output new.json --compare bench.json
+
+The database is seeded once per ``--db`` path and reused by later runs
+with the same path (pass ``--reseed`` to rebuild it). Requests go
+through the real ASGI app in-process via ``httpx.ASGITransport``, so the
+numbers cover routing, validation, SQL and serialization but no network.
+With ``--compare`` the run fails (exit status 1) when a scenario's p95
+latency or throughput is worse than the baseline by more than
+``--threshold``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import sqlalchemy
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..db.base import Base
+from ..db.models import Category, Epoch, Event, event_category
+
+API = "/api/v1"
+SEED_CHUNK = 10000
+SCENARIOS = ("list", "filter", "detail", "create", "delete")
+
+
+@dataclass
+class DataConfig:
+    events: int = 10000
+    epochs: int = 12
+    categories: int = 40
+    # Mean categories per event; the actual count per event is 0..2*fanout
+    fanout: float = 2.0
+    seed: int = 42
+
+
+async def seed_database(engine, config: DataConfig) -> None:
+    """Build the schema and fill it with reproducible synthetic data."""
+    rng = random.Random(config.seed)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+        span = 5000 * 365
+        start = datetime(1, 1, 1)
+        epoch_days = span // config.epochs
+        await conn.execute(insert(Epoch), [
+            {
+                "id": i + 1,
+                "name": f"Epoch {i + 1}",
+                "description": "",
+                "start_date": start + timedelta(days=i * epoch_days),
+                "end_date": start + timedelta(days=(i + 1) * epoch_days),
+                "color": "#%06x" % rng.randrange(0x1000000),
+            }
+            for i in range(config.epochs)
+        ])
+        await conn.execute(insert(Category), [
+            {"id": i + 1, "name": f"Category {i + 1}", "color": "#%06x" % rng.randrange(0x1000000)}
+            for i in range(config.categories)
+        ])
+
+        # Popular categories are far more common than the rest (Zipf-like)
+        weights = [1 / (rank + 1) for rank in range(config.categories)]
+        category_ids = list(range(1, config.categories + 1))
+        max_fanout = int(2 * config.fanout)
+        for first in range(1, config.events + 1, SEED_CHUNK):
+            events, links = [], []
+            for id in range(first, min(first + SEED_CHUNK, config.events + 1)):
+                day = rng.randrange(span)
+                events.append({
+                    "id": id,
+                    "title": f"Event {id}",
+                    "description": "Synthetic event for load testing",
+                    "date": start + timedelta(days=day, seconds=rng.randrange(86400)),
+                    "location": f"Place {rng.randrange(1000)}",
+                    "latitude": rng.uniform(-60, 70),
+                    "longitude": rng.uniform(-180, 180),
+                    "importance": rng.randint(1, 5),
+                    "epoch_id": min(day // epoch_days, config.epochs - 1) + 1,
+                })
+                count = rng.randint(0, max_fanout) if config.categories else 0
+                for category_id in set(rng.choices(category_ids, weights, k=count)):
+                    links.append({"event_id": id, "category_id": category_id})
+            await conn.execute(insert(Event), events)
+            if links:
+                await conn.execute(insert(event_category), links)
+
+
+@dataclass
+class Scenario:
+    name: str
+    request: Callable[[AsyncClient], Awaitable[int]]
+
+
+def build_scenarios(config: DataConfig, rng: random.Random) -> Dict[str, Scenario]:
+    created: List[int] = []
+
+    async def list_events(client: AsyncClient) -> int:
+        r = await client.get(f"{API}/events/", params={"limit": 100})
+        return r.status_code
+
+    async def filter_events(client: AsyncClient) -> int:
+        year = rng.randrange(1, 4900)
+        r = await client.get(f"{API}/events/", params={
+            "category_id": [rng.randint(1, config.categories) for _ in range(2)],
+            "start_date": f"{year:04d}-01-01T00:00:00",
+            "end_date": f"{year + 100:04d}-01-01T00:00:00",
+            "limit": 100,
+        })
+        return r.status_code
+
+    async def read_event(client: AsyncClient) -> int:
+        r = await client.get(f"{API}/events/{rng.randint(1, config.events)}")
+        return r.status_code
+
+    async def create_event(client: AsyncClient) -> int:
+        r = await client.post(f"{API}/events/", json={
+            "title": "Benchmark event",
+            "date": f"{rng.randrange(1, 5000):04d}-06-01T00:00:00",
+            "epoch_id": rng.randint(1, config.epochs),
+            "category_ids": [rng.randint(1, config.categories)],
+        })
+        if r.status_code == 200:
+            created.append(r.json()["id"])
+        return r.status_code
+
+    async def delete_event(client: AsyncClient) -> int:
+        # Deletes what the create scenario added, keeping the data set stable
+        if not created:
+            return await create_event(client)
+        r = await client.delete(f"{API}/events/{created.pop()}")
+        return r.status_code
+
+    scenarios = [
+        Scenario("list", list_events),
+        Scenario("filter", filter_events),
+        Scenario("detail", read_event),
+        Scenario("create", create_event),
+        Scenario("delete", delete_event),
+    ]
+    return {scenario.name: scenario for scenario in scenarios}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+async def run_scenario(
+    client: AsyncClient, scenario: Scenario, requests: int, concurrency: int
+) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            status = await scenario.request(client)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+async def _stored_counts(engine) -> Optional[tuple]:
+    try:
+        async with engine.connect() as conn:
+            return tuple([
+                (await conn.execute(select(func.count()).select_from(model))).scalar()
+                for model in (Event, Epoch, Category)
+            ])
+    except OperationalError:
+        return None
+
+
+async def run_benchmark(
+    db_path: Path,
+    config: DataConfig,
+    *,
+    requests: int = 200,
+    concurrency: int = 4,
+    warmup: int = 10,
+    scenarios: Optional[List[str]] = None,
+    reseed: bool = False
+) -> dict:
+    """Seed ``db_path`` if needed, then run the scenarios and return the report."""
+    url = f"sqlite+aiosqlite:///{db_path}"
+    # The app builds its engines from the settings on first use; keep them off the default server
+    os.environ.setdefault("DATABASE_URL", url)
+    from ..app_main import app
+    from ..db.session import build_engine, get_db, get_read_db
+
+    engine = build_engine(url)
+    try:
+        if reseed or await _stored_counts(engine) != (config.events, config.epochs, config.categories):
+            await seed_database(engine, config)
+
+        session_factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+        async def override_get_db():
+            async with session_factory() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_read_db] = override_get_db
+        rng = random.Random(config.seed)
+        selected = build_scenarios(config, rng)
+        results = {}
+        try:
+            transport = ASGITransport(app=app)
+            async with AsyncClient(transport=transport, base_url="http://bench") as client:
+                for name in scenarios or SCENARIOS:
+                    scenario = selected[name]
+                    if warmup:
+                        await run_scenario(client, scenario, warmup, 1)
+                    results[name] = await run_scenario(client, scenario, requests, concurrency)
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            app.dependency_overrides.pop(get_read_db, None)
+    finally:
+        await engine.dispose()
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "data": vars(config),
+            "requests": requests,
+            "concurrency": concurrency,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Describe every scenario that regressed by more than ``threshold`` (0.2 = 20%)."""
+    regressions = []
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        if base["p95_ms"] and result["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {base['p95_ms']} ms -> {result['p95_ms']} ms")
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {base['throughput_rps']} -> {result['throughput_rps']} req/s"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", type=Path, default=Path("benchmark.db"))
+    parser.add_argument("--reseed", action="store_true")
+    parser.add_argument("--events", type=int, default=DataConfig.events)
+    parser.add_argument("--epochs", type=int, default=DataConfig.epochs)
+    parser.add_argument("--categories", type=int, default=DataConfig.categories)
+    parser.add_argument("--fanout", type=float, default=DataConfig.fanout)
+    parser.add_argument("--seed", type=int, default=DataConfig.seed)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append", dest="scenarios")
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    parser.add_argument("--compare", type=Path, help="baseline report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    config = DataConfig(args.events, args.epochs, args.categories, args.fanout, args.seed)
+    report = asyncio.run(run_benchmark(
+        args.db, config,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        scenarios=args.scenarios,
+        reseed=args.reseed,
+    ))
+
+    print(f"{'scenario':<10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'errors':>7}")
+    for name, result in report["scenarios"].items():
+        print(
+            f"{name:<10} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+            f"{result['p99_ms']:>9.2f} {result['throughput_rps']:>9.1f} {result['errors']:>7}"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.compare:
+        regressions = compare(json.loads(args.compare.read_text()), report, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
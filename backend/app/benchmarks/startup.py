@@ -0,0 +1,151 @@
+"""Startup cost of the app: import time and lifespan (pool warm-up) time.
+
+Run from the ``backend`` directory::
+
+    python -m app.benchmarks.startup --runs 5 --output startup.json
+
+Every run is a fresh interpreter importing ``app.app_main`` under
+``python -X importtime`` and then running the ASGI lifespan startup
+against a SQLite file. The best run is reported with the modules that
+took longest to import. The run fails (exit status 1) when the import or
+the startup exceeds its budget, or when a module that should only load
+on first use (database drivers, optional dependencies) was imported.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+MODULE = "app.app_main"
+# Generous enough for slow CI machines; a regression still trips them
+IMPORT_BUDGET_MS = 2500.0
+STARTUP_BUDGET_MS = 1000.0
+# Loaded when first needed, never by importing the app
+FORBIDDEN_AT_IMPORT = (
+    "asyncpg",
+    "aiosqlite",
+    "sqlalchemy.dialects.postgresql",
+    "sqlalchemy.dialects.sqlite",
+    "redis",
+    "httpx",
+    "numpy",
+)
+
+_BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+_SCRIPT = """
+import asyncio, json, sys, time
+import {module} as entry
+loaded = sorted(sys.modules)
+
+async def startup():
+    from app.db.base import Base
+    from app.db.session import build_engine
+    engine = build_engine({url!r})
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+    start = time.perf_counter()
+    async with entry.app.router.lifespan_context(entry.app):
+        ready = time.perf_counter()
+    return (ready - start) * 1000
+
+print(json.dumps({{"startup_ms": asyncio.run(startup()), "modules": loaded}}))
+"""
+
+
+def parse_importtime(output: str) -> Dict[str, tuple]:
+    """``{module: (self_ms, cumulative_ms)}`` from ``-X importtime`` output."""
+    timings = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        timings[fields[2].strip()] = (int(fields[0]) / 1000, int(fields[1]) / 1000)
+    return timings
+
+
+def measure_once(module: str = MODULE) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite+aiosqlite:///{Path(directory) / 'startup.db'}"
+        env = {**os.environ, "DATABASE_URL": url, "DATABASE_REPLICA_URLS": ""}
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _SCRIPT.format(module=module, url=url)],
+            cwd=_BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+    timings = parse_importtime(process.stderr)
+    result = json.loads(process.stdout.splitlines()[-1])
+    modules = set(result["modules"])
+    return {
+        "import_ms": round(timings[module][1], 3),
+        "startup_ms": round(result["startup_ms"], 3),
+        "forbidden": [name for name in FORBIDDEN_AT_IMPORT if name in modules],
+        "slowest": [
+            {"module": name, "self_ms": own, "cumulative_ms": total}
+            for name, (own, total) in sorted(timings.items(), key=lambda item: -item[1][0])[:15]
+        ],
+    }
+
+
+def measure(module: str = MODULE, runs: int = 3) -> dict:
+    """Best of ``runs`` fresh interpreters, with the budgets it was checked against."""
+    results = [measure_once(module) for _ in range(runs)]
+    best = min(results, key=lambda result: result["import_ms"])
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "module": module,
+            "runs": runs,
+        },
+        "import_ms": best["import_ms"],
+        "startup_ms": min(result["startup_ms"] for result in results),
+        "budget": {"import_ms": IMPORT_BUDGET_MS, "startup_ms": STARTUP_BUDGET_MS},
+        "forbidden": sorted({name for result in results for name in result["forbidden"]}),
+        "slowest": best["slowest"],
+    }
+
+
+def problems(report: dict) -> List[str]:
+    """Everything over budget or imported too early."""
+    found = []
+    if report["import_ms"] > report["budget"]["import_ms"]:
+        found.append(f"import {report['import_ms']:.0f} ms > {report['budget']['import_ms']:.0f} ms")
+    if report["startup_ms"] > report["budget"]["startup_ms"]:
+        found.append(f"startup {report['startup_ms']:.0f} ms > {report['budget']['startup_ms']:.0f} ms")
+    found += [f"{name} imported at startup" for name in report["forbidden"]]
+    return found
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default=MODULE)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = measure(args.module, args.runs)
+    print(f"import {report['import_ms']:.1f} ms, startup {report['startup_ms']:.1f} ms")
+    print(f"{'module':<50} {'self ms':>9} {'cumul. ms':>10}")
+    for row in report["slowest"]:
+        print(f"{row['module']:<50} {row['self_ms']:>9.1f} {row['cumulative_ms']:>10.1f}")
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    found = problems(report)
+    for line in found:
+        print(f"OVER BUDGET {line}", file=sys.stderr)
+    if found:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Microbenchmark: wire size and encode CPU of event pages per format and coding.
+
+Run from the ``backend`` directory::
+
+    python -m app.benchmarks.wire --sizes 1000 10000 --output wire.json
+
+Each page is encoded as JSON (and MessagePack when ``msgpack`` is
+installed), then sent through every available content coding (identity,
+gzip, and br/zstd when their packages are installed). Times are the best
+of ``--repeat`` runs and include building the payload with
+``EventEncoder``.
+"""
+import argparse
+import json
+import platform
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from ..core.compression import COMPRESSORS, compress, is_available
+from ..core.serialization import EventEncoder, dumps, msgpack
+from .serialization import make_events
+
+
+def formats() -> Dict[str, Callable[[list], bytes]]:
+    encoders = {"json": lambda events: dumps(EventEncoder().events(events))}
+    if msgpack is not None:
+        encoders["msgpack"] = lambda events: msgpack.packb(EventEncoder().events(events))
+    return encoders
+
+
+def encodings() -> List[str]:
+    return ["identity"] + [name for name in COMPRESSORS if is_available(name)]
+
+
+def _best_of(fn: Callable[[], bytes], repeat: int) -> tuple:
+    best, data = float("inf"), b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, data
+
+
+def measure(sizes: List[int], repeat: int = 3) -> dict:
+    results = []
+    for size in sizes:
+        events = make_events(size)
+        plain_json = None
+        for format, encode in formats().items():
+            encode_seconds, body = _best_of(lambda: encode(events), repeat)
+            if plain_json is None:
+                plain_json = len(body)
+            for encoding in encodings():
+                if encoding == "identity":
+                    compress_seconds, wire = 0.0, body
+                else:
+                    compress_seconds, wire = _best_of(lambda: compress(encoding, body), repeat)
+                results.append({
+                    "events": size,
+                    "format": format,
+                    "encoding": encoding,
+                    "bytes": len(wire),
+                    "ratio_vs_json": round(len(wire) / plain_json, 4),
+                    "encode_ms": round((encode_seconds + compress_seconds) * 1000, 3),
+                })
+    return {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(), "repeat": repeat},
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = measure(args.sizes, args.repeat)
+    print(f"{'events':>8} {'format':<8} {'coding':<9} {'bytes':>11} {'vs JSON':>8} {'encode ms':>10}")
+    for row in report["results"]:
+        print(
+            f"{row['events']:>8} {row['format']:<8} {row['encoding']:<9} {row['bytes']:>11} "
+            f"{row['ratio_vs_json']:>8.3f} {row['encode_ms']:>10.1f}"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Command line entry point for offline maintenance tasks.
+
+Run from the ``backend`` directory, e.g.::
+
+    python -m app.cli load-events history.ndjson --chunk-size 5000
+    python -m app.cli rebuild-stats --check
+
+For ``load-events``, files ending in ``.json`` must hold a JSON array of
+events; anything else is read as NDJSON (one event per line). Use ``-``
+to read NDJSON from stdin.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import Any, Iterator
+
+from .core.config import settings
+from .db.crud import event
+from .db.stats import rebuild_stats
+from .db.session import async_session_factory
+
+
+def _read_rows(path: str) -> Iterator[Any]:
+    if path == "-":
+        yield from (line for line in sys.stdin if line.strip())
+        return
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            rows = json.load(f)
+            if not isinstance(rows, list):
+                raise SystemExit(f"{path}: expected a JSON array of events")
+            yield from rows
+        else:
+            yield from (line for line in f if line.strip())
+
+
+async def load_events(path: str, chunk_size: int) -> int:
+    async with async_session_factory() as db:
+        result = await event.create_bulk(db, rows=_read_rows(path), chunk_size=chunk_size)
+    for error in result.errors:
+        print(f"row {error.index}: {error.detail}", file=sys.stderr)
+    print(f"created {result.created} events, {len(result.errors)} rejected")
+    return 1 if result.errors else 0
+
+
+async def rebuild_event_stats(check_only: bool) -> int:
+    async with async_session_factory() as db:
+        problems = await rebuild_stats(db, check_only=check_only)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if check_only:
+        print(f"{len(problems)} statistics rows out of date")
+        return 1 if problems else 0
+    print(f"rebuilt event statistics, {len(problems)} rows corrected")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load = commands.add_parser("load-events", help="bulk load events from a JSON or NDJSON file")
+    load.add_argument("path", help="input file, or - for NDJSON on stdin")
+    load.add_argument("--chunk-size", type=int, default=settings.BULK_CHUNK_SIZE)
+
+    rebuild = commands.add_parser(
+        "rebuild-stats", help="recompute the epoch/category statistics from the events"
+    )
+    rebuild.add_argument(
+        "--check", action="store_true", help="only report rows that are off (exit status 1 if any)"
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "load-events":
+        return asyncio.run(load_events(args.path, args.chunk_size))
+    if args.command == "rebuild-stats":
+        return asyncio.run(rebuild_event_stats(args.check))
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
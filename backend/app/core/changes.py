@@ -0,0 +1,68 @@
+import asyncio
+from typing import Iterable, Optional, Set
+
+
+class Subscription:
+    """One subscriber's bounded queue of change dicts.
+
+    ``overflowed`` is set when the subscriber fell more than ``maxsize``
+    changes behind; it then receives nothing more and should resume from
+    the change log with ``since=`` the last sequence number it saw.
+    """
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next change, or ``None`` if ``timeout`` expires or the subscription overflowed."""
+        if self.overflowed and self.queue.empty():
+            return None
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ChangeFeed:
+    """In-process fan-out of committed changes to live subscribers.
+
+    ``publish`` never awaits: each change is put on every subscriber's
+    queue without blocking, and a subscriber whose queue is full is cut
+    off instead of slowing the writer or the other subscribers.
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._subscribers: Set[Subscription] = set()
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.maxsize)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, changes: Iterable[dict]) -> None:
+        changes = list(changes)
+        if not changes:
+            return
+        for subscription in list(self._subscribers):
+            try:
+                for change in changes:
+                    subscription.queue.put_nowait(change)
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                self._subscribers.discard(subscription)
+                self.dropped += 1
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self._subscribers), "dropped": self.dropped}
+
+
+def sse_message(change: dict, data: str) -> str:
+    """Format a change as a Server-Sent Events message."""
+    return f"id: {change['seq']}\nevent: {change['op']}\ndata: {data}\n\n"
+
@@ -0,0 +1,242 @@
+"""Negotiated response compression.
+
+``CompressionMiddleware`` encodes response bodies with the best coding the
+client accepts (``Accept-Encoding``) among those configured: zstd and
+brotli when the optional ``zstandard`` / ``brotli`` packages are
+installed, gzip always. Bodies sent in one piece are compressed only from
+``minimum_size`` bytes on. Streamed bodies (more than one body message)
+are compressed chunk by chunk, each chunk flushed so that clients receive
+it right away.
+"""
+import zlib
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+# Server preference when the client accepts several codings equally
+DEFAULT_ENCODINGS = ("zstd", "br", "gzip")
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/x-ndjson", "application/jsonl", "application/ndjson",
+    "application/msgpack", "application/x-msgpack", "application/octet-stream",
+)
+# Server-Sent Events must reach the client message by message, uncompressed
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+
+class GzipCompressor:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self):
+        import brotli
+
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self):
+        import zstandard
+
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(self._flush_block)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+COMPRESSORS = {"gzip": GzipCompressor, "br": BrotliCompressor, "zstd": ZstdCompressor}
+_MODULES = {"br": "brotli", "zstd": "zstandard"}
+
+
+@lru_cache(maxsize=None)
+def is_available(encoding: str) -> bool:
+    """Whether ``encoding`` can be produced here; imports its package on first call."""
+    if encoding not in COMPRESSORS:
+        return False
+    module = _MODULES.get(encoding)
+    if module is None:
+        return True
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def compress(encoding: str, data: bytes) -> bytes:
+    """``data`` compressed in one piece."""
+    compressor = COMPRESSORS[encoding]()
+    return compressor.compress(data) + compressor.finish()
+
+
+def _accepted(header: str) -> Dict[str, float]:
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def negotiate(accept_encoding: Optional[str], encodings: Sequence[str]) -> Optional[str]:
+    """The coding of ``encodings`` (in preference order) the client accepts most; None for identity."""
+    if not accept_encoding:
+        return None
+    accepted = _accepted(accept_encoding)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality and is_available(encoding):
+            best, best_quality = encoding, quality
+    return best
+
+
+def _header(headers: List[tuple], name: bytes) -> Optional[str]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _add_vary(headers: List[tuple], value: str) -> List[tuple]:
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return headers + [(b"vary", value.encode("latin-1"))]
+    if value.lower() in (part.strip().lower() for part in vary.split(",")):
+        return headers
+    return [
+        (key, f"{vary}, {value}".encode("latin-1") if key.lower() == b"vary" else header_value)
+        for key, header_value in headers
+    ]
+
+
+def _weak_etag(value: bytes) -> bytes:
+    # The encoded bytes differ from the identity body, so a strong tag would lie
+    return value if value.startswith(b"W/") else b"W/" + value
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with the negotiated coding.
+
+    Responses that already carry a ``Content-Encoding``, are not of a
+    compressible type, or have no body (204/304, ``HEAD``) pass unchanged.
+    Compressible responses always get ``Vary: Accept-Encoding``, and a
+    strong ``ETag`` of a response it compresses becomes weak; conditional
+    requests compare tags weakly, so they keep matching.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, encodings: Sequence[str] = DEFAULT_ENCODINGS):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = tuple(encodings)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = None
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        encoding = negotiate(accept_encoding, self.encodings)
+
+        start = None
+        compressor = None
+        # None until the first body message decides; False passes everything through
+        compressing: Optional[bool] = None
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, compressing
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                content_type = _header(headers, b"content-type") or ""
+                compressible = (
+                    content_type.startswith(COMPRESSIBLE_TYPES)
+                    and not content_type.startswith(UNCOMPRESSED_TYPES)
+                    and _header(headers, b"content-encoding") is None
+                    and message["status"] not in (204, 304)
+                    and scope["method"] != "HEAD"
+                )
+                if not compressible:
+                    compressing = False
+                    await send(message)
+                    return
+                start = {**message, "headers": _add_vary(headers, "Accept-Encoding")}
+                if encoding is None:
+                    compressing = False
+                    await send(start)
+                return
+
+            if message["type"] != "http.response.body" or compressing is False:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressing is None:
+                if not more_body and len(body) < self.minimum_size:
+                    compressing = False
+                    await send(start)
+                    await send(message)
+                    return
+                compressing = True
+                compressor = COMPRESSORS[encoding]()
+                headers = [
+                    (key, _weak_etag(value) if key.lower() == b"etag" else value)
+                    for key, value in start["headers"] if key.lower() != b"content-length"
+                ]
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                if not more_body:
+                    body = compressor.compress(body) + compressor.finish()
+                    headers.append((b"content-length", str(len(body)).encode("latin-1")))
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send({**start, "headers": headers})
+
+            if more_body:
+                chunk = compressor.compress(body) + compressor.flush()
+            else:
+                chunk = compressor.compress(body) + compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,11 +1,51 @@
 import secrets
-from typing import Optional
+from typing import List, Literal, Optional
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
+# Defaults per ENVIRONMENT for settings left unset (None)
+PROFILES = {
+    "development": {
+        "DB_ECHO": False,
+        "DB_POOL_SIZE": 5,
+        "DB_MAX_OVERFLOW": 10,
+        "DB_POOL_TIMEOUT": 30.0,
+        "DB_POOL_RECYCLE": 1800,
+        "DB_POOL_PRE_PING": True,
+        "DB_STATEMENT_TIMEOUT_MS": 0,
+        "SQLITE_WAL": True,
+        "DB_WARMUP_CONNECTIONS": 1,
+    },
+    "test": {
+        "DB_ECHO": False,
+        "DB_POOL_SIZE": 2,
+        "DB_MAX_OVERFLOW": 2,
+        "DB_POOL_TIMEOUT": 5.0,
+        "DB_POOL_RECYCLE": -1,
+        "DB_POOL_PRE_PING": False,
+        "DB_STATEMENT_TIMEOUT_MS": 0,
+        # Leave the journal mode of checked-in SQLite files alone
+        "SQLITE_WAL": False,
+        "DB_WARMUP_CONNECTIONS": 0,
+    },
+    "production": {
+        "DB_ECHO": False,
+        "DB_POOL_SIZE": 20,
+        "DB_MAX_OVERFLOW": 10,
+        "DB_POOL_TIMEOUT": 10.0,
+        "DB_POOL_RECYCLE": 1800,
+        "DB_POOL_PRE_PING": True,
+        "DB_STATEMENT_TIMEOUT_MS": 15000,
+        "SQLITE_WAL": True,
+        "DB_WARMUP_CONNECTIONS": 4,
+    },
+}
+
 class Settings(BaseSettings):
     PROJECT_NAME: str = "ChronoSpace"
     API_V1_STR: str = "/api/v1"
     TESTING: bool = False
+    ENVIRONMENT: Literal["development", "test", "production"] = "development"
 
     # Database settings
     DATABASE_URL: Optional[str] = None
@@ -14,6 +54,69 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = "postgres"
     POSTGRES_DB: str = "chronospace"
     POSTGRES_PORT: str = "5432"
+    # Comma-separated read replica URLs; event reads are spread over them
+    DATABASE_REPLICA_URLS: str = ""
+    # Seconds a replica that failed to connect is skipped before being tried again
+    REPLICA_RETRY_AFTER: float = 10.0
+    # Seconds after a client's own write during which its reads stay on the primary
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    # Engine and pool; None means "use the ENVIRONMENT profile default"
+    DB_ECHO: Optional[bool] = None
+    DB_POOL_SIZE: Optional[int] = None
+    DB_MAX_OVERFLOW: Optional[int] = None
+    DB_POOL_TIMEOUT: Optional[float] = None
+    DB_POOL_RECYCLE: Optional[int] = None
+    DB_POOL_PRE_PING: Optional[bool] = None
+    # 0 disables the timeout; applied per connection on PostgreSQL (asyncpg)
+    DB_STATEMENT_TIMEOUT_MS: Optional[int] = None
+    # journal_mode=WAL and synchronous=NORMAL on file-backed SQLite
+    SQLITE_WAL: Optional[bool] = None
+    # Connections per engine opened, and warmed with the hot queries, at startup
+    DB_WARMUP_CONNECTIONS: Optional[int] = None
+
+    # Bulk ingestion
+    BULK_CHUNK_SIZE: int = 1000
+
+    # Reference data (categories, epochs) cache
+    REFERENCE_CACHE_TTL: float = 300.0
+    # Optional shared backend keeping workers coherent, e.g. redis://localhost:6379/0
+    CACHE_BACKEND_URL: Optional[str] = None
+
+    # Response compression: codings offered in preference order (zstd and br
+    # need the optional zstandard/brotli packages; empty disables) and the
+    # smallest body worth compressing. Streamed bodies are always compressed.
+    COMPRESSION_ENCODINGS: str = "zstd,br,gzip"
+    COMPRESSION_MIN_BYTES: int = 1024
+
+    # Timeline layouts kept per worker (by filters, zoom and data version),
+    # bounded by the events they hold in total: about 60 bytes per event
+    LAYOUT_CACHE_EVENTS: int = 1_000_000
+
+    # Change feed: changes buffered per subscriber before it is cut off,
+    # and seconds between keep-alive comments on idle streams
+    CHANGE_FEED_QUEUE_SIZE: int = 1000
+    CHANGE_FEED_HEARTBEAT: float = 15.0
+
+    # Observability: Server-Timing response header (opt-in) and the
+    # threshold for logging slow requests with their SQL; 0 disables the log
+    SERVER_TIMING: bool = False
+    SLOW_REQUEST_MS: float = 1000.0
+
+    @model_validator(mode="after")
+    def apply_profile(self) -> "Settings":
+        for name, value in PROFILES[self.ENVIRONMENT].items():
+            if getattr(self, name) is None:
+                setattr(self, name, value)
+        return self
+
+    @property
+    def replica_urls(self) -> List[str]:
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+    @property
+    def compression_encodings(self) -> List[str]:
+        return [name.strip() for name in self.COMPRESSION_ENCODINGS.split(",") if name.strip()]
 
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
@@ -0,0 +1,180 @@
+"""Server-side placement of events in the 3D timeline scene.
+
+``x`` is proportional to the date: at zoom level ``z`` one scene unit
+spans ``ZOOM_BASE_MS / 2**z`` milliseconds, counted from 1970-01-01, so
+coordinates do not depend on the viewport and panning only changes which
+events are returned. Events closer than ``gap`` units on the x axis would
+overlap; they are spread over lanes, which sit on a sunflower spiral in
+the y/z plane around the axis (lane 0 is on the axis).
+
+Lanes are assigned without a Python loop. In ``(date, id)`` order, a run
+is a maximal sequence of events each less than ``gap`` after the previous
+one, and ``d`` is the largest number of events of the run within ``gap``
+of each other. Those ``d`` events all collide, so at least ``d`` lanes are
+needed; assigning lanes round-robin modulo ``d`` within the run needs no
+more: two events ``d`` apart in the order are at least ``gap`` apart.
+NumPy is imported on first use so that it does not weigh on startup.
+"""
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Hashable, Optional, Sequence
+
+# Milliseconds per scene unit at zoom level 0: one century
+ZOOM_BASE_MS = 100 * 365.2425 * 86400 * 1000
+MAX_ZOOM = 40
+DEFAULT_GAP = 1.0
+# Gaps are snapped to a power of two in this range, so that clients
+# cannot fill the layout cache with layouts differing by a hair
+MIN_GAP_EXPONENT = -6
+MAX_GAP_EXPONENT = 10
+DEFAULT_MAX_LANES = 64
+# Distance between neighbouring lanes in the y/z plane, in scene units
+LANE_SPACING = 0.6
+_GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))
+
+
+def ms_per_unit(zoom: int) -> float:
+    return ZOOM_BASE_MS / 2 ** zoom
+
+
+def snap_gap(gap: float) -> float:
+    """The power of two nearest to ``gap`` (on a log scale) within the allowed range."""
+    exponent = round(math.log2(gap))
+    return 2.0 ** min(max(exponent, MIN_GAP_EXPONENT), MAX_GAP_EXPONENT)
+
+
+@dataclass
+class Layout:
+    """Positions of every filtered event, ordered by ``(date, id)``; NumPy arrays."""
+    zoom: int
+    gap: float
+    ids: Any
+    dates: Any  # epoch milliseconds
+    x: Any
+    y: Any
+    z: Any
+    lanes: Any
+
+
+def assign_lanes(x, gap: float, max_lanes: int):
+    """Lane of each position of the ascending array ``x`` (see the module docstring).
+
+    Runs denser than ``max_lanes`` are folded into ``max_lanes`` lanes and
+    may overlap.
+    """
+    import numpy as np
+
+    count = len(x)
+    if count == 0:
+        return np.zeros(0, dtype=np.int64)
+    index = np.arange(count)
+    # Events within gap before each one, itself included
+    crowd = index - np.searchsorted(x, x - gap, side="right") + 1
+    breaks = np.r_[True, np.diff(x) >= gap]
+    starts = np.flatnonzero(breaks)
+    run = np.cumsum(breaks) - 1
+    lanes_needed = np.minimum(np.maximum.reduceat(crowd, starts), max_lanes)
+    return (index - starts[run]) % lanes_needed[run]
+
+
+def compute_layout(
+    ids: Sequence[int],
+    dates: Sequence[datetime],
+    zoom: int,
+    gap: float = DEFAULT_GAP,
+    max_lanes: int = DEFAULT_MAX_LANES
+) -> Layout:
+    """Lay out events given in ``(date, id)`` order, as ``CRUDEvent.get_dates`` returns them."""
+    import numpy as np
+
+    ms = np.array(dates, dtype="datetime64[ms]").astype(np.int64)
+    x = ms / ms_per_unit(zoom)
+    lanes = assign_lanes(x, gap, max_lanes)
+    radius = LANE_SPACING * np.sqrt(lanes)
+    angle = lanes * _GOLDEN_ANGLE
+    return Layout(
+        zoom=zoom,
+        gap=gap,
+        ids=np.array(ids, dtype=np.int64),
+        dates=ms,
+        x=x,
+        y=radius * np.sin(angle),
+        z=radius * np.cos(angle),
+        lanes=lanes,
+    )
+
+
+def viewport_payload(
+    layout: Layout, start_ms: Optional[int] = None, end_ms: Optional[int] = None
+) -> dict:
+    """The events of ``layout`` dated within ``[start_ms, end_ms]``, as parallel lists."""
+    import numpy as np
+
+    first = 0 if start_ms is None else int(np.searchsorted(layout.dates, start_ms, side="left"))
+    last = len(layout.dates) if end_ms is None else int(np.searchsorted(layout.dates, end_ms, side="right"))
+    window = slice(first, max(first, last))
+    lanes = layout.lanes[window]
+    return {
+        "zoom": layout.zoom,
+        "ms_per_unit": ms_per_unit(layout.zoom),
+        "gap": layout.gap,
+        "total": len(layout.ids),
+        "count": len(lanes),
+        "lane_count": int(lanes.max()) + 1 if len(lanes) else 0,
+        "ids": layout.ids[window].tolist(),
+        "dates": layout.dates[window].tolist(),
+        "x": layout.x[window].tolist(),
+        "y": np.round(layout.y[window], 4).tolist(),
+        "z": np.round(layout.z[window], 4).tolist(),
+        "lanes": lanes.tolist(),
+    }
+
+
+class LayoutCache:
+    """Least-recently-used layouts, keyed by filters, zoom and data version.
+
+    Keys carry the table versions, so writes never have to invalidate:
+    entries for older versions are simply not asked for again and age out.
+    A layout holds several arrays the length of its event list, so the
+    cache is bounded by the total number of events it holds, ``max_events``;
+    a layout larger than that on its own is not cached.
+    """
+
+    def __init__(self, max_events: int):
+        self.max_events = max_events
+        self.events = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Layout]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Layout]:
+        layout = self._entries.get(key)
+        if layout is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return layout
+
+    def put(self, key: Hashable, layout: Layout) -> None:
+        if len(layout.ids) > self.max_events:
+            return
+        replaced = self._entries.pop(key, None)
+        if replaced is not None:
+            self.events -= len(replaced.ids)
+        self._entries[key] = layout
+        self.events += len(layout.ids)
+        while self.events > self.max_events:
+            _, evicted = self._entries.popitem(last=False)
+            self.events -= len(evicted.ids)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.events = 0
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "events": self.events}
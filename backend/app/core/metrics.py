@@ -0,0 +1,241 @@
+"""Request and SQL metrics, exported in the Prometheus text format.
+
+``MetricsMiddleware`` times every request and, through the engine hooks
+installed by ``instrument_engine``, attributes the SQL statements run
+while serving it. Counters live in process memory, so each worker
+reports its own values and Prometheus aggregates them.
+"""
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger("chronospace.slow_requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Statements kept per request for the slow log
+MAX_RECORDED_STATEMENTS = 50
+
+
+@dataclass
+class RequestStats:
+    """SQL run on behalf of the current request."""
+    statements: int = 0
+    sql_seconds: float = 0.0
+    # (seconds, statement) of the first MAX_RECORDED_STATEMENTS statements
+    recorded: List[Tuple[float, str]] = field(default_factory=list)
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("chronospace_request_stats", default=None)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not conn.info.get("query_start"):
+        return
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats.statements += 1
+    stats.sql_seconds += elapsed
+    if len(stats.recorded) < MAX_RECORDED_STATEMENTS:
+        stats.recorded.append((elapsed, statement))
+
+
+def _on_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def instrument_engine(engine) -> None:
+    """Attribute the statements run on ``engine`` to the request being served."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_execute)
+    event.listen(sync_engine, "handle_error", _on_error)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{le}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum!r}")
+        lines.append(f"{name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**values: str) -> str:
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in values.items())
+
+
+class Metrics:
+    def __init__(self):
+        self.in_flight = 0
+        self.clear()
+
+    def clear(self) -> None:
+        """Reset the per-route series (the in-flight gauge is live state and stays)."""
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.response_size: Dict[Tuple[str, str], Histogram] = {}
+        self.statements: Dict[Tuple[str, str], Histogram] = {}
+        self.sql_seconds: Dict[Tuple[str, str], float] = {}
+
+    def record(
+        self, method: str, route: str, status: int, seconds: float, size: int, stats: RequestStats
+    ) -> None:
+        key = (method, route)
+        self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+        self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+        self.response_size.setdefault(key, Histogram(SIZE_BUCKETS)).observe(size)
+        self.statements.setdefault(key, Histogram(STATEMENT_BUCKETS)).observe(stats.statements)
+        self.sql_seconds[key] = self.sql_seconds.get(key, 0.0) + stats.sql_seconds
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP chronospace_http_requests_in_flight Requests being served.",
+            "# TYPE chronospace_http_requests_in_flight gauge",
+            f"chronospace_http_requests_in_flight {self.in_flight}",
+            "# HELP chronospace_http_requests_total Requests served, by route and status.",
+            "# TYPE chronospace_http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(
+                f"chronospace_http_requests_total{{{_labels(method=method, route=route, status=str(status))}}} {count}"
+            )
+        histograms = (
+            ("chronospace_http_request_duration_seconds", "Request latency.", self.latency),
+            ("chronospace_http_response_size_bytes", "Response body size.", self.response_size),
+            ("chronospace_db_statements_per_request", "SQL statements run per request.", self.statements),
+        )
+        for name, help, series in histograms:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+            for (method, route), histogram in sorted(series.items()):
+                lines += histogram.samples(name, _labels(method=method, route=route))
+        lines += [
+            "# HELP chronospace_db_statement_seconds_total Time spent in SQL statements.",
+            "# TYPE chronospace_db_statement_seconds_total counter",
+        ]
+        for (method, route), seconds in sorted(self.sql_seconds.items()):
+            lines.append(
+                f"chronospace_db_statement_seconds_total{{{_labels(method=method, route=route)}}} {seconds!r}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def route_template(scope) -> str:
+    """Path template of the route that served the request, prefix included."""
+    path = getattr(scope.get("route"), "path", None)
+    if not path:
+        return "unmatched"
+    # Routes of included routers may carry their template without the
+    # router prefix; the prefix is the leading, static part of the path
+    actual, template = scope["path"].split("/"), path.split("/")
+    extra = len(actual) - len(template)
+    return "/".join(actual[:extra + 1]) + path if extra > 0 else path
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, size and SQL use of every request.
+
+    Requests are labelled by route template (``/api/v1/events/{event_id}``),
+    never the raw path. Streaming responses are timed until their last
+    chunk. ``server_timing`` adds a ``Server-Timing`` header with the time
+    and SQL spent before the response started. Requests slower than
+    ``slow_request_seconds`` are logged with their slowest statements.
+    """
+
+    def __init__(
+        self,
+        app,
+        registry: Metrics = metrics,
+        server_timing: bool = False,
+        slow_request_seconds: Optional[float] = None
+    ):
+        self.app = app
+        self.registry = registry
+        self.server_timing = server_timing
+        self.slow_request_seconds = slow_request_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    value = (
+                        f"app;dur={elapsed_ms:.1f}, "
+                        f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.statements} statements"'
+                    )
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", value.encode("latin-1"))
+                    ]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        self.registry.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.registry.in_flight -= 1
+            _current.reset(token)
+            elapsed = time.perf_counter() - start
+            self.registry.record(scope["method"], route_template(scope), status, elapsed, size, stats)
+            if self.slow_request_seconds is not None and elapsed >= self.slow_request_seconds:
+                self._log_slow(scope, status, elapsed, stats)
+
+    def _log_slow(self, scope, status: int, elapsed: float, stats: RequestStats) -> None:
+        query = scope.get("query_string", b"").decode("latin-1")
+        target = scope["path"] + (f"?{query}" if query else "")
+        slowest = sorted(stats.recorded, reverse=True)[:5]
+        logger.warning(
+            "slow request %s %s -> %s in %.0f ms (%d statements, %.0f ms SQL)%s",
+            scope["method"], target, status, elapsed * 1000,
+            stats.statements, stats.sql_seconds * 1000,
+            "".join(f"\n  {seconds * 1000:.1f} ms: {' '.join(sql.split())}" for seconds, sql in slowest)
+        )
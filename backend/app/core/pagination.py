@@ -0,0 +1,45 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Tuple
+
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> Any:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(date: datetime, id: int) -> str:
+    """Encode the last seen ``(date, id)`` key as an opaque cursor token."""
+    return _encode([date.isoformat(), id])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor token back into its ``(date, id)`` key.
+
+    Raises ``ValueError`` if the token is malformed.
+    """
+    try:
+        date, id = _decode(cursor)
+        return datetime.fromisoformat(date), int(id)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def encode_search_cursor(score: float, id: int) -> str:
+    """Encode the last seen ``(score, id)`` of a ranked search as a cursor token."""
+    return _encode([score, id])
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, int]:
+    """Decode a search cursor token; raises ``ValueError`` if malformed."""
+    try:
+        score, id = _decode(cursor)
+        return float(score), int(id)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
@@ -0,0 +1,125 @@
+"""JSON encoding of event responses straight from loaded ORM objects.
+
+Returning ORM objects with a ``response_model`` makes FastAPI validate
+the nested Event -> Epoch / Category tree with ``from_attributes`` and
+then serialize the validated copy. Rows from our own database need
+neither step, so the list endpoints build the same JSON shape here in a
+single pass and hand back bytes.
+
+Clients sending ``Accept: application/msgpack`` get the same content as
+MessagePack when the optional ``msgpack`` package is installed (see
+``encoded_response``); otherwise they get JSON.
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import Request, Response
+
+from ..schemas import event as schemas
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder gives the same output
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional; without it msgpack is never negotiated
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# Fields of the nested schemas, in their serialized order
+_CATEGORY_FIELDS = tuple(schemas.Category.model_fields)
+_EPOCH_FIELDS = tuple(schemas.Epoch.model_fields)
+_EVENT_FIELDS = tuple(schemas.Event.model_fields)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class JSONBytesResponse(Response):
+    """JSON response whose content may already be encoded."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return content if isinstance(content, bytes) else dumps(content)
+
+
+class MsgpackResponse(Response):
+    """MessagePack response; ``content`` holds only JSON types (dates as ISO strings)."""
+    media_type = MSGPACK_MEDIA_TYPES[0]
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content)
+
+
+def wants_msgpack(request: Request) -> bool:
+    """Whether the client asked for MessagePack and it can be produced."""
+    if msgpack is None:
+        return False
+    accept = request.headers.get("accept", "")
+    return any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+def encoded_response(request: Request, content: Any, headers: Optional[dict] = None) -> Response:
+    """``content`` as MessagePack or JSON, whichever the client asked for."""
+    headers = {**(headers or {}), "Vary": "Accept"}
+    if wants_msgpack(request):
+        return MsgpackResponse(content, headers=headers)
+    return JSONBytesResponse(content, headers=headers)
+
+
+def _value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _row(obj: Any, fields: Iterable[str]) -> dict:
+    return {name: _value(getattr(obj, name)) for name in fields}
+
+
+class EventEncoder:
+    """Turns events into the ``schemas.Event`` JSON shape.
+
+    Epochs and categories shared by many events are converted once per
+    encoder. Only use it for events loaded with their relationships.
+    """
+
+    def __init__(self):
+        self._epochs: Dict[int, dict] = {}
+        self._categories: Dict[int, dict] = {}
+
+    def _epoch(self, epoch) -> dict:
+        payload = self._epochs.get(epoch.id)
+        if payload is None:
+            payload = self._epochs[epoch.id] = _row(epoch, _EPOCH_FIELDS)
+        return payload
+
+    def _category(self, category) -> dict:
+        payload = self._categories.get(category.id)
+        if payload is None:
+            payload = self._categories[category.id] = _row(category, _CATEGORY_FIELDS)
+        return payload
+
+    def event(self, event) -> Optional[dict]:
+        if event is None:
+            return None
+        payload = {}
+        for name in _EVENT_FIELDS:
+            if name == "epoch":
+                payload[name] = self._epoch(event.epoch)
+            elif name == "categories":
+                payload[name] = [self._category(c) for c in event.categories]
+            elif name == "category_ids":
+                # Input-only field: the ORM object has none, so the schema default applies
+                payload[name] = []
+            else:
+                payload[name] = _value(getattr(event, name))
+        return payload
+
+    def events(self, events: Iterable[Any]) -> List[Optional[dict]]:
+        return [self.event(event) for event in events]
@@ -0,0 +1,100 @@
+import json
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta
+from typing import List
+
+UNIX_EPOCH = datetime(1970, 1, 1)
+ONE_MS = timedelta(milliseconds=1)
+
+BINARY_MEDIA_TYPE = "application/octet-stream"
+BINARY_MAGIC = b"CSTL"
+BINARY_VERSION = 1
+
+
+def to_epoch_ms(value: datetime) -> int:
+    """Milliseconds since 1970-01-01 for a naive UTC datetime (negative before it)."""
+    return (value - UNIX_EPOCH) // ONE_MS
+
+
+def _epoch_entry(epoch) -> dict:
+    return {
+        "name": epoch.name,
+        "color": epoch.color,
+        "start_date": to_epoch_ms(epoch.start_date),
+        "end_date": to_epoch_ms(epoch.end_date),
+    }
+
+
+def _category_entry(category) -> dict:
+    return {"name": category.name, "color": category.color, "icon": category.icon}
+
+
+def build_payload(columns: dict, epochs: List, categories: List) -> dict:
+    """Assemble the columnar timeline payload.
+
+    ``columns`` comes from ``CRUDEvent.get_columns``; ``epochs`` and
+    ``categories`` are the reference rows, of which only those referenced
+    by the events are included, once each.
+    """
+    used_epochs = set(columns["epoch_ids"])
+    used_categories = set(columns["category_ids"])
+    return {
+        "count": len(columns["ids"]),
+        "ids": columns["ids"],
+        "dates": [to_epoch_ms(date) for date in columns["dates"]],
+        "importance": [value or 0 for value in columns["importance"]],
+        "epoch_ids": columns["epoch_ids"],
+        "category_offsets": columns["category_offsets"],
+        "category_ids": columns["category_ids"],
+        "epochs": {str(e.id): _epoch_entry(e) for e in epochs if e.id in used_epochs},
+        "categories": {str(c.id): _category_entry(c) for c in categories if c.id in used_categories},
+    }
+
+
+def _packed(typecode: str, values) -> bytes:
+    packed = array(typecode, values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def encode_binary(payload: dict) -> bytes:
+    """Pack a timeline payload into little-endian typed arrays.
+
+    Layout (offsets in bytes)::
+
+        0   "CSTL"  u32 version  u32 count (n)  u32 category links (m)
+        16  u32 dictionary length (d)
+        20  dictionary JSON ({"epochs": ..., "categories": ...}), zero-padded
+            so that the arrays start on an 8-byte boundary
+            i64 dates[n] | u32 ids[n] | i32 epoch_ids[n] (-1 if none)
+            u32 category_offsets[n + 1] | u32 category_ids[m] | u8 importance[n]
+
+    Every array can be viewed in place with a JavaScript typed array.
+    """
+    dictionary = json.dumps(
+        {"epochs": payload["epochs"], "categories": payload["categories"]},
+        separators=(",", ":"),
+    ).encode()
+    header = struct.pack(
+        "<4sIIII",
+        BINARY_MAGIC,
+        BINARY_VERSION,
+        payload["count"],
+        len(payload["category_ids"]),
+        len(dictionary),
+    )
+    padding = b"\0" * (-(len(header) + len(dictionary)) % 8)
+    return b"".join([
+        header,
+        dictionary,
+        padding,
+        _packed("q", payload["dates"]),
+        _packed("I", payload["ids"]),
+        _packed("i", [-1 if e is None else e for e in payload["epoch_ids"]]),
+        _packed("I", payload["category_offsets"]),
+        _packed("I", payload["category_ids"]),
+        _packed("B", payload["importance"]),
+    ])
@@ -0,0 +1,111 @@
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class InMemoryBackend:
+    """Process-local stand-in for a shared cache backend.
+
+    Used in tests (share one instance between caches to simulate several
+    workers) and via ``CACHE_BACKEND_URL=memory://``.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[int]:
+        return self._data.get(key)
+
+    async def incr(self, key: str) -> int:
+        self._data[key] = self._data.get(key, 0) + 1
+        return self._data[key]
+
+
+class RedisBackend:
+    """Shared backend on Redis; requires the optional ``redis`` package."""
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as aioredis
+        except ImportError as exc:
+            raise RuntimeError("A redis:// CACHE_BACKEND_URL requires the 'redis' package") from exc
+        self._client = aioredis.from_url(url)
+
+    async def get(self, key: str) -> Optional[int]:
+        value = await self._client.get(key)
+        return int(value) if value is not None else None
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(key)
+
+
+def backend_from_url(url: Optional[str]):
+    """Build the shared cache backend configured by ``CACHE_BACKEND_URL``."""
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return InMemoryBackend()
+    return RedisBackend(url)
+
+
+class ReferenceCache:
+    """Read-through cache for small, rarely changing tables.
+
+    Values live in process memory with a TTL. Every entry is tagged with
+    the namespace version current when it was loaded; ``invalidate`` bumps
+    that version. With a shared backend the version counter lives there,
+    so a write in one worker invalidates the entries of all workers at the
+    cost of one backend read per lookup instead of a database query.
+    """
+
+    def __init__(self, namespace: str, ttl: float, backend=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._version = 0
+        self._entries: Dict[Hashable, Tuple[float, int, Any]] = {}
+
+    @property
+    def _version_key(self) -> str:
+        return f"chronospace:cache:{self.namespace}:version"
+
+    async def _current_version(self) -> int:
+        if self.backend is None:
+            return self._version
+        return await self.backend.get(self._version_key) or 0
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for ``key``, calling ``load`` on a miss.
+
+        ``None`` results are not cached.
+        """
+        version = await self._current_version()
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now and entry[1] == version:
+            self.hits += 1
+            return entry[2]
+
+        self.misses += 1
+        value = await load()
+        if value is not None:
+            self._entries[key] = (now + self.ttl, version, value)
+        return value
+
+    async def invalidate(self) -> None:
+        """Drop every entry here and, through the backend, in other workers."""
+        self._entries.clear()
+        if self.backend is None:
+            self._version += 1
+        else:
+            await self.backend.incr(self._version_key)
+
+    def clear(self) -> None:
+        """Drop local entries and reset the counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -1,11 +1,58 @@
+import json
 from datetime import datetime
-from typing import List, Optional, Any
-from sqlalchemy import select
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Optional, Any, Sequence, Set, Tuple, Union
+from sqlalchemy import DateTime, and_, bindparam, case, delete, func, insert, literal, or_, select, tuple_, update
+from sqlalchemy.exc import DBAPIError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from ..db.models import Event, Category, Epoch
-from ..schemas.event import EventCreate, CategoryCreate, EpochCreate
+from ..core.changes import ChangeFeed
+from ..core.config import settings
+from ..core.timeline import UNIX_EPOCH
+from ..db.cache import ReferenceCache, backend_from_url
+from ..db.functions import epoch_seconds, floor_int, insert_on_conflict
+from ..db.search import match_subquery, search_terms
+from ..db.spatial import BoxFilter, radius_boxes, split_bbox, within_radius
+from ..db import stats
+from ..db.models import Event, Category, Epoch, EventChange, TableVersion, event_category
+from ..schemas import event as schemas
+from ..schemas.event import (
+    EventCreate, EventUpdate, EventUpsert, CategoryCreate, EpochCreate,
+    BulkRowError, EventBulkResult, EventUpsertResult
+)
+
+# Conditional updates that lost a race are retried this often from fresh data
+UPDATE_ATTEMPTS = 3
+
+class VersionConflict(Exception):
+    """The event is not at the version the write was conditioned on."""
+
+async def touch_tables(db: AsyncSession, *tables: str) -> None:
+    """Bump the write counters of ``tables``; call first in a write transaction.
+
+    The update locks the counter rows until commit, so writers of a table
+    take turns from here on. Change log rows are inserted after it, so
+    their sequence numbers follow commit order.
+    """
+    await db.execute(
+        update(TableVersion)
+        .where(TableVersion.table_name.in_(tables))
+        .values(version=TableVersion.version + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+async def get_table_versions(
+    db: AsyncSession, *tables: str
+) -> Tuple[Tuple[int, ...], Optional[datetime]]:
+    """Return the write counters of ``tables`` and the time of the latest write."""
+    result = await db.execute(
+        select(TableVersion.table_name, TableVersion.version, TableVersion.updated_at)
+        .where(TableVersion.table_name.in_(tables))
+    )
+    rows = {row.table_name: row for row in result}
+    versions = tuple(rows[t].version if t in rows else 0 for t in tables)
+    last_modified = max((row.updated_at for row in rows.values()), default=None)
+    return versions, last_modified
 
 class CRUDBase:
     def __init__(self, model):
@@ -25,8 +72,17 @@ class CRUDBase:
         )
         return list(result.scalars().all())
 
+    async def get_many(self, db: AsyncSession, ids: Sequence[int]) -> List[Optional[Any]]:
+        """Rows for ``ids`` in the given order, ``None`` where an id does not exist."""
+        result = await db.execute(
+            select(self.model).where(self.model.id.in_(set(ids)))
+        )
+        found = {obj.id: obj for obj in result.scalars()}
+        return [found.get(id) for id in ids]
+
     async def create(self, db: AsyncSession, *, obj_in: Any) -> Any:
         db_obj = self.model(**obj_in.dict())
+        await touch_tables(db, self.model.__tablename__)
         db.add(db_obj)
         await db.commit()
         await db.refresh(db_obj)
@@ -35,13 +91,92 @@ class CRUDBase:
     async def delete(self, db: AsyncSession, *, id: int) -> bool:
         obj = await self.get(db, id)
         if obj:
+            await touch_tables(db, self.model.__tablename__)
             await db.delete(obj)
             await db.commit()
             return True
         return False
 
+# Relationships serialized with every event. All queries returning Event
+# objects load them this way; lazy loading is disabled on the model.
+EVENT_LOAD_OPTIONS = (selectinload(Event.categories), selectinload(Event.epoch))
+
+def _is_external_id_conflict(exc: IntegrityError) -> bool:
+    # SQLite names the column, PostgreSQL the unique index
+    message = str(exc.orig)
+    return "events.external_id" in message or "ix_events_external_id" in message
+
+def _facts(obj: Event) -> stats.EventFacts:
+    # Needs obj.categories loaded
+    return obj.epoch_id, [c.id for c in obj.categories], obj.date, obj.importance
+
 class CRUDEvent(CRUDBase):
+    def __init__(self, model, feed: ChangeFeed):
+        super().__init__(model)
+        self.feed = feed
+
+    def select(self, *columns):
+        """``SELECT`` of events (and extra ``columns``) with the related rows eager-loaded."""
+        return select(Event, *columns).options(*EVENT_LOAD_OPTIONS)
+
+    async def get(self, db: AsyncSession, id: int) -> Optional[Event]:
+        # populate_existing also loads the relationships of an event already in the session
+        result = await db.execute(
+            self.select().where(Event.id == id).execution_options(populate_existing=True)
+        )
+        return result.scalar_one_or_none()
+
+    async def _log_changes(self, db: AsyncSession, op: str, ids: Sequence[int]) -> List[dict]:
+        """Append ``op`` for ``ids`` to the change log; publish the result after committing."""
+        if not ids:
+            return []
+        result = await db.execute(
+            insert(EventChange).returning(
+                EventChange.id.label("seq"), EventChange.op, EventChange.event_id,
+                sort_by_parameter_order=True
+            ),
+            [{"op": op, "event_id": id} for id in ids]
+        )
+        return [dict(row._mapping) for row in result]
+
+    async def _check_event_references(
+        self, db: AsyncSession, epoch_id: Optional[int], category_ids: Optional[Set[int]]
+    ) -> None:
+        """ValueError unless the epoch (if given) and all ``category_ids`` exist."""
+        if epoch_id is not None:
+            found = await db.execute(select(Epoch.id).where(Epoch.id == epoch_id))
+            if found.first() is None:
+                raise ValueError(f"Epoch {epoch_id} not found")
+        if category_ids:
+            found = await db.execute(select(Category.id).where(Category.id.in_(category_ids)))
+            missing = sorted(category_ids - set(found.scalars()))
+            if missing:
+                raise ValueError(f"Categories not found: {missing}")
+
+    async def get_many(self, db: AsyncSession, ids: Sequence[int]) -> List[Optional[Event]]:
+        """Events for ``ids`` in the given order (``None`` where missing).
+
+        One ``IN`` query for the events plus one per relationship.
+        """
+        result = await db.execute(self.select().where(Event.id.in_(set(ids))))
+        found = {obj.id: obj for obj in result.scalars()}
+        return [found.get(id) for id in ids]
+
+    async def get_changes(
+        self, db: AsyncSession, *, since: int = 0, limit: Optional[int] = 1000
+    ) -> List[dict]:
+        """Logged changes with a sequence number above ``since``, oldest first."""
+        result = await db.execute(
+            select(EventChange.id.label("seq"), EventChange.op, EventChange.event_id)
+            .where(EventChange.id > since)
+            .order_by(EventChange.id)
+            .limit(limit)
+        )
+        return [dict(row._mapping) for row in result]
+
     async def create(self, db: AsyncSession, *, obj_in: EventCreate) -> Event:
+        """Create the event; ValueError for unknown references or a taken external_id."""
+        await self._check_event_references(db, obj_in.epoch_id, None)
         # Get categories
         category_ids = obj_in.category_ids
         obj_data = obj_in.dict(exclude={'category_ids'})
@@ -49,17 +184,672 @@ class CRUDEvent(CRUDBase):
         # Create event
         db_obj = Event(**obj_data)
 
-        # Add categories
+        # Add categories (always assigned, so the collection counts as loaded)
+        categories = []
         if category_ids:
-            categories = await db.execute(
+            result = await db.execute(
                 select(Category).where(Category.id.in_(category_ids))
             )
-            db_obj.categories = categories.scalars().all()
+            categories = result.scalars().all()
+            missing = sorted(set(category_ids) - {category.id for category in categories})
+            if missing:
+                raise ValueError(f"Categories not found: {missing}")
+        db_obj.categories = categories
 
+        await touch_tables(db, "events")
         db.add(db_obj)
+        try:
+            await db.flush()
+        except IntegrityError as exc:
+            await db.rollback()
+            if not _is_external_id_conflict(exc):
+                raise
+            raise ValueError(f"external_id {obj_in.external_id!r} is already in use")
+        await stats.add_event_stats(db, [_facts(db_obj)])
+        changes = await self._log_changes(db, "create", [db_obj.id])
         await db.commit()
-        await db.refresh(db_obj)
-        return db_obj
+        self.feed.publish(changes)
+        return await self.get(db, db_obj.id)
+
+    async def delete(self, db: AsyncSession, *, id: int) -> bool:
+        obj = await self.get(db, id)
+        if obj is None:
+            return False
+        facts = _facts(obj)
+        await touch_tables(db, "events")
+        await db.delete(obj)
+        await db.flush()
+        await stats.remove_event_stats(db, [facts])
+        changes = await self._log_changes(db, "delete", [id])
+        await db.commit()
+        self.feed.publish(changes)
+        return True
+
+    async def _current(self, db: AsyncSession, condition, *, lock: bool = False) -> dict:
+        """``{id: (row mapping, set of category ids)}`` of the events matching ``condition``.
+
+        One query; ``lock`` takes row locks on the events (``FOR UPDATE``
+        where the database has it).
+        """
+        query = (
+            select(*Event.__table__.c, event_category.c.category_id)
+            .outerjoin(event_category, event_category.c.event_id == Event.id)
+            .where(condition)
+        )
+        if lock:
+            query = query.with_for_update(of=Event.__table__)
+        current = {}
+        for row in (await db.execute(query)).mappings():
+            _, linked = current.setdefault(row["id"], (row, set()))
+            if row["category_id"] is not None:
+                linked.add(row["category_id"])
+        return current
+
+    async def _relink(self, db: AsyncSession, diffs: Iterable[Tuple[int, Set[int], Set[int]]]) -> None:
+        """Apply ``(event id, added, removed)`` category diffs: one executemany per direction."""
+        added, removed = [], []
+        for event_id, add, remove in diffs:
+            added += [{"event_id": event_id, "category_id": c} for c in add]
+            removed += [{"link_event": event_id, "link_category": c} for c in remove]
+        if removed:
+            await db.execute(
+                delete(event_category).where(
+                    event_category.c.event_id == bindparam("link_event"),
+                    event_category.c.category_id == bindparam("link_category")
+                ),
+                removed
+            )
+        if added:
+            await db.execute(insert(event_category), added)
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        id: int,
+        obj_in: EventUpdate,
+        versions: Optional[Set[int]] = None
+    ) -> Optional[Event]:
+        """Change the fields set in ``obj_in``; None if the event does not exist.
+
+        With ``versions`` (from If-Match) the event is only changed while
+        its version is one of them, else VersionConflict. The write itself
+        is ``UPDATE .. WHERE version = <version read>``: losing a race to
+        another writer means starting over from its result, never
+        overwriting it. Category links are diffed, so only links that come
+        or go are written. An update that changes nothing is not a write.
+        Raises ValueError for unknown references or a taken external_id.
+        """
+        values = obj_in.model_dump(exclude_unset=True, exclude={"category_ids"})
+        wanted = set(obj_in.category_ids) if obj_in.category_ids is not None else None
+        await self._check_event_references(db, values.get("epoch_id"), wanted)
+
+        for _ in range(UPDATE_ATTEMPTS):
+            found = await self._current(db, Event.id == id)
+            if not found:
+                return None
+            row, linked = found[id]
+            if versions is not None and row["version"] not in versions:
+                raise VersionConflict(f"Event {id} is at version {row['version']}")
+            changed = {name: value for name, value in values.items() if row[name] != value}
+            categories = linked if wanted is None else wanted
+            if not changed and categories == linked:
+                return await self.get(db, id)
+
+            await touch_tables(db, "events")
+            try:
+                written = await db.execute(
+                    update(Event)
+                    .where(Event.id == id, Event.version == row["version"])
+                    .values(**changed, version=Event.version + 1, updated_at=datetime.utcnow())
+                    .returning(Event.version)
+                    .execution_options(synchronize_session=False)
+                )
+            except IntegrityError as exc:
+                await db.rollback()
+                if not _is_external_id_conflict(exc):
+                    raise
+                raise ValueError(f"external_id {values.get('external_id')!r} is already in use")
+            if written.first() is None:
+                # Another writer got there first; start over from what it wrote
+                await db.rollback()
+                continue
+
+            await self._relink(db, [(id, categories - linked, linked - categories)])
+            new = {**row, **changed}
+            old_facts = (row["epoch_id"], sorted(linked), row["date"], row["importance"])
+            new_facts = (new["epoch_id"], sorted(categories), new["date"], new["importance"])
+            if old_facts != new_facts:
+                await stats.remove_event_stats(db, [old_facts])
+                await stats.add_event_stats(db, [new_facts])
+            changes = await self._log_changes(db, "update", [id])
+            await db.commit()
+            self.feed.publish(changes)
+            return await self.get(db, id)
+        raise VersionConflict(f"Event {id} kept changing; try again")
+
+    async def upsert_bulk(self, db: AsyncSession, *, rows: Sequence[EventUpsert]) -> EventUpsertResult:
+        """Create or update events keyed by ``external_id``, in one transaction.
+
+        The existing rows are read (and locked) with one query, rows that
+        would not change are skipped, and the rest are written with a single
+        executemany ``INSERT .. ON CONFLICT (external_id) DO UPDATE`` that
+        bumps the version of updated rows. Category links are diffed per
+        event. A row carrying ``version`` is rejected unless the stored
+        event is at that version. Rejected rows are listed in ``errors``;
+        the others are written. Re-sending the same rows changes nothing.
+        """
+        result = EventUpsertResult(ids=[None] * len(rows))
+        candidates, seen = [], set()
+        for index, obj in enumerate(rows):
+            if obj.external_id in seen:
+                result.errors.append(BulkRowError(index=index, detail="Duplicate external_id in request"))
+            else:
+                seen.add(obj.external_id)
+                candidates.append((index, obj))
+        candidates = await self._check_references(db, candidates, result.errors, set(), set())
+        if not candidates:
+            return result
+
+        await touch_tables(db, "events")
+        current = await self._current(
+            db, Event.external_id.in_([obj.external_id for _, obj in candidates]), lock=True
+        )
+        existing = {row["external_id"]: (row, linked) for row, linked in current.values()}
+        pending = []
+        for index, obj in candidates:
+            values = obj.model_dump(exclude={"category_ids", "version"})
+            row, linked = existing.get(obj.external_id, (None, set()))
+            found_version = row["version"] if row is not None else None
+            if obj.version is not None and obj.version != found_version:
+                result.errors.append(BulkRowError(
+                    index=index, detail=f"Version conflict: expected {obj.version}, found {found_version}"
+                ))
+            elif row is not None and set(obj.category_ids) == linked and all(
+                row[name] == value for name, value in values.items()
+            ):
+                result.ids[index] = row["id"]
+                result.unchanged += 1
+            else:
+                pending.append((index, obj, values, row, linked))
+        if not pending:
+            await db.rollback()
+            return result
+
+        events = Event.__table__
+        stmt = insert_on_conflict(db.get_bind().dialect.name, events)
+        columns = [name for name in pending[0][2] if name != "external_id"]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[events.c.external_id],
+            set_={
+                **{name: stmt.excluded[name] for name in columns},
+                "version": events.c.version + 1,
+                "updated_at": stmt.excluded.updated_at,
+            }
+        ).returning(events.c.id, events.c.external_id, events.c.version)
+        now = datetime.utcnow()
+        written = await db.execute(stmt, [
+            {**values, "version": 1, "created_at": now, "updated_at": now}
+            for _, _, values, _, _ in pending
+        ])
+        stored = {row.external_id: (row.id, row.version) for row in written}
+
+        created, updated, diffs, old_facts, new_facts = [], [], [], [], []
+        for index, obj, values, row, linked in pending:
+            id, version = stored[obj.external_id]
+            if version != (row["version"] + 1 if row is not None else 1):
+                # Inserted or updated by someone else since we read it
+                await db.rollback()
+                raise VersionConflict(f"Event {obj.external_id!r} changed concurrently; try again")
+            wanted = set(obj.category_ids)
+            diffs.append((id, wanted - linked, linked - wanted))
+            new_facts.append((obj.epoch_id, sorted(wanted), obj.date, obj.importance))
+            if row is None:
+                created.append(id)
+            else:
+                updated.append(id)
+                old_facts.append((row["epoch_id"], sorted(linked), row["date"], row["importance"]))
+            result.ids[index] = id
+        await self._relink(db, diffs)
+        await stats.remove_event_stats(db, old_facts)
+        await stats.add_event_stats(db, new_facts)
+        changes = await self._log_changes(db, "create", created)
+        changes += await self._log_changes(db, "update", updated)
+        await db.commit()
+        self.feed.publish(changes)
+        result.created, result.updated = len(created), len(updated)
+        return result
+
+    async def _log_changes_where(self, db: AsyncSession, op: str, ids) -> List[dict]:
+        """Append ``op`` for the events selected by ``ids`` with one ``INSERT .. SELECT``."""
+        logged = await db.execute(
+            insert(EventChange)
+            .from_select(
+                ["op", "event_id", "created_at"],
+                select(literal(op), Event.id, literal(datetime.utcnow(), DateTime))
+                .where(Event.id.in_(ids))
+                .order_by(Event.id)
+            )
+            .returning(EventChange.id.label("seq"), EventChange.op, EventChange.event_id)
+        )
+        return sorted((dict(row._mapping) for row in logged), key=lambda change: change["seq"])
+
+    async def _delete_where(self, db: AsyncSession, ids) -> List[dict]:
+        """Delete the events selected by ``ids`` (a ``SELECT`` of event ids) without committing.
+
+        A fixed number of set-based statements regardless of how many
+        events match: the statistics they contribute are aggregated first,
+        the change log rows come from ``INSERT .. SELECT``, then links and
+        events go with one ``DELETE`` each. Returns the logged changes.
+        The caller has touched ``events`` already.
+        """
+        ids = ids.correlate(None)
+        deltas = await stats.stats_where(db, Event.id.in_(ids))
+        changes = await self._log_changes_where(db, "delete", ids)
+        if not changes:
+            return []
+        await db.execute(delete(event_category).where(event_category.c.event_id.in_(ids)))
+        await db.execute(
+            delete(Event).where(Event.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        await stats.subtract_stats(db, deltas)
+        return changes
+
+    async def delete_where(
+        self, db: AsyncSession, *, before: Optional[datetime] = None, **filters: Any
+    ) -> int:
+        """Delete every event matching the list ``filters`` (and dated before ``before``).
+
+        Meant for pruning: the work is done by a constant number of
+        statements in one transaction. Returns the number of deleted events.
+        """
+        ids = self.filter_query(select(Event.id), **filters)
+        if before is not None:
+            ids = ids.where(Event.date < before)
+        await touch_tables(db, "events")
+        changes = await self._delete_where(db, ids)
+        if not changes:
+            await db.rollback()
+            return 0
+        await db.commit()
+        self.feed.publish(changes)
+        return len(changes)
+
+    async def create_bulk(
+        self,
+        db: AsyncSession,
+        *,
+        rows: Union[Iterable[Any], AsyncIterable[Any]],
+        chunk_size: int = 1000
+    ) -> EventBulkResult:
+        """Validate and insert many events, committing every ``chunk_size`` rows.
+
+        Each row is a dict or a JSON-encoded line. Rows that fail validation
+        or reference unknown epochs/categories are reported by their
+        zero-based index in ``errors`` and the rest of the batch goes on.
+        """
+        result = EventBulkResult()
+        known_epochs: Set[int] = set()
+        known_categories: Set[int] = set()
+        chunk = []
+        index = 0
+        async for raw in _aiter(rows):
+            chunk.append((index, raw))
+            index += 1
+            if len(chunk) >= chunk_size:
+                await self._create_chunk(db, chunk, result, known_epochs, known_categories)
+                chunk = []
+        if chunk:
+            await self._create_chunk(db, chunk, result, known_epochs, known_categories)
+        return result
+
+    async def _create_chunk(
+        self,
+        db: AsyncSession,
+        chunk: List[Tuple[int, Any]],
+        result: EventBulkResult,
+        known_epochs: Set[int],
+        known_categories: Set[int]
+    ) -> None:
+        valid = []
+        for index, raw in chunk:
+            try:
+                if isinstance(raw, (str, bytes)):
+                    raw = json.loads(raw)
+                valid.append((index, EventCreate.model_validate(raw)))
+            except ValueError as exc:
+                result.errors.append(BulkRowError(index=index, detail=_describe_error(exc)))
+
+        insertable = await self._check_references(db, valid, result.errors, known_epochs, known_categories)
+        if not insertable:
+            return
+
+        try:
+            await touch_tables(db, "events")
+            ids = await self._insert_events(db, [obj for _, obj in insertable])
+            changes = await self._log_changes(db, "create", ids)
+            await db.commit()
+            self.feed.publish(changes)
+        except DBAPIError:
+            await db.rollback()
+            # Retry row by row so that one bad row only rejects itself
+            ids = []
+            for index, obj in insertable:
+                try:
+                    await touch_tables(db, "events")
+                    row_ids = await self._insert_events(db, [obj])
+                    changes = await self._log_changes(db, "create", row_ids)
+                    await db.commit()
+                    self.feed.publish(changes)
+                    ids.extend(row_ids)
+                except DBAPIError as exc:
+                    await db.rollback()
+                    result.errors.append(BulkRowError(index=index, detail=str(exc.orig)))
+        result.ids.extend(ids)
+        result.created += len(ids)
+
+    async def _check_references(
+        self,
+        db: AsyncSession,
+        rows: List[Tuple[int, Any]],
+        errors: List[BulkRowError],
+        known_epochs: Set[int],
+        known_categories: Set[int]
+    ) -> List[Tuple[int, Any]]:
+        """The ``(index, obj)`` rows whose epoch and categories exist; errors for the rest.
+
+        All references are resolved with one query per table, skipping ids
+        already confirmed by earlier calls.
+        """
+        epoch_ids = {obj.epoch_id for _, obj in rows} - known_epochs
+        if epoch_ids:
+            found = await db.execute(select(Epoch.id).where(Epoch.id.in_(epoch_ids)))
+            known_epochs.update(found.scalars())
+        category_ids = {c for _, obj in rows for c in obj.category_ids} - known_categories
+        if category_ids:
+            found = await db.execute(select(Category.id).where(Category.id.in_(category_ids)))
+            known_categories.update(found.scalars())
+
+        checked = []
+        for index, obj in rows:
+            missing = sorted(set(obj.category_ids) - known_categories)
+            if obj.epoch_id not in known_epochs:
+                errors.append(BulkRowError(index=index, detail=f"Epoch {obj.epoch_id} not found"))
+            elif missing:
+                errors.append(BulkRowError(index=index, detail=f"Categories not found: {missing}"))
+            else:
+                checked.append((index, obj))
+        return checked
+
+    async def _insert_events(self, db: AsyncSession, objs: List[EventCreate]) -> List[int]:
+        """Insert events and their category links with two executemany statements.
+
+        Also counts them in the epoch/category statistics.
+        """
+        inserted = await db.execute(
+            insert(Event).returning(Event.id, sort_by_parameter_order=True),
+            [obj.dict(exclude={'category_ids'}) for obj in objs]
+        )
+        ids = list(inserted.scalars())
+        links = [
+            {"event_id": event_id, "category_id": category_id}
+            for event_id, obj in zip(ids, objs)
+            for category_id in set(obj.category_ids)
+        ]
+        if links:
+            await db.execute(insert(event_category), links)
+        await stats.add_event_stats(db, [
+            (obj.epoch_id, obj.category_ids, obj.date, obj.importance) for obj in objs
+        ])
+        return ids
+
+    def filter_query(
+        self,
+        query,
+        *,
+        category_ids: Optional[Sequence[int]] = None,
+        category_match: str = "any",
+        epoch_ids: Optional[Sequence[int]] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        near: Optional[Tuple[float, float]] = None,
+        radius_km: Optional[float] = None
+    ):
+        """Apply the event list filters to a query selecting from ``events``.
+
+        Category filters are evaluated as a subquery on ``event_category``
+        rather than a join, so each event appears at most once and
+        ``LIMIT`` counts events, not links. With ``category_match="all"``
+        an event must belong to every requested category.
+
+        ``bbox`` is ``(min_lon, min_lat, max_lon, max_lat)``; ``near`` is
+        ``(lat, lon)`` and needs ``radius_km``. Both go through the spatial
+        index and only match events with coordinates.
+        """
+        if category_ids:
+            wanted = set(category_ids)
+            linked = select(event_category.c.event_id).where(
+                event_category.c.category_id.in_(wanted)
+            )
+            if category_match == "all" and len(wanted) > 1:
+                linked = linked.group_by(event_category.c.event_id).having(
+                    func.count(event_category.c.category_id) == len(wanted)
+                )
+            query = query.where(Event.id.in_(linked))
+        if epoch_ids:
+            query = query.where(Event.epoch_id.in_(set(epoch_ids)))
+        if start_date:
+            query = query.where(Event.date >= start_date)
+        if end_date:
+            query = query.where(Event.date <= end_date)
+        if bbox is not None:
+            query = query.where(
+                BoxFilter(Event.id, Event.latitude, Event.longitude, split_bbox(*bbox))
+            )
+        if near is not None and radius_km is not None:
+            lat, lon = near
+            query = query.where(
+                BoxFilter(Event.id, Event.latitude, Event.longitude, radius_boxes(lat, lon, radius_km)),
+                within_radius(Event.latitude, Event.longitude, lat, lon, radius_km)
+            )
+        return query
+
+    async def search(
+        self,
+        db: AsyncSession,
+        *,
+        q: str,
+        limit: int = 100,
+        after: Optional[Tuple[float, int]] = None,
+        **filters: Any
+    ) -> List[Tuple[Event, float]]:
+        """Full-text search over title, description and location.
+
+        Returns ``(event, score)`` pairs, best match first (ties by id).
+        Matching runs on the FTS5 table (SQLite) or the GIN-indexed
+        tsvector column (PostgreSQL); ``after`` is the ``(score, id)`` of the
+        last row of the previous page.
+        """
+        if not search_terms(q):
+            return []
+        matches = match_subquery(db.get_bind().dialect.name, q)
+        query = self.select(matches.c.score).join(matches, matches.c.id == Event.id)
+        query = self.filter_query(query, **filters)
+        if after is not None:
+            score, id = after
+            query = query.where(or_(
+                matches.c.score < score,
+                and_(matches.c.score == score, Event.id > id)
+            ))
+        query = query.order_by(matches.c.score.desc(), Event.id).limit(limit)
+        result = await db.execute(query)
+        return [(row[0], row[1]) for row in result.all()]
+
+    async def get_validator(
+        self, db: AsyncSession, id: int
+    ) -> Optional[Tuple[Any, datetime]]:
+        """Return ``(etag parts, last modified)`` for one event, or None if missing.
+
+        The parts start with the event's version (see ``make_version_etag``).
+        Nested epoch/category data can change without touching the event
+        row, so their table versions are part of the validator.
+        """
+        result = await db.execute(select(Event.version, Event.updated_at).where(Event.id == id))
+        row = result.one_or_none()
+        if row is None:
+            return None
+        versions, last_modified = await get_table_versions(db, "categories", "epochs")
+        return (row.version, id, versions), max(row.updated_at, last_modified or row.updated_at)
+
+    async def get_columns(self, db: AsyncSession, **filters: Any) -> dict:
+        """Return the filtered events as parallel lists, ordered by ``(date, id)``.
+
+        Only the columns needed to place events on the timeline are
+        selected and no ORM objects are built. Category links are returned
+        CSR-style: the categories of event ``i`` are
+        ``category_ids[category_offsets[i]:category_offsets[i + 1]]``.
+        """
+        query = select(
+            Event.id, Event.date, Event.importance, Event.epoch_id,
+            event_category.c.category_id
+        ).outerjoin(event_category, event_category.c.event_id == Event.id)
+        query = self.filter_query(query, **filters)
+        query = query.order_by(Event.date, Event.id, event_category.c.category_id)
+        result = await db.execute(query)
+
+        ids, dates, importance, epoch_ids = [], [], [], []
+        category_offsets, category_ids = [0], []
+        for id, date, event_importance, epoch_id, category_id in result:
+            if not ids or ids[-1] != id:
+                ids.append(id)
+                dates.append(date)
+                importance.append(event_importance)
+                epoch_ids.append(epoch_id)
+                category_offsets.append(len(category_ids))
+            if category_id is not None:
+                category_ids.append(category_id)
+                category_offsets[-1] = len(category_ids)
+        return {
+            "ids": ids,
+            "dates": dates,
+            "importance": importance,
+            "epoch_ids": epoch_ids,
+            "category_offsets": category_offsets,
+            "category_ids": category_ids,
+        }
+
+    async def get_dates(self, db: AsyncSession, **filters: Any) -> Tuple[List[int], List[datetime]]:
+        """Ids and dates of the filtered events, ordered by ``(date, id)``."""
+        query = self.filter_query(select(Event.id, Event.date), **filters)
+        result = await db.execute(query.order_by(Event.date, Event.id))
+        ids, dates = [], []
+        for id, date in result:
+            ids.append(id)
+            dates.append(date)
+        return ids, dates
+
+    async def get_date_range(
+        self, db: AsyncSession, **filters: Any
+    ) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Earliest and latest date among the filtered events."""
+        query = self.filter_query(select(func.min(Event.date), func.max(Event.date)), **filters)
+        result = await db.execute(query)
+        return tuple(result.one())
+
+    async def get_histogram(
+        self,
+        db: AsyncSession,
+        *,
+        start_date: datetime,
+        end_date: datetime,
+        bucket_seconds: float,
+        bucket_count: int,
+        top_k: int = 3,
+        **filters: Any
+    ) -> dict:
+        """Aggregate the filtered events into fixed-width time buckets.
+
+        Returns ``{bucket index: {"count", "max_importance", "top_event_ids"}}``
+        for non-empty buckets only. Grouping and the per-bucket top-K (by
+        importance, then date) run in SQL, so only O(buckets) rows come back.
+        """
+        offset = (start_date - UNIX_EPOCH).total_seconds()
+        bucket = floor_int((epoch_seconds(Event.date) - offset) / bucket_seconds)
+        # Events exactly on end_date belong to the last bucket
+        bucket = case((bucket >= bucket_count, bucket_count - 1), else_=bucket)
+        # Computing the bucket in a subquery lets the outer queries group on
+        # a plain column, which Postgres needs when the expression has binds
+        bucketed = self.filter_query(
+            select(bucket.label("bucket"), Event.id, Event.date, Event.importance),
+            start_date=start_date,
+            end_date=end_date,
+            **filters
+        ).subquery()
+
+        totals = await db.execute(
+            select(bucketed.c.bucket, func.count(), func.max(bucketed.c.importance))
+            .group_by(bucketed.c.bucket)
+        )
+        buckets = {
+            index: {"count": count, "max_importance": max_importance, "top_event_ids": []}
+            for index, count, max_importance in totals
+        }
+
+        if top_k > 0 and buckets:
+            ranked = select(
+                bucketed.c.bucket,
+                bucketed.c.id,
+                func.row_number().over(
+                    partition_by=bucketed.c.bucket,
+                    order_by=(
+                        func.coalesce(bucketed.c.importance, 0).desc(),
+                        bucketed.c.date,
+                        bucketed.c.id
+                    )
+                ).label("rank")
+            ).subquery()
+            top = await db.execute(
+                select(ranked.c.bucket, ranked.c.id)
+                .where(ranked.c.rank <= top_k)
+                .order_by(ranked.c.bucket, ranked.c.rank)
+            )
+            for index, id in top:
+                buckets[index]["top_event_ids"].append(id)
+        return buckets
+
+    async def stream_rows(
+        self,
+        db: AsyncSession,
+        *,
+        batch_size: int = 1000,
+        **filters: Any
+    ) -> AsyncIterator[dict]:
+        """Yield filtered events as plain dicts, ordered by ``(date, id)``.
+
+        Rows are read through a server-side cursor ``batch_size`` at a time,
+        so memory use does not grow with the size of the result. Category
+        links come from an outer join and are folded into ``category_ids``.
+        """
+        query = select(
+            *Event.__table__.c,
+            event_category.c.category_id
+        ).outerjoin(event_category, event_category.c.event_id == Event.id)
+        query = self.filter_query(query, **filters)
+        query = query.order_by(Event.date, Event.id, event_category.c.category_id)
+
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        current = None
+        async for row in result.mappings():
+            if current is None or row["id"] != current["id"]:
+                if current is not None:
+                    yield current
+                current = {key: value for key, value in row.items() if key != "category_id"}
+                current["category_ids"] = []
+            if row["category_id"] is not None:
+                current["category_ids"].append(row["category_id"])
+        if current is not None:
+            yield current
 
     async def get_multi(
         self,
@@ -67,44 +857,203 @@ class CRUDEvent(CRUDBase):
         *,
         skip: int = 0,
         limit: int = 100,
-        category_id: Optional[int] = None,
-        epoch_id: Optional[int] = None,
-        start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        after: Optional[Tuple[datetime, int]] = None,
+        **filters: Any
     ) -> List[Event]:
-        query = select(Event).options(
-            selectinload(Event.categories),
-            selectinload(Event.epoch)
-        )
+        """List events ordered by ``(date, id)``.
 
-        if category_id:
-            query = query.join(Event.categories).filter(Category.id == category_id)
-        if epoch_id:
-            query = query.filter(Event.epoch_id == epoch_id)
-        if start_date:
-            query = query.filter(Event.date >= start_date)
-        if end_date:
-            query = query.filter(Event.date <= end_date)
+        When ``after`` is given the page starts right after that key using a
+        seek predicate instead of ``OFFSET``, so deep pages cost the same as
+        the first one and stay stable while new events are inserted.
+        """
+        query = self.filter_query(self.select(), **filters)
 
-        query = query.offset(skip).limit(limit)
+        query = query.order_by(Event.date, Event.id)
+        if after is not None:
+            query = query.where(tuple_(Event.date, Event.id) > after)
+        else:
+            query = query.offset(skip)
+        query = query.limit(limit)
         result = await db.execute(query)
         return list(result.scalars().all())
 
-class CRUDCategory(CRUDBase):
-    async def get_by_name(self, db: AsyncSession, name: str) -> Optional[Category]:
+async def _aiter(rows: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    if hasattr(rows, "__aiter__"):
+        async for row in rows:
+            yield row
+    else:
+        for row in rows:
+            yield row
+
+def _describe_error(exc: ValueError) -> str:
+    errors = getattr(exc, "errors", None)
+    if errors is None:
+        return f"Invalid JSON: {exc}"
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in errors()
+    )
+
+class CRUDCached(CRUDBase):
+    """CRUD for small reference tables, read through a ``ReferenceCache``.
+
+    Reads return response schemas instead of ORM objects so that cached
+    values never hold on to a session. Writes invalidate the cache.
+    """
+
+    # Scope of the table's rows in event_stats, if any
+    stats_scope: Optional[str] = None
+
+    def __init__(self, model, schema, cache: ReferenceCache):
+        super().__init__(model)
+        self.schema = schema
+        self.cache = cache
+
+    async def _fetch_one(self, db: AsyncSession, condition) -> Optional[Any]:
+        result = await db.execute(select(self.model).where(condition))
+        obj = result.scalar_one_or_none()
+        return self.schema.model_validate(obj) if obj is not None else None
+
+    async def _fetch_many(self, db: AsyncSession, skip: int, limit: Optional[int]) -> List[Any]:
         result = await db.execute(
-            select(Category).where(Category.name == name)
+            select(self.model).order_by(self.model.id).offset(skip).limit(limit)
         )
-        return result.scalar_one_or_none()
+        return [self.schema.model_validate(obj) for obj in result.scalars()]
 
-class CRUDEpoch(CRUDBase):
-    async def get_by_name(self, db: AsyncSession, name: str) -> Optional[Epoch]:
-        result = await db.execute(
-            select(Epoch).where(Epoch.name == name)
+    async def get(self, db: AsyncSession, id: int):
+        return await self.cache.get_or_load(
+            ("id", id), lambda: self._fetch_one(db, self.model.id == id)
         )
-        return result.scalar_one_or_none()
+
+    async def get_multi(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ) -> List[Any]:
+        return await self.cache.get_or_load(
+            ("list", skip, limit), lambda: self._fetch_many(db, skip, limit)
+        )
+
+    async def get_all(self, db: AsyncSession) -> List[Any]:
+        """Every row of the table; meant for small reference tables only."""
+        return await self.cache.get_or_load(
+            ("all",), lambda: self._fetch_many(db, 0, None)
+        )
+
+    async def get_many(self, db: AsyncSession, ids: Sequence[int]) -> List[Optional[Any]]:
+        # Served from the cached full table, so usually without a query
+        found = {obj.id: obj for obj in await self.get_all(db)}
+        return [found.get(id) for id in ids]
+
+    async def create(self, db: AsyncSession, *, obj_in: Any) -> Any:
+        db_obj = await super().create(db, obj_in=obj_in)
+        await self.cache.invalidate()
+        return db_obj
+
+    async def _exists(self, db: AsyncSession, id: int) -> bool:
+        result = await db.execute(select(self.model.id).where(self.model.id == id))
+        return result.scalar_one_or_none() is not None
+
+    async def _delete_row(self, db: AsyncSession, id: int) -> None:
+        """Delete the row and its statistics and commit; the caller touched the tables."""
+        await db.execute(
+            delete(self.model).where(self.model.id == id).execution_options(synchronize_session=False)
+        )
+        if self.stats_scope is not None:
+            await stats.drop_stats(db, self.stats_scope, id)
+        await db.commit()
+        await self.cache.invalidate()
+
+    async def delete(self, db: AsyncSession, *, id: int) -> bool:
+        if not await self._exists(db, id):
+            return False
+        await touch_tables(db, self.model.__tablename__)
+        await self._delete_row(db, id)
+        return True
+
+class CRUDCategory(CRUDCached):
+    stats_scope = stats.CATEGORY
+
+    def __init__(self, model, schema, cache: ReferenceCache, events: CRUDEvent):
+        super().__init__(model, schema, cache)
+        self.events = events
+
+    async def delete(self, db: AsyncSession, *, id: int) -> bool:
+        """Delete the category and, with one statement, its links to events.
+
+        Linked events are serialized with their categories, so their
+        payload changes: each is logged as an ``update``.
+        """
+        if not await self._exists(db, id):
+            return False
+        links = event_category.c.category_id == id
+        linked = await db.execute(select(event_category.c.event_id).where(links).limit(1))
+        changes = []
+        if linked.first() is None:
+            await touch_tables(db, "categories")
+        else:
+            await touch_tables(db, "categories", "events")
+            changes = await self.events._log_changes_where(
+                db, "update", select(event_category.c.event_id).where(links).correlate(None)
+            )
+        await db.execute(delete(event_category).where(links))
+        await self._delete_row(db, id)
+        self.events.feed.publish(changes)
+        return True
+
+    async def get_by_name(self, db: AsyncSession, name: str) -> Optional[schemas.Category]:
+        return await self.cache.get_or_load(
+            ("name", name), lambda: self._fetch_one(db, Category.name == name)
+        )
+
+class CRUDEpoch(CRUDCached):
+    stats_scope = stats.EPOCH
+
+    def __init__(self, model, schema, cache: ReferenceCache, events: CRUDEvent):
+        super().__init__(model, schema, cache)
+        self.events = events
+
+    async def delete(self, db: AsyncSession, *, id: int, cascade: bool = False) -> Optional[int]:
+        """Delete the epoch; returns the number of events deleted with it, None if missing.
+
+        An epoch that still has events is only deleted with ``cascade``,
+        which removes them in the same transaction; otherwise ValueError.
+        """
+        if not await self._exists(db, id):
+            return None
+        has_events = await db.execute(select(Event.id).where(Event.epoch_id == id).limit(1))
+        if has_events.first() is None:
+            await touch_tables(db, "epochs")
+            try:
+                await self._delete_row(db, id)
+            except IntegrityError:
+                # An event was added to the epoch since the check
+                await db.rollback()
+                raise ValueError(f"Epoch {id} still has events")
+            return 0
+        if not cascade:
+            raise ValueError(f"Epoch {id} still has events")
+        await touch_tables(db, "epochs", "events")
+        changes = await self.events._delete_where(db, select(Event.id).where(Event.epoch_id == id))
+        await self._delete_row(db, id)
+        self.events.feed.publish(changes)
+        return len(changes)
+
+    async def get_by_name(self, db: AsyncSession, name: str) -> Optional[schemas.Epoch]:
+        return await self.cache.get_or_load(
+            ("name", name), lambda: self._fetch_one(db, Epoch.name == name)
+        )
+
+# Shared by the reference caches; None keeps them process-local
+cache_backend = backend_from_url(settings.CACHE_BACKEND_URL)
 
 # Create CRUD instances
-event = CRUDEvent(Event)
-category = CRUDCategory(Category)
-epoch = CRUDEpoch(Epoch)
+event = CRUDEvent(Event, ChangeFeed(settings.CHANGE_FEED_QUEUE_SIZE))
+category = CRUDCategory(
+    Category, schemas.Category,
+    ReferenceCache("categories", settings.REFERENCE_CACHE_TTL, cache_backend),
+    event
+)
+epoch = CRUDEpoch(
+    Epoch, schemas.Epoch,
+    ReferenceCache("epochs", settings.REFERENCE_CACHE_TTL, cache_backend),
+    event
+)
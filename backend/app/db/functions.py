@@ -0,0 +1,47 @@
+"""Dialect-specific SQL helpers used by the aggregate queries and upserts."""
+from importlib import import_module
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Float, Integer
+
+
+class epoch_seconds(FunctionElement):
+    """Seconds since 1970-01-01 of a naive UTC ``DateTime`` column."""
+    type = Float()
+    inherit_cache = True
+
+
+@compiles(epoch_seconds)
+def _epoch_seconds_default(element, compiler, **kw):
+    return "EXTRACT(EPOCH FROM %s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(epoch_seconds, "sqlite")
+def _epoch_seconds_sqlite(element, compiler, **kw):
+    # julianday() of 1970-01-01 is 2440587.5
+    return "((julianday(%s) - 2440587.5) * 86400.0)" % compiler.process(element.clauses, **kw)
+
+
+class floor_int(FunctionElement):
+    """Largest integer not greater than the (non-negative) argument."""
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(floor_int)
+def _floor_int_default(element, compiler, **kw):
+    return "CAST(FLOOR(%s) AS INTEGER)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(floor_int, "sqlite")
+def _floor_int_sqlite(element, compiler, **kw):
+    # floor() needs SQLite's optional math functions; CAST truncates toward
+    # zero, which is the same for the non-negative values this is used with
+    return "CAST(%s AS INTEGER)" % compiler.process(element.clauses, **kw)
+
+
+def insert_on_conflict(dialect_name: str, table):
+    """``INSERT`` into ``table`` supporting ``on_conflict_do_update`` (and ``excluded``)."""
+    # Imported on first use: only the dialect actually connected to is loaded
+    return import_module(f"sqlalchemy.dialects.{dialect_name}").insert(table)
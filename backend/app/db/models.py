@@ -1,41 +1,73 @@
 from datetime import datetime
-from sqlalchemy import Integer, String, Text, DateTime, ForeignKey, Table, Column
+from typing import Optional
+from sqlalchemy import DDL, Float, Integer, String, Text, DateTime, ForeignKey, Table, Column, Index, UniqueConstraint, event
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from .base import Base
+from .search import POSTGRES_SEARCH_DDL, SQLITE_SEARCH_DDL
+from .spatial import POSTGRES_SPATIAL_DDL, SQLITE_SPATIAL_DDL
 
 # Association table for many-to-many relationship between events and categories
 event_category = Table(
     'event_category',
     Base.metadata,
-    Column('event_id', Integer, ForeignKey('events.id')),
-    Column('category_id', Integer, ForeignKey('categories.id'))
+    Column('category_id', Integer, ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True),
+    Column('event_id', Integer, ForeignKey('events.id', ondelete='CASCADE'), primary_key=True),
+    # The primary key serves category filters; this one serves loading the
+    # categories of a set of events (selectinload on Event.categories)
+    Index('ix_event_category_event_id_category_id', 'event_id', 'category_id'),
 )
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        Index('ix_events_date_id', 'date', 'id'),
+        Index('ix_events_epoch_id_date', 'epoch_id', 'date'),
+        Index('ix_events_external_id', 'external_id', unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    # Key of the event in the client's own system, used by the bulk upsert
+    external_id: Mapped[Optional[str]] = mapped_column(String(100))
     title: Mapped[str] = mapped_column(String(255), nullable=False)
-    description: Mapped[str] = mapped_column(Text)
+    description: Mapped[Optional[str]] = mapped_column(Text)
     date: Mapped[datetime] = mapped_column(DateTime, nullable=False)
-    location: Mapped[str] = mapped_column(String(255))
+    location: Mapped[Optional[str]] = mapped_column(String(255))
+    latitude: Mapped[Optional[float]] = mapped_column(Float)  # WGS84 degrees
+    longitude: Mapped[Optional[float]] = mapped_column(Float)
     importance: Mapped[int] = mapped_column(default=1)  # Scale 1-5
-    media_url: Mapped[str] = mapped_column(String(512))  # URL to image/video
+    media_url: Mapped[Optional[str]] = mapped_column(String(512))  # URL to image/video
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped by every update; the If-Match precondition compares against it
+    version: Mapped[int] = mapped_column(default=1, server_default="1")
 
     epoch_id: Mapped[int] = mapped_column(ForeignKey('epochs.id'))
-    epoch = relationship("Epoch", back_populates="events")
-    categories = relationship("Category", secondary=event_category, back_populates="events")
+    # Never lazy-load: queries returning events must eager-load these (see crud.EVENT_LOAD_OPTIONS)
+    epoch = relationship("Epoch", back_populates="events", lazy="raise_on_sql")
+    categories = relationship(
+        "Category", secondary=event_category, back_populates="events", lazy="raise_on_sql"
+    )
+
+# Full-text search and spatial indexes for create_all; migrations build the same objects
+for statement in SQLITE_SEARCH_DDL + SQLITE_SPATIAL_DDL:
+    event.listen(Event.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in POSTGRES_SEARCH_DDL + POSTGRES_SPATIAL_DDL:
+    event.listen(Event.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for virtual_table in ("events_fts", "events_rtree"):
+    event.listen(
+        Event.__table__,
+        "before_drop",
+        DDL(f"DROP TABLE IF EXISTS {virtual_table}").execute_if(dialect="sqlite")
+    )
 
 class Category(Base):
     __tablename__ = "categories"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
-    description: Mapped[str] = mapped_column(Text)
-    color: Mapped[str] = mapped_column(String(7))  # Hex color code
-    icon: Mapped[str] = mapped_column(String(100))  # Icon identifier
+    description: Mapped[Optional[str]] = mapped_column(Text)
+    color: Mapped[Optional[str]] = mapped_column(String(7))  # Hex color code
+    icon: Mapped[Optional[str]] = mapped_column(String(100))  # Icon identifier
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     events = relationship("Event", secondary=event_category, back_populates="categories")
@@ -45,10 +77,63 @@ class Epoch(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
-    description: Mapped[str] = mapped_column(Text)
+    description: Mapped[Optional[str]] = mapped_column(Text)
     start_date: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     end_date: Mapped[datetime] = mapped_column(DateTime, nullable=False)
-    color: Mapped[str] = mapped_column(String(7))  # Hex color code
+    color: Mapped[Optional[str]] = mapped_column(String(7))  # Hex color code
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     events = relationship("Event", back_populates="epoch")
+
+# Tables whose writes are counted in table_versions
+VERSIONED_TABLES = ("events", "categories", "epochs")
+
+class TableVersion(Base):
+    """Write counter per table, bumped in the same transaction as the write.
+
+    Reading it is a cheap validator for HTTP conditional requests.
+    """
+    __tablename__ = "table_versions"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    table_name: Mapped[str] = mapped_column(String(50), nullable=False, unique=True)
+    version: Mapped[int] = mapped_column(default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+# Seed the counters when the schema is built with create_all (migrations seed them too)
+event.listen(
+    TableVersion.__table__,
+    "after_create",
+    DDL(
+        "INSERT INTO table_versions (table_name, version, updated_at) VALUES "
+        + ", ".join(f"('{name}', 0, CURRENT_TIMESTAMP)" for name in VERSIONED_TABLES)
+    )
+)
+
+class EventChange(Base):
+    """Append-only log of event writes; the id is the change feed's sequence number."""
+    __tablename__ = "event_changes"
+
+    op: Mapped[str] = mapped_column(String(10), nullable=False)  # "create", "update" or "delete"
+    event_id: Mapped[int] = mapped_column(nullable=False)  # no FK: deleted events stay in the log
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+# Importance levels counted in event_stats
+IMPORTANCE_LEVELS = (1, 2, 3, 4, 5)
+
+class EventStats(Base):
+    """Per-epoch and per-category event summary, maintained by the event writes."""
+    __tablename__ = "event_stats"
+    __table_args__ = (UniqueConstraint('scope', 'scope_id', name='uq_event_stats_scope'),)
+
+    scope: Mapped[str] = mapped_column(String(10), nullable=False)  # "epoch" or "category"
+    scope_id: Mapped[int] = mapped_column(nullable=False)
+    event_count: Mapped[int] = mapped_column(default=0)
+    min_date: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    max_date: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    importance_1: Mapped[int] = mapped_column(default=0)
+    importance_2: Mapped[int] = mapped_column(default=0)
+    importance_3: Mapped[int] = mapped_column(default=0)
+    importance_4: Mapped[int] = mapped_column(default=0)
+    importance_5: Mapped[int] = mapped_column(default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
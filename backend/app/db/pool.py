@@ -0,0 +1,51 @@
+import time
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that also counts checkouts which had to wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def _do_get(self):
+        # Nothing idle and no overflow room left: this checkout will block.
+        # With unbounded overflow (-1) a checkout never waits.
+        exhausted = (
+            self._max_overflow > -1
+            and self.checkedin() == 0
+            and self.overflow() >= self._max_overflow
+        )
+        if not exhausted:
+            return super()._do_get()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.waits += 1
+            self.wait_seconds += time.perf_counter() - start
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.waits, pool.wait_seconds = self.waits, self.wait_seconds
+        return pool
+
+
+def pool_stats(pool) -> dict:
+    """Live statistics of an engine's pool, for the diagnostics endpoint."""
+    stats = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    if isinstance(pool, InstrumentedAsyncQueuePool):
+        stats.update(waits=pool.waits, wait_seconds=round(pool.wait_seconds, 6))
+    return stats
@@ -0,0 +1,59 @@
+import re
+
+from sqlalchemy import Float, cast, column, func, literal_column, select, table
+
+# SQLite: external-content FTS5 index over events, kept in sync by triggers
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE events_fts USING fts5("
+    "title, description, location, content='events', content_rowid='id', "
+    "tokenize='porter unicode61')",
+    "CREATE TRIGGER events_fts_ai AFTER INSERT ON events BEGIN "
+    "INSERT INTO events_fts(rowid, title, description, location) "
+    "VALUES (new.id, new.title, new.description, new.location); END",
+    "CREATE TRIGGER events_fts_ad AFTER DELETE ON events BEGIN "
+    "INSERT INTO events_fts(events_fts, rowid, title, description, location) "
+    "VALUES ('delete', old.id, old.title, old.description, old.location); END",
+    "CREATE TRIGGER events_fts_au AFTER UPDATE ON events BEGIN "
+    "INSERT INTO events_fts(events_fts, rowid, title, description, location) "
+    "VALUES ('delete', old.id, old.title, old.description, old.location); "
+    "INSERT INTO events_fts(rowid, title, description, location) "
+    "VALUES (new.id, new.title, new.description, new.location); END",
+]
+
+# PostgreSQL: generated tsvector column (weighted title > location > description) with a GIN index
+POSTGRES_SEARCH_DDL = [
+    "ALTER TABLE events ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(location, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')) STORED",
+    "CREATE INDEX ix_events_search_vector ON events USING GIN (search_vector)",
+]
+
+# bm25() column weights for title, description, location
+_SQLITE_WEIGHTS = (10.0, 1.0, 5.0)
+
+_events_fts = table("events_fts", column("rowid"))
+_events = table("events", column("id"), column("search_vector"))
+
+
+def search_terms(q: str) -> list:
+    """Split a user query into plain words; search matches all of them."""
+    return re.findall(r"\w+", q)
+
+
+def match_subquery(dialect: str, q: str):
+    """Select ``(id, score)`` of the events matching ``q``; higher scores rank first."""
+    if dialect == "sqlite":
+        # Quote every word so FTS5 query syntax in user input is taken literally
+        expression = " ".join(f'"{term}"' for term in search_terms(q))
+        score = -func.bm25(literal_column("events_fts"), *_SQLITE_WEIGHTS)
+        return select(
+            _events_fts.c.rowid.label("id"),
+            score.label("score")
+        ).where(literal_column("events_fts").op("MATCH")(expression)).subquery("matches")
+
+    query = func.plainto_tsquery("english", q)
+    return select(
+        _events.c.id.label("id"),
+        cast(func.ts_rank(_events.c.search_vector, query), Float).label("score")
+    ).where(_events.c.search_vector.op("@@")(query)).subquery("matches")
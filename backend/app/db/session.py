@@ -1,28 +1,288 @@
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import asyncio
+import logging
+import time
+from typing import AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Sequence
+from starlette.requests import Request
+from starlette.responses import Response
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
 import os
 
-from ..core.config import settings
+from ..core.config import Settings, settings
+from ..core.metrics import instrument_engine
+from .pool import InstrumentedAsyncQueuePool
+from .spatial import great_circle_km
 
-# Use SQLite for testing if DATABASE_URL is set
-database_url = os.getenv("DATABASE_URL", settings.SQLALCHEMY_DATABASE_URI)
-engine = create_async_engine(
-    database_url,
-    echo=True,
-    future=True
-)
+logger = logging.getLogger("chronospace.startup")
+
+
+def _enable_sqlite_wal(dbapi_connection, connection_record):
+    # WAL lets readers proceed while a writer commits; NORMAL only syncs
+    # at checkpoints, which is safe with WAL
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores REFERENCES clauses, ON DELETE CASCADE included, unless asked
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    # Called by the radius filter (see spatial.distance_km)
+    dbapi_connection.create_function("great_circle_km", 4, great_circle_km, deterministic=True)
+
+
+def build_engine(url: str, config: Settings = settings) -> AsyncEngine:
+    """Create an async engine with the echo and pool settings of ``config``."""
+    parsed = make_url(url)
+    options = {"echo": config.DB_ECHO}
+    connect_args = {}
+    sqlite_memory = parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+    if sqlite_memory:
+        # Every connection would otherwise get its own empty database
+        options["poolclass"] = StaticPool
+    else:
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            pool_pre_ping=config.DB_POOL_PRE_PING,
+        )
+    if parsed.get_driver_name() == "asyncpg" and config.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["server_settings"] = {"statement_timeout": str(config.DB_STATEMENT_TIMEOUT_MS)}
+
+    engine = create_async_engine(url, connect_args=connect_args, **options)
+    if parsed.get_backend_name() == "sqlite":
+        event.listen(engine.sync_engine, "connect", _enable_sqlite_foreign_keys)
+        event.listen(engine.sync_engine, "connect", _register_sqlite_functions)
+    if parsed.get_backend_name() == "sqlite" and not sqlite_memory and config.SQLITE_WAL:
+        event.listen(engine.sync_engine, "connect", _enable_sqlite_wal)
+    instrument_engine(engine)
+    return engine
+
+
+class ReplicaPool:
+    """Round-robin choice among read replica engines.
+
+    A replica whose connection fails is marked down and skipped for
+    ``retry_after`` seconds, then tried again by the next read.
+    """
+
+    def __init__(self, engines: Sequence[AsyncEngine], retry_after: float = 10.0):
+        self.engines = list(engines)
+        self.retry_after = retry_after
+        self._next = 0
+        self._down_until: Dict[int, float] = {}
+
+    def candidates(self) -> List[AsyncEngine]:
+        """Replicas that are up, starting with the next in turn."""
+        now = time.monotonic()
+        count = len(self.engines)
+        start, self._next = self._next, (self._next + 1) % count if count else 0
+        order = [self.engines[(start + i) % count] for i in range(count)]
+        return [engine for engine in order if self._down_until.get(id(engine), 0.0) <= now]
+
+    def mark_down(self, engine: AsyncEngine) -> None:
+        self._down_until[id(engine)] = time.monotonic() + self.retry_after
+
+    async def check(self) -> List[dict]:
+        """Probe every replica with ``SELECT 1`` and report (and record) its state."""
+        report = []
+        for engine in self.engines:
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            except (DBAPIError, OSError):
+                self.mark_down(engine)
+            else:
+                self._down_until.pop(id(engine), None)
+            report.append({
+                "url": engine.url.render_as_string(hide_password=True),
+                "up": id(engine) not in self._down_until,
+            })
+        return report
+
+
+# Cookie holding the time until which a client that wrote reads from the primary
+READ_YOUR_WRITES_COOKIE = "chronospace_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class DatabaseRouter:
+    """Sends reads to the replicas and everything else to the primary.
+
+    A client's writes set a cookie that keeps its own reads on the primary
+    for ``read_your_writes`` seconds, so it sees what it just wrote while
+    the replicas catch up. Reads fall back to the primary when no replica
+    is reachable.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: Sequence[AsyncEngine] = (),
+        *,
+        read_your_writes: float = 5.0,
+        retry_after: float = 10.0
+    ):
+        self.primary = primary
+        self.replicas = ReplicaPool(replicas, retry_after)
+        self.read_your_writes = read_your_writes
+        self.primary_sessions = async_sessionmaker(primary, expire_on_commit=False, class_=AsyncSession)
+        self._replica_sessions = {
+            id(engine): async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+            for engine in self.replicas.engines
+        }
+
+    def _pinned_to_primary(self, request: Request) -> bool:
+        try:
+            return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    async def _replica_session(self) -> Optional[AsyncSession]:
+        for engine in self.replicas.candidates():
+            session = self._replica_sessions[id(engine)]()
+            try:
+                # Check out the connection now so that a dead replica is
+                # noticed here rather than halfway through the endpoint
+                await session.connection()
+                return session
+            except (DBAPIError, OSError):
+                await session.close()
+                self.replicas.mark_down(engine)
+        return None
+
+    async def read_session(self, request: Request) -> AsyncGenerator[AsyncSession, None]:
+        session = None
+        if not self._pinned_to_primary(request):
+            session = await self._replica_session()
+        if session is None:
+            session = self.primary_sessions()
+        async with session:
+            yield session
+
+    @property
+    def engines(self) -> List[AsyncEngine]:
+        return [self.primary] + self.replicas.engines
+
+    async def warm_up(
+        self, connections: int, prepare: Optional[Callable[[AsyncSession], Awaitable[None]]] = None
+    ) -> None:
+        """Open ``connections`` connections per engine and run ``prepare`` on each.
+
+        The first requests after a (re)start then find established
+        connections, compiled statements in SQLAlchemy's cache and, on
+        PostgreSQL, statements prepared by asyncpg. A replica that cannot
+        be reached is marked down; failures never stop the startup.
+        """
+        for engine in self.engines:
+            count = 1 if isinstance(engine.pool, StaticPool) else min(connections, engine.pool.size())
+            if count <= 0:
+                continue
+            try:
+                await _warm_engine(engine, count, prepare)
+            except (DBAPIError, OSError) as exc:
+                logger.warning("could not warm up %s: %s", engine.url.render_as_string(hide_password=True), exc)
+                if engine is not self.primary:
+                    self.replicas.mark_down(engine)
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+    def start_read_your_writes(self, request: Request, response: Response) -> None:
+        """After a write, keep the client's reads on the primary for a while."""
+        if self.replicas.engines and self.read_your_writes > 0 and request.method not in SAFE_METHODS:
+            response.set_cookie(
+                READ_YOUR_WRITES_COOKIE,
+                f"{time.time() + self.read_your_writes:.3f}",
+                max_age=max(1, round(self.read_your_writes)),
+                httponly=True,
+                samesite="lax",
+            )
+
+
+async def _warm_engine(
+    engine: AsyncEngine, count: int, prepare: Optional[Callable[[AsyncSession], Awaitable[None]]]
+) -> None:
+    # Hold all connections at once so that the pool really opens ``count``
+    connections = await asyncio.gather(*(engine.connect() for _ in range(count)))
+    try:
+        async def run(connection):
+            await connection.execute(text("SELECT 1"))
+            if prepare is not None:
+                async with AsyncSession(bind=connection) as session:
+                    await prepare(session)
+        await asyncio.gather(*(run(connection) for connection in connections))
+    finally:
+        await asyncio.gather(*(connection.close() for connection in connections))
+
+
+_router: Optional[DatabaseRouter] = None
+
+
+def get_router() -> DatabaseRouter:
+    """The application's engines, built from the settings on first use.
+
+    The ASGI lifespan builds and warms them at startup; scripts and tests
+    get them lazily. Nothing connects at import time.
+    """
+    global _router
+    if _router is None:
+        # Use SQLite for testing if DATABASE_URL is set
+        url = os.getenv("DATABASE_URL", settings.SQLALCHEMY_DATABASE_URI)
+        _router = DatabaseRouter(
+            build_engine(url),
+            [build_engine(replica_url) for replica_url in settings.replica_urls],
+            read_your_writes=settings.READ_YOUR_WRITES_SECONDS,
+            retry_after=settings.REPLICA_RETRY_AFTER,
+        )
+    return _router
+
+
+async def dispose_router() -> None:
+    """Close every pooled connection; the next use builds fresh engines."""
+    global _router
+    if _router is not None:
+        router, _router = _router, None
+        await router.dispose()
+
+
+def async_session_factory() -> AsyncSession:
+    """A new session on the primary, for scripts and background work."""
+    return get_router().primary_sessions()
 
-# Create async session factory with async_sessionmaker
-async_session_factory = async_sessionmaker(
-    engine,
-    expire_on_commit=False,
-    class_=AsyncSession,
-)
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """Dependency for getting async database sessions."""
+    """Dependency for sessions on the primary; use it for every write.
+
+    Also for reads that must not lag behind, such as those filling the
+    reference caches.
+    """
     async with async_session_factory() as session:
         try:
             yield session
         finally:
             await session.close()
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Dependency for read-only sessions, served by a replica when one is configured."""
+    async for session in get_router().read_session(request):
+        yield session
+
+async def read_your_writes(request: Request, response: Response) -> None:
+    """Dependency of the write endpoints: pins the client's reads to the primary for a while."""
+    get_router().start_read_your_writes(request, response)
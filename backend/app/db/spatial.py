@@ -0,0 +1,157 @@
+import math
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Boolean, and_, column, func, or_, select, table
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement, FunctionElement
+from sqlalchemy.types import Float
+
+# SQLite: R-tree over event coordinates, kept in sync by triggers
+SQLITE_SPATIAL_DDL = [
+    "CREATE VIRTUAL TABLE events_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    "CREATE TRIGGER events_rtree_ai AFTER INSERT ON events "
+    "WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN "
+    "INSERT INTO events_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude); END",
+    "CREATE TRIGGER events_rtree_ad AFTER DELETE ON events BEGIN "
+    "DELETE FROM events_rtree WHERE id = old.id; END",
+    "CREATE TRIGGER events_rtree_au AFTER UPDATE OF latitude, longitude ON events BEGIN "
+    "DELETE FROM events_rtree WHERE id = old.id; "
+    "INSERT INTO events_rtree SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude "
+    "WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL; END",
+]
+
+# PostgreSQL: GiST index on the point expression used by BoxFilter
+POSTGRES_SPATIAL_DDL = [
+    "CREATE INDEX ix_events_location_gist ON events USING GIST (point(longitude, latitude))",
+]
+
+# Mean Earth radius
+EARTH_RADIUS_KM = 6371.0
+# Kilometres per degree of latitude
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+# (min_lat, min_lon, max_lat, max_lon)
+Box = Tuple[float, float, float, float]
+
+_events_rtree = table(
+    "events_rtree",
+    column("id"), column("min_lat"), column("max_lat"), column("min_lon"), column("max_lon")
+)
+
+
+def split_bbox(min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> List[Box]:
+    """Turn a GeoJSON-order bbox into boxes, splitting one that crosses the antimeridian."""
+    if min_lon <= max_lon:
+        return [(min_lat, min_lon, max_lat, max_lon)]
+    return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+
+
+def radius_boxes(lat: float, lon: float, radius_km: float) -> List[Box]:
+    """Boxes covering the circle of ``radius_km`` around ``(lat, lon)``."""
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    if min_lat == -90.0 or max_lat == 90.0:
+        # The circle reaches a pole: every longitude is in range
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    dlon = dlat / math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if dlon >= 180.0:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180.0:
+        return split_bbox(min_lon + 360.0, min_lat, max_lon, max_lat)
+    if max_lon > 180.0:
+        return split_bbox(min_lon, min_lat, max_lon - 360.0, max_lat)
+    return [(min_lat, min_lon, max_lat, max_lon)]
+
+
+def great_circle_km(lat1: Optional[float], lon1: Optional[float], lat2: float, lon2: float) -> Optional[float]:
+    """Haversine distance between two points; None (SQL NULL) without coordinates."""
+    if lat1 is None or lon1 is None:
+        return None
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    h = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+class distance_km(FunctionElement):
+    """Great-circle distance in km between ``(lat1, lon1)`` and ``(lat2, lon2)``."""
+    type = Float()
+    inherit_cache = True
+
+
+@compiles(distance_km)
+def _distance_km_default(element, compiler, **kw):
+    lat1, lon1, lat2, lon2 = (compiler.process(arg, **kw) for arg in element.clauses)
+    return (
+        f"(2 * {EARTH_RADIUS_KM} * ASIN(LEAST(1.0, SQRT("
+        f"POWER(SIN(RADIANS({lat2} - {lat1}) / 2), 2) + "
+        f"COS(RADIANS({lat1})) * COS(RADIANS({lat2})) * POWER(SIN(RADIANS({lon2} - {lon1}) / 2), 2)))))"
+    )
+
+
+@compiles(distance_km, "sqlite")
+def _distance_km_sqlite(element, compiler, **kw):
+    # Trigonometry is optional in SQLite builds; db.session registers
+    # great_circle_km on every connection instead
+    return "great_circle_km(%s)" % compiler.process(element.clauses, **kw)
+
+
+def within_radius(lat_col, lon_col, lat: float, lon: float, radius_km: float):
+    """Great-circle distance predicate; pair it with ``radius_boxes`` to go through the index."""
+    return distance_km(lat_col, lon_col, lat, lon) <= radius_km
+
+
+class BoxFilter(ColumnElement):
+    """Events whose coordinates fall inside any of ``boxes``.
+
+    Compiles to an R-tree lookup on SQLite, a GiST-indexable ``<@ box``
+    test on PostgreSQL and plain range predicates elsewhere.
+    """
+    type = Boolean()
+    inherit_cache = False
+
+    def __init__(self, id_col, lat_col, lon_col, boxes: List[Box]):
+        self.id_col = id_col
+        self.lat_col = lat_col
+        self.lon_col = lon_col
+        self.boxes = boxes
+
+    def ranges(self):
+        return or_(*[
+            and_(
+                self.lat_col.between(min_lat, max_lat),
+                self.lon_col.between(min_lon, max_lon)
+            )
+            for min_lat, min_lon, max_lat, max_lon in self.boxes
+        ])
+
+
+@compiles(BoxFilter)
+def _box_filter_default(element, compiler, **kw):
+    return compiler.process(element.ranges(), **kw)
+
+
+@compiles(BoxFilter, "sqlite")
+def _box_filter_sqlite(element, compiler, **kw):
+    rtree = _events_rtree.c
+    candidates = select(rtree.id).where(or_(*[
+        and_(
+            rtree.min_lat <= max_lat, rtree.max_lat >= min_lat,
+            rtree.min_lon <= max_lon, rtree.max_lon >= min_lon
+        )
+        for min_lat, min_lon, max_lat, max_lon in element.boxes
+    ]))
+    # The R-tree stores 32-bit bounds, so recheck the exact columns
+    return compiler.process(and_(element.id_col.in_(candidates), element.ranges()), **kw)
+
+
+@compiles(BoxFilter, "postgresql")
+def _box_filter_postgresql(element, compiler, **kw):
+    location = func.point(element.lon_col, element.lat_col)
+    return compiler.process(or_(*[
+        location.op("<@")(func.box(func.point(min_lon, min_lat), func.point(max_lon, max_lat)))
+        for min_lat, min_lon, max_lat, max_lon in element.boxes
+    ]), **kw)
@@ -0,0 +1,246 @@
+"""Materialized per-epoch and per-category event statistics.
+
+``event_stats`` holds one row per epoch and per category: event count,
+date range and the importance distribution. Event writes adjust it in
+their own transaction through ``add_event_stats``/``remove_event_stats``,
+so the overview endpoints read a single row instead of aggregating
+events. ``rebuild_stats`` recomputes everything from the events table
+and reports where the stored rows had drifted.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, case, delete, func, insert as default_insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .functions import insert_on_conflict
+from .models import IMPORTANCE_LEVELS, Event, EventStats, event_category
+
+EPOCH = "epoch"
+CATEGORY = "category"
+
+# (epoch_id, category_ids, date, importance) of one event
+EventFacts = Tuple[int, Sequence[int], datetime, Optional[int]]
+StatsKey = Tuple[str, int]
+
+_stats = EventStats.__table__
+_IMPORTANCE_COLUMNS = tuple(f"importance_{level}" for level in IMPORTANCE_LEVELS)
+
+
+def _empty(date: Optional[datetime] = None) -> dict:
+    return {"event_count": 0, "min_date": date, "max_date": date, **{c: 0 for c in _IMPORTANCE_COLUMNS}}
+
+
+def _deltas(facts: Iterable[EventFacts]) -> Dict[StatsKey, dict]:
+    deltas: Dict[StatsKey, dict] = {}
+    for epoch_id, category_ids, date, importance in facts:
+        keys = [(EPOCH, epoch_id)] + [(CATEGORY, id) for id in set(category_ids)]
+        for key in keys:
+            delta = deltas.get(key)
+            if delta is None:
+                delta = deltas[key] = _empty(date)
+            delta["event_count"] += 1
+            delta["min_date"] = min(delta["min_date"], date)
+            delta["max_date"] = max(delta["max_date"], date)
+            if importance in IMPORTANCE_LEVELS:
+                delta[f"importance_{importance}"] += 1
+    return deltas
+
+
+async def add_event_stats(db: AsyncSession, facts: Iterable[EventFacts]) -> None:
+    """Count newly inserted events; one upsert per affected epoch/category."""
+    deltas = _deltas(facts)
+    if not deltas:
+        return
+    stmt = insert_on_conflict(db.get_bind().dialect.name, _stats)
+    new = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["scope", "scope_id"],
+        set_={
+            "event_count": _stats.c.event_count + new.event_count,
+            "min_date": case(
+                (or_(_stats.c.min_date.is_(None), new.min_date < _stats.c.min_date), new.min_date),
+                else_=_stats.c.min_date
+            ),
+            "max_date": case(
+                (or_(_stats.c.max_date.is_(None), new.max_date > _stats.c.max_date), new.max_date),
+                else_=_stats.c.max_date
+            ),
+            **{column: _stats.c[column] + new[column] for column in _IMPORTANCE_COLUMNS},
+            "updated_at": new.updated_at,
+        }
+    )
+    now = datetime.utcnow()
+    await db.execute(stmt, [
+        {"scope": scope, "scope_id": id, "updated_at": now, **delta}
+        for (scope, id), delta in deltas.items()
+    ])
+
+
+async def remove_event_stats(db: AsyncSession, facts: Iterable[EventFacts]) -> None:
+    """Uncount events that were just deleted (call after flushing the delete)."""
+    await subtract_stats(db, _deltas(facts))
+
+
+async def stats_where(db: AsyncSession, condition) -> Dict[StatsKey, dict]:
+    """What the events matching ``condition`` contribute; take it before deleting them."""
+    return await _aggregate(db, condition)
+
+
+async def subtract_stats(db: AsyncSession, deltas: Dict[StatsKey, dict]) -> None:
+    """Take ``deltas`` of already deleted events out of the stored statistics.
+
+    Counts are decremented in place. A date bound is recomputed only for
+    the epochs/categories that lost the event holding it.
+    """
+    if not deltas:
+        return
+    keys = list(deltas)
+    stored = await db.execute(
+        select(_stats.c.scope, _stats.c.scope_id, _stats.c.min_date, _stats.c.max_date)
+        .where(or_(*[(_stats.c.scope == scope) & (_stats.c.scope_id == id) for scope, id in keys]))
+    )
+    touched = [
+        (row.scope, row.scope_id) for row in stored
+        if deltas[(row.scope, row.scope_id)]["min_date"] == row.min_date
+        or deltas[(row.scope, row.scope_id)]["max_date"] == row.max_date
+    ]
+
+    now = datetime.utcnow()
+    await db.execute(
+        _stats.update()
+        .where(_stats.c.scope == bindparam("key_scope"), _stats.c.scope_id == bindparam("key_id"))
+        .values(
+            event_count=_stats.c.event_count - bindparam("d_event_count"),
+            updated_at=bindparam("d_updated_at"),
+            **{column: _stats.c[column] - bindparam(f"d_{column}") for column in _IMPORTANCE_COLUMNS}
+        ),
+        [
+            {
+                "key_scope": scope, "key_id": id, "d_updated_at": now,
+                "d_event_count": delta["event_count"],
+                **{f"d_{column}": delta[column] for column in _IMPORTANCE_COLUMNS},
+            }
+            for (scope, id), delta in deltas.items()
+        ]
+    )
+    if touched:
+        await _refresh_bounds(db, touched)
+
+
+async def _refresh_bounds(db: AsyncSession, keys: List[StatsKey]) -> None:
+    bounds: Dict[StatsKey, Tuple[Optional[datetime], Optional[datetime]]] = {key: (None, None) for key in keys}
+    epoch_ids = [id for scope, id in keys if scope == EPOCH]
+    if epoch_ids:
+        rows = await db.execute(
+            select(Event.epoch_id, func.min(Event.date), func.max(Event.date))
+            .where(Event.epoch_id.in_(epoch_ids))
+            .group_by(Event.epoch_id)
+        )
+        bounds.update({(EPOCH, id): (low, high) for id, low, high in rows})
+    category_ids = [id for scope, id in keys if scope == CATEGORY]
+    if category_ids:
+        rows = await db.execute(
+            select(event_category.c.category_id, func.min(Event.date), func.max(Event.date))
+            .join(Event, Event.id == event_category.c.event_id)
+            .where(event_category.c.category_id.in_(category_ids))
+            .group_by(event_category.c.category_id)
+        )
+        bounds.update({(CATEGORY, id): (low, high) for id, low, high in rows})
+
+    await db.execute(
+        _stats.update()
+        .where(_stats.c.scope == bindparam("key_scope"), _stats.c.scope_id == bindparam("key_id"))
+        .values(min_date=bindparam("d_min_date"), max_date=bindparam("d_max_date")),
+        [
+            {"key_scope": scope, "key_id": id, "d_min_date": low, "d_max_date": high}
+            for (scope, id), (low, high) in bounds.items()
+        ]
+    )
+
+
+async def drop_stats(db: AsyncSession, scope: str, id: int) -> None:
+    """Forget the statistics of a deleted epoch or category."""
+    await db.execute(delete(_stats).where(_stats.c.scope == scope, _stats.c.scope_id == id))
+
+
+async def get_stats(db: AsyncSession, scope: str, ids: Optional[Sequence[int]] = None) -> Dict[int, dict]:
+    """Stored statistics of ``scope`` by id; all rows when ``ids`` is None."""
+    query = select(_stats).where(_stats.c.scope == scope)
+    if ids is not None:
+        query = query.where(_stats.c.scope_id.in_(ids))
+    result = await db.execute(query)
+    return {row.scope_id: _summary(row._mapping) for row in result}
+
+
+def empty_stats() -> dict:
+    return _summary(_empty())
+
+
+def _summary(row) -> dict:
+    return {
+        "event_count": row["event_count"],
+        "first_date": row["min_date"],
+        "last_date": row["max_date"],
+        "importance": {level: row[f"importance_{level}"] for level in IMPORTANCE_LEVELS},
+    }
+
+
+def _aggregates():
+    return [
+        func.count().label("event_count"),
+        func.min(Event.date).label("min_date"),
+        func.max(Event.date).label("max_date"),
+        *[
+            func.sum(case((Event.importance == level, 1), else_=0)).label(f"importance_{level}")
+            for level in IMPORTANCE_LEVELS
+        ],
+    ]
+
+
+async def _aggregate(db: AsyncSession, condition=None) -> Dict[StatsKey, dict]:
+    by_epoch = select(Event.epoch_id, *_aggregates())
+    by_category = select(event_category.c.category_id, *_aggregates()).join(
+        Event, Event.id == event_category.c.event_id
+    )
+    if condition is not None:
+        by_epoch, by_category = by_epoch.where(condition), by_category.where(condition)
+
+    computed: Dict[StatsKey, dict] = {}
+    for scope, query, key in ((EPOCH, by_epoch, Event.epoch_id), (CATEGORY, by_category, event_category.c.category_id)):
+        for id, *values in await db.execute(query.group_by(key)):
+            computed[(scope, id)] = dict(zip(_empty(), values))
+    return computed
+
+
+async def compute_stats(db: AsyncSession) -> Dict[StatsKey, dict]:
+    """Statistics of every epoch and category, aggregated from the events table."""
+    return await _aggregate(db)
+
+
+async def rebuild_stats(db: AsyncSession, *, check_only: bool = False) -> List[str]:
+    """Recompute ``event_stats`` from scratch and describe every stored row that was off.
+
+    With ``check_only`` nothing is written.
+    """
+    computed = await compute_stats(db)
+    result = await db.execute(select(_stats))
+    stored = {(row.scope, row.scope_id): {key: row._mapping[key] for key in _empty()} for row in result}
+
+    problems = []
+    for key in sorted(computed.keys() | stored.keys()):
+        expected, found = computed.get(key, _empty()), stored.get(key, _empty())
+        wrong = [f"{name} {found[name]!r} != {expected[name]!r}" for name in expected if found[name] != expected[name]]
+        if wrong:
+            problems.append(f"{key[0]} {key[1]}: " + ", ".join(wrong))
+
+    if not check_only:
+        await db.execute(delete(_stats))
+        now = datetime.utcnow()
+        if computed:
+            await db.execute(default_insert(_stats), [
+                {"scope": scope, "scope_id": id, "updated_at": now, **values}
+                for (scope, id), values in computed.items()
+            ])
+        await db.commit()
+    return problems
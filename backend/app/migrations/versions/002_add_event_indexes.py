@@ -0,0 +1,67 @@
+"""Add event query indexes
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Time-range listing and keyset pagination on (date, id)
+    op.create_index('ix_events_date_id', 'events', ['date', 'id'])
+    # Epoch filters combined with a date range
+    op.create_index('ix_events_epoch_id_date', 'events', ['epoch_id', 'date'])
+
+    # Rebuild event_category with a composite primary key. Copying the
+    # distinct rows drops duplicate links that the old schema allowed.
+    op.create_table(
+        'event_category_new',
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+        sa.PrimaryKeyConstraint('category_id', 'event_id', name='pk_event_category')
+    )
+    op.execute(
+        "INSERT INTO event_category_new (category_id, event_id) "
+        "SELECT DISTINCT category_id, event_id FROM event_category "
+        "WHERE category_id IS NOT NULL AND event_id IS NOT NULL"
+    )
+    op.drop_table('event_category')
+    op.rename_table('event_category_new', 'event_category')
+    # Reverse lookup used when loading the categories of a set of events
+    op.create_index(
+        'ix_event_category_event_id_category_id',
+        'event_category',
+        ['event_id', 'category_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_event_category_event_id_category_id', table_name='event_category')
+    op.create_table(
+        'event_category_old',
+        sa.Column('event_id', sa.Integer(), nullable=True),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], )
+    )
+    op.execute(
+        "INSERT INTO event_category_old (event_id, category_id) "
+        "SELECT event_id, category_id FROM event_category"
+    )
+    op.drop_table('event_category')
+    op.rename_table('event_category_old', 'event_category')
+
+    op.drop_index('ix_events_epoch_id_date', table_name='events')
+    op.drop_index('ix_events_date_id', table_name='events')
@@ -0,0 +1,38 @@
+"""Add table_versions
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    table_versions = op.create_table(
+        'table_versions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('table_name', sa.String(50), nullable=False, unique=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    now = datetime.utcnow()
+    op.bulk_insert(table_versions, [
+        {'table_name': name, 'version': 0, 'updated_at': now}
+        for name in ('events', 'categories', 'epochs')
+    ])
+
+
+def downgrade() -> None:
+    op.drop_table('table_versions')
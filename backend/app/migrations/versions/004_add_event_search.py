@@ -0,0 +1,66 @@
+"""Add full-text search over events
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # External-content FTS5 table, kept in sync with events by triggers
+        op.execute(
+            "CREATE VIRTUAL TABLE events_fts USING fts5("
+            "title, description, location, content='events', content_rowid='id', "
+            "tokenize='porter unicode61')"
+        )
+        op.execute(
+            "CREATE TRIGGER events_fts_ai AFTER INSERT ON events BEGIN "
+            "INSERT INTO events_fts(rowid, title, description, location) "
+            "VALUES (new.id, new.title, new.description, new.location); END"
+        )
+        op.execute(
+            "CREATE TRIGGER events_fts_ad AFTER DELETE ON events BEGIN "
+            "INSERT INTO events_fts(events_fts, rowid, title, description, location) "
+            "VALUES ('delete', old.id, old.title, old.description, old.location); END"
+        )
+        op.execute(
+            "CREATE TRIGGER events_fts_au AFTER UPDATE ON events BEGIN "
+            "INSERT INTO events_fts(events_fts, rowid, title, description, location) "
+            "VALUES ('delete', old.id, old.title, old.description, old.location); "
+            "INSERT INTO events_fts(rowid, title, description, location) "
+            "VALUES (new.id, new.title, new.description, new.location); END"
+        )
+        # Index the events that already exist
+        op.execute("INSERT INTO events_fts(events_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        # A generated column stays in sync with every write by construction
+        op.execute(
+            "ALTER TABLE events ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(location, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'C')) STORED"
+        )
+        op.execute("CREATE INDEX ix_events_search_vector ON events USING GIN (search_vector)")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS events_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS events_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS events_fts_ai")
+        op.execute("DROP TABLE IF EXISTS events_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_events_search_vector")
+        op.execute("ALTER TABLE events DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,63 @@
+"""Add event coordinates with a spatial index
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('events', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('events', sa.Column('longitude', sa.Float(), nullable=True))
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # R-tree kept in sync with the coordinate columns by triggers
+        op.execute("CREATE VIRTUAL TABLE events_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)")
+        op.execute(
+            "CREATE TRIGGER events_rtree_ai AFTER INSERT ON events "
+            "WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN "
+            "INSERT INTO events_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude); END"
+        )
+        op.execute(
+            "CREATE TRIGGER events_rtree_ad AFTER DELETE ON events BEGIN "
+            "DELETE FROM events_rtree WHERE id = old.id; END"
+        )
+        op.execute(
+            "CREATE TRIGGER events_rtree_au AFTER UPDATE OF latitude, longitude ON events BEGIN "
+            "DELETE FROM events_rtree WHERE id = old.id; "
+            "INSERT INTO events_rtree SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude "
+            "WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL; END"
+        )
+    elif dialect == 'postgresql':
+        op.execute("CREATE INDEX ix_events_location_gist ON events USING GIST (point(longitude, latitude))")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS events_rtree_au")
+        op.execute("DROP TRIGGER IF EXISTS events_rtree_ad")
+        op.execute("DROP TRIGGER IF EXISTS events_rtree_ai")
+        op.execute("DROP TABLE IF EXISTS events_rtree")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_events_location_gist")
+
+    if dialect == 'sqlite':
+        # Native DROP COLUMN (SQLite 3.35+); a batch table rebuild would
+        # lose the full-text search triggers on events
+        op.execute("ALTER TABLE events DROP COLUMN longitude")
+        op.execute("ALTER TABLE events DROP COLUMN latitude")
+    else:
+        op.drop_column('events', 'longitude')
+        op.drop_column('events', 'latitude')
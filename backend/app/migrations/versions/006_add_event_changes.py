@@ -0,0 +1,31 @@
+"""Add event_changes
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'event_changes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('op', sa.String(10), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('event_changes')
@@ -0,0 +1,57 @@
+"""Add event_stats
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+_AGGREGATES = (
+    "COUNT(*), MIN(events.date), MAX(events.date), "
+    + ", ".join(f"SUM(CASE WHEN events.importance = {level} THEN 1 ELSE 0 END)" for level in range(1, 6))
+    + ", CURRENT_TIMESTAMP"
+)
+_COLUMNS = (
+    "scope, scope_id, event_count, min_date, max_date, "
+    "importance_1, importance_2, importance_3, importance_4, importance_5, updated_at"
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'event_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('scope', sa.String(10), nullable=False),
+        sa.Column('scope_id', sa.Integer(), nullable=False),
+        sa.Column('event_count', sa.Integer(), nullable=False),
+        sa.Column('min_date', sa.DateTime(), nullable=True),
+        sa.Column('max_date', sa.DateTime(), nullable=True),
+        *[sa.Column(f'importance_{level}', sa.Integer(), nullable=False) for level in range(1, 6)],
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('scope', 'scope_id', name='uq_event_stats_scope')
+    )
+    # Summarize the existing events
+    op.execute(
+        f"INSERT INTO event_stats ({_COLUMNS}) "
+        f"SELECT 'epoch', events.epoch_id, {_AGGREGATES} FROM events GROUP BY events.epoch_id"
+    )
+    op.execute(
+        f"INSERT INTO event_stats ({_COLUMNS}) "
+        f"SELECT 'category', event_category.category_id, {_AGGREGATES} "
+        "FROM event_category JOIN events ON events.id = event_category.event_id "
+        "GROUP BY event_category.category_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('event_stats')
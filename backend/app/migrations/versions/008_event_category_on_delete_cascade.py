@@ -0,0 +1,51 @@
+"""Cascade deletes from events and categories to event_category
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def _rebuild_event_category(ondelete) -> None:
+    # SQLite cannot alter foreign keys in place, so copy into a new table
+    # (event_category has no triggers that a rebuild would lose)
+    op.create_table(
+        'event_category_new',
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ondelete=ondelete),
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete=ondelete),
+        sa.PrimaryKeyConstraint('category_id', 'event_id', name='pk_event_category_new')
+    )
+    op.execute(
+        "INSERT INTO event_category_new (category_id, event_id) "
+        "SELECT category_id, event_id FROM event_category"
+    )
+    op.drop_index('ix_event_category_event_id_category_id', table_name='event_category')
+    op.drop_table('event_category')
+    op.rename_table('event_category_new', 'event_category')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("ALTER TABLE event_category RENAME CONSTRAINT pk_event_category_new TO pk_event_category")
+    op.create_index(
+        'ix_event_category_event_id_category_id',
+        'event_category',
+        ['event_id', 'category_id']
+    )
+
+
+def upgrade() -> None:
+    _rebuild_event_category('CASCADE')
+
+
+def downgrade() -> None:
+    _rebuild_event_category(None)
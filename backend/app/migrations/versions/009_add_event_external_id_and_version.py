@@ -0,0 +1,36 @@
+"""Add events.external_id and events.version
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Plain ADD COLUMN keeps the search and spatial triggers on events
+    op.add_column('events', sa.Column('external_id', sa.String(100), nullable=True))
+    op.add_column('events', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    # Target of the upsert's ON CONFLICT; NULLs do not collide
+    op.create_index('ix_events_external_id', 'events', ['external_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_external_id', table_name='events')
+    if op.get_bind().dialect.name == 'sqlite':
+        # Native DROP COLUMN (SQLite 3.35+); a batch table rebuild would
+        # lose the triggers on events
+        op.execute("ALTER TABLE events DROP COLUMN version")
+        op.execute("ALTER TABLE events DROP COLUMN external_id")
+    else:
+        op.drop_column('events', 'version')
+        op.drop_column('events', 'external_id')
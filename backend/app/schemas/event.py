@@ -1,6 +1,6 @@
 from datetime import datetime
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field, field_validator
 
 class CategoryBase(BaseModel):
     name: str
@@ -36,10 +36,13 @@ class Epoch(EpochBase):
         from_attributes = True
 
 class EventBase(BaseModel):
+    external_id: Optional[str] = Field(None, max_length=100)
     title: str
     description: Optional[str] = None
     date: datetime
     location: Optional[str] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
     importance: Optional[int] = Field(1, ge=1, le=5)
     media_url: Optional[str] = None
     epoch_id: int
@@ -48,8 +51,30 @@ class EventBase(BaseModel):
 class EventCreate(EventBase):
     pass
 
+class EventUpdate(BaseModel):
+    """Partial update: only the fields present in the request are changed."""
+    external_id: Optional[str] = Field(None, max_length=100)
+    title: Optional[str] = None
+    description: Optional[str] = None
+    date: Optional[datetime] = None
+    location: Optional[str] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+    importance: Optional[int] = Field(None, ge=1, le=5)
+    media_url: Optional[str] = None
+    epoch_id: Optional[int] = None
+    category_ids: Optional[List[int]] = None
+
+    @field_validator("title", "date", "epoch_id", "category_ids")
+    @classmethod
+    def _not_null(cls, value):
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
 class Event(EventBase):
     id: int
+    version: int
     created_at: datetime
     updated_at: datetime
     epoch: Epoch
@@ -57,3 +82,82 @@ class Event(EventBase):
 
     class Config:
         from_attributes = True
+
+# Most ids accepted by one batch lookup
+MAX_BATCH_IDS = 500
+
+class BatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+# Batch lookups answer in request order; unknown ids are null in items and listed in missing
+class EventBatch(BaseModel):
+    items: List[Optional[Event]] = []
+    missing: List[int] = []
+
+class CategoryBatch(BaseModel):
+    items: List[Optional[Category]] = []
+    missing: List[int] = []
+
+class EpochBatch(BaseModel):
+    items: List[Optional[Epoch]] = []
+    missing: List[int] = []
+
+class BulkRowError(BaseModel):
+    index: int
+    detail: str
+
+class EventBulkResult(BaseModel):
+    created: int = 0
+    ids: List[int] = []
+    errors: List[BulkRowError] = []
+
+# Most events accepted by one upsert request
+MAX_UPSERT_ROWS = 1000
+
+class EventUpsert(EventBase):
+    external_id: str = Field(..., min_length=1, max_length=100)
+    # Expected current version; the row is only updated if it still matches
+    version: Optional[int] = None
+
+class EventUpsertRequest(BaseModel):
+    events: List[EventUpsert] = Field(..., min_length=1, max_length=MAX_UPSERT_ROWS)
+
+class EventUpsertResult(BaseModel):
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    # Event id per request row, null where the row was rejected
+    ids: List[Optional[int]] = []
+    errors: List[BulkRowError] = []
+
+class HistogramBucket(BaseModel):
+    start: datetime
+    end: datetime
+    count: int = 0
+    max_importance: Optional[int] = None
+    top_event_ids: List[int] = []
+
+class EventHistogram(BaseModel):
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    bucket_seconds: Optional[float] = None
+    buckets: List[HistogramBucket] = []
+
+class EventChange(BaseModel):
+    seq: int
+    op: Literal["create", "update", "delete"]
+    event_id: int
+
+class EventChangeList(BaseModel):
+    changes: List[EventChange] = []
+    # Pass as since= to fetch the next page or to resume the stream
+    last_seq: int
+    more: bool = False
+
+class EventStats(BaseModel):
+    id: int
+    event_count: int = 0
+    first_date: Optional[datetime] = None
+    last_date: Optional[datetime] = None
+    # Number of events per importance level (1-5)
+    importance: Dict[int, int] = {}
@@ -0,0 +1,97 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+# The session module builds its engine from DATABASE_URL on first use; point
+# it at the bundled SQLite database unless the environment already chose one.
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite+aiosqlite:///{Path(__file__).resolve().parent.parent / 'test.db'}",
+)
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.base import Base
+from app.db import models  # noqa: F401  (registers tables on Base.metadata)
+from app.db.session import build_engine
+
+
+@pytest.fixture(autouse=True)
+def reset_reference_caches():
+    """Every test gets its own database, so cached rows must not leak across."""
+    from app.api import events
+    from app.db import crud
+
+    for cache in (crud.category.cache, crud.epoch.cache, events.layout_cache):
+        cache.clear()
+    yield
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path):
+    """A throwaway SQLite database with the current model schema."""
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'chronospace.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def count_queries(engine):
+    """Context manager collecting the SQL statements run on the test engine.
+
+    Pin the statement count of an endpoint so that N+1 regressions fail::
+
+        with count_queries() as statements:
+            await client.get("/api/v1/events/")
+        assert len(statements) == 4
+    """
+    @contextmanager
+    def counting():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    return counting
+
+
+@pytest_asyncio.fixture
+async def session_factory(engine):
+    return async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+
+@pytest_asyncio.fixture
+async def db(session_factory):
+    async with session_factory() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def client(session_factory):
+    """HTTP client for the app with ``get_db`` bound to the test database."""
+    from app.app_main import app
+    from app.db.session import get_db, get_read_db
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+    app.dependency_overrides.clear()
@@ -0,0 +1,47 @@
+import pytest
+
+from app.benchmarks.api import DataConfig, SCENARIOS, compare, percentile, run_benchmark
+
+
+@pytest.mark.asyncio
+async def test_benchmark_suite_runs_every_scenario(tmp_path):
+    config = DataConfig(events=300, epochs=3, categories=5)
+    report = await run_benchmark(tmp_path / "bench.db", config, requests=6, concurrency=2, warmup=1)
+
+    assert report["meta"]["data"]["events"] == 300
+    assert list(report["scenarios"]) == list(SCENARIOS)
+    for result in report["scenarios"].values():
+        assert result["requests"] == 6 and result["errors"] == 0
+        assert 0 < result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+
+    # A second run reuses the seeded database
+    report = await run_benchmark(tmp_path / "bench.db", config, requests=2, scenarios=["detail"])
+    assert list(report["scenarios"]) == ["detail"]
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    def report(p95, rps):
+        return {"scenarios": {"list": {"p95_ms": p95, "throughput_rps": rps}}}
+
+    assert compare(report(10, 100), report(11.9, 85), 0.2) == []
+    assert compare(report(10, 100), report(12.5, 100), 0.2) == ["list: p95 10 ms -> 12.5 ms"]
+    assert compare(report(10, 100), report(10, 70), 0.2) == ["list: throughput 100 -> 70 req/s"]
+    assert percentile([1, 2, 3, 4], 50) == 2 and percentile([1, 2, 3, 4], 99) == 4
+
+
+def test_startup_stays_within_budget():
+    from app.benchmarks.startup import measure, problems
+
+    report = measure(runs=1)
+    assert report["forbidden"] == []
+    assert problems(report) == [], report["slowest"]
+
+
+def test_wire_benchmark_reports_every_format_and_coding():
+    from app.benchmarks.wire import encodings, formats, measure
+
+    report = measure([20], repeat=1)
+    rows = {(row["format"], row["encoding"]): row for row in report["results"]}
+    assert set(rows) == {(f, e) for f in formats() for e in encodings()}
+    assert rows[("json", "identity")]["ratio_vs_json"] == 1
+    assert rows[("json", "gzip")]["bytes"] < rows[("json", "identity")]["bytes"] / 5
@@ -0,0 +1,59 @@
+import pytest
+
+from app.db.cache import InMemoryBackend, ReferenceCache
+
+
+@pytest.mark.asyncio
+async def test_shared_backend_invalidates_other_workers():
+    backend = InMemoryBackend()
+    worker_a = ReferenceCache("categories", ttl=60, backend=backend)
+    worker_b = ReferenceCache("categories", ttl=60, backend=backend)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return ["Science"]
+
+    assert await worker_a.get_or_load("list", load) == ["Science"]
+    assert await worker_b.get_or_load("list", load) == ["Science"]
+    assert await worker_b.get_or_load("list", load) == ["Science"]
+    assert len(loads) == 2
+    assert worker_b.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    await worker_a.invalidate()
+    await worker_b.get_or_load("list", load)
+    assert len(loads) == 3
+    assert worker_b.misses == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_reloaded():
+    cache = ReferenceCache("epochs", ttl=0)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return len(calls)
+
+    assert await cache.get_or_load("x", load) == 1
+    assert await cache.get_or_load("x", load) == 2
+
+
+@pytest.mark.asyncio
+async def test_category_reads_hit_cache_until_a_write(client):
+    r = await client.post("/api/v1/categories/", json={"name": "Science"})
+    assert r.status_code == 200
+
+    for _ in range(3):
+        r = await client.get("/api/v1/categories/")
+        assert [c["name"] for c in r.json()] == ["Science"]
+    stats = (await client.get("/cache/stats")).json()["categories"]
+    assert stats["hits"] == 2
+
+    await client.post("/api/v1/categories/", json={"name": "Art"})
+    r = await client.get("/api/v1/categories/")
+    assert [c["name"] for c in r.json()] == ["Science", "Art"]
+
+    category_id = r.json()[0]["id"]
+    assert (await client.delete(f"/api/v1/categories/{category_id}")).status_code == 200
+    assert (await client.get(f"/api/v1/categories/{category_id}")).status_code == 404
@@ -0,0 +1,150 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from app.api.events import _change_stream
+from app.core.changes import ChangeFeed
+from app.db import crud
+from app.db.models import Epoch
+from app.schemas.event import EventCreate
+
+
+def _change(seq, op="create", event_id=1):
+    return {"seq": seq, "op": op, "event_id": event_id}
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_cut_off_without_blocking_others():
+    feed = ChangeFeed(maxsize=2)
+    slow, fast = feed.subscribe(), feed.subscribe()
+
+    feed.publish([_change(1), _change(2)])
+    assert await fast.get() == _change(1)
+    feed.publish([_change(3)])
+
+    assert slow.overflowed and not fast.overflowed
+    assert feed.stats() == {"subscribers": 1, "dropped": 1}
+    # The slow subscriber still drains what it had, then gets nothing
+    assert [await slow.get(), await slow.get(), await slow.get()] == [_change(1), _change(2), None]
+    assert [await fast.get(), await fast.get()] == [_change(2), _change(3)]
+
+
+@pytest.mark.asyncio
+async def test_writes_are_logged_and_published(client, db):
+    era = Epoch(name="Antiquity", start_date=datetime(1, 1, 1), end_date=datetime(500, 1, 1))
+    db.add(era)
+    await db.commit()
+    subscription = crud.event.feed.subscribe()
+    try:
+        first = await crud.event.create(db, obj_in=EventCreate(
+            title="Founding", date=datetime(100, 1, 1), epoch_id=era.id
+        ))
+        await crud.event.create_bulk(db, rows=[
+            {"title": f"Bulk {i}", "date": "0200-01-01T00:00:00", "epoch_id": era.id}
+            for i in range(2)
+        ])
+        assert await crud.event.delete(db, id=first.id)
+
+        live = [await subscription.get(timeout=1) for _ in range(4)]
+    finally:
+        crud.event.feed.unsubscribe(subscription)
+    assert [c["op"] for c in live] == ["create", "create", "create", "delete"]
+    seqs = [c["seq"] for c in live]
+    assert seqs == sorted(seqs) and len(set(seqs)) == 4
+
+    r = await client.get("/api/v1/events/changes", params={"since": seqs[0], "limit": 2})
+    assert r.status_code == 200
+    body = r.json()
+    assert body == {"changes": live[1:3], "last_seq": seqs[2], "more": True}
+    r = await client.get("/api/v1/events/changes", params={"since": body["last_seq"]})
+    assert r.json() == {"changes": live[3:], "last_seq": seqs[3], "more": False}
+
+
+@pytest.mark.asyncio
+async def test_stream_replays_backlog_then_skips_duplicates():
+    feed = ChangeFeed(maxsize=2)
+    subscription = feed.subscribe()
+    # Change 2 was both in the backlog and published live
+    feed.publish([_change(2)])
+    stream = _change_stream(subscription, [_change(1), _change(2)], since=0)
+
+    messages = [await stream.__anext__() for _ in range(2)]
+    assert messages[0] == f"id: 1\nevent: create\ndata: {json.dumps(_change(1))}\n\n"
+    assert messages[1].startswith("id: 2\n")
+
+    feed.publish([_change(3, "delete")])
+    assert (await stream.__anext__()).startswith("id: 3\nevent: delete\n")
+
+    # Overflow: the client is told where to resume and the stream ends
+    feed.publish([_change(4), _change(5), _change(6)])
+    assert await stream.__anext__() == f"id: 4\nevent: create\ndata: {json.dumps(_change(4))}\n\n"
+    assert (await stream.__anext__()).startswith("id: 5\n")
+    assert await stream.__anext__() == 'event: reset\ndata: {"since": 5}\n\n'
+    with pytest.raises(StopAsyncIteration):
+        await stream.__anext__()
+
+
+@pytest.mark.asyncio
+async def test_overflowing_backlog_resets_to_the_clients_position(client, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "CHANGE_FEED_QUEUE_SIZE", 2)
+    read_changes = crud.event.get_changes
+
+    async def get_changes(db, **kwargs):
+        changes = await read_changes(db, **kwargs)
+        # A write commits while the backlog is being read
+        crud.event.feed.publish([_change(40)])
+        return changes + [_change(seq) for seq in (11, 12, 13)]
+
+    monkeypatch.setattr(crud.event, "get_changes", get_changes)
+    r = await client.get("/api/v1/events/stream", params={"since": 10})
+    assert r.status_code == 200
+    # The queued live change is not sent, so the client misses nothing after 10
+    assert r.text == 'event: reset\ndata: {"since": 10}\n\n'
+    assert crud.event.feed.stats()["subscribers"] == 0
+
+
+@pytest.mark.asyncio
+async def test_sequence_numbers_follow_commit_order(session_factory, count_queries):
+    import asyncio
+
+    async with session_factory() as db:
+        era = Epoch(name="Antiquity", start_date=datetime(1, 1, 1), end_date=datetime(500, 1, 1))
+        db.add(era)
+        await db.commit()
+
+    gate = asyncio.Event()
+    async with session_factory() as first, session_factory() as second:
+        commit = first.commit
+
+        async def held_commit():
+            await gate.wait()
+            await commit()
+
+        # The first writer stops right before committing
+        first.commit = held_commit
+        with count_queries() as statements:
+            a = asyncio.create_task(crud.event.create(first, obj_in=EventCreate(
+                title="First", date=datetime(100, 1, 1), epoch_id=era.id
+            )))
+            while not any("event_changes" in statement for statement in statements):
+                await asyncio.sleep(0.01)
+            b = asyncio.create_task(crud.event.create(second, obj_in=EventCreate(
+                title="Second", date=datetime(200, 1, 1), epoch_id=era.id
+            )))
+            await asyncio.sleep(0.2)
+            gate.set()
+            await asyncio.gather(a, b)
+
+    # Each writer locks the events counter before it gets a sequence number
+    order = [
+        "counter" if statement.startswith("UPDATE table_versions") else "log"
+        for statement in statements
+        if statement.startswith(("UPDATE table_versions", "INSERT INTO event_changes"))
+    ]
+    assert order == ["counter", "log", "counter", "log"]
+    async with session_factory() as db:
+        changes = await crud.event.get_changes(db)
+    assert [c["event_id"] for c in changes] == [a.result().id, b.result().id]
@@ -0,0 +1,144 @@
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from app.core.compression import CompressionMiddleware, compress, is_available, negotiate
+
+
+def test_negotiate_honours_quality_and_server_preference():
+    encodings = ("zstd", "br", "gzip")
+    assert negotiate("gzip, deflate", encodings) == "gzip"
+    assert negotiate("gzip;q=0, deflate", encodings) is None
+    assert negotiate("identity", encodings) is None
+    assert negotiate(None, encodings) is None
+    best = "zstd" if is_available("zstd") else "br" if is_available("br") else "gzip"
+    assert negotiate("*", encodings) == best
+    assert negotiate("br;q=0.5, gzip;q=0.8", encodings) == "gzip"
+    assert not is_available("compress")
+
+
+def _app(**options):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, **options)
+    big = json.dumps([{"name": "Category", "color": "#336699"}] * 200)
+
+    @app.get("/big")
+    async def read_big():
+        return Response(big, media_type="application/json", headers={"ETag": '"abc"'})
+
+    @app.get("/small")
+    async def read_small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def read_stream():
+        async def lines():
+            for i in range(100):
+                yield f'{{"line": {i}}}\n'
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.get("/encoded")
+    async def read_encoded():
+        return Response(gzip.compress(big.encode()), media_type="application/json",
+                        headers={"Content-Encoding": "gzip"})
+
+    @app.get("/text")
+    async def read_text():
+        return PlainTextResponse("x" * 5000, headers={"Vary": "Accept"})
+
+    return app, big
+
+
+@pytest.mark.asyncio
+async def test_compresses_large_and_streamed_bodies_only():
+    app, big = _app(minimum_size=500, encodings=("gzip",))
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/big", headers={"Accept-Encoding": "gzip"})
+        assert r.headers["content-encoding"] == "gzip"
+        assert r.headers["vary"] == "Accept-Encoding"
+        assert int(r.headers["content-length"]) < len(big) / 10
+        assert r.headers["etag"] == 'W/"abc"'
+        assert r.text == big
+
+        r = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in r.headers and r.json() == {"ok": True}
+
+        # Each streamed chunk is flushed; the whole stream is one gzip member
+        async with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as r:
+            assert r.headers["content-encoding"] == "gzip"
+            assert "content-length" not in r.headers
+            raw = b"".join([chunk async for chunk in r.aiter_raw()])
+        assert gzip.decompress(raw).decode().splitlines()[-1] == '{"line": 99}'
+
+        r = await client.get("/big", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in r.headers and r.headers["vary"] == "Accept-Encoding"
+        assert r.headers["etag"] == '"abc"'
+
+        r = await client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+        assert r.text == big
+
+        r = await client.get("/text", headers={"Accept-Encoding": "gzip"})
+        assert r.headers["vary"] == "Accept, Accept-Encoding" and r.text == "x" * 5000
+
+
+def test_one_shot_compression_round_trips():
+    data = b"chronospace " * 1000
+    assert gzip.decompress(compress("gzip", data)) == data
+
+
+@pytest.mark.asyncio
+async def test_api_lists_are_compressed_and_negotiate_msgpack(client, db):
+    from app.db.models import Category
+
+    db.add_all([Category(name=f"Category {i}", color="#336699") for i in range(50)])
+    await db.commit()
+
+    r = await client.get("/api/v1/categories/", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert len(r.json()) == 50
+    assert {"Accept", "Accept-Encoding"} <= set(r.headers["vary"].split(", "))
+
+    r = await client.get("/api/v1/categories/", headers={"Accept": "application/msgpack"})
+    try:
+        import msgpack
+    except ImportError:
+        # Without the optional package the client gets JSON
+        assert r.headers["content-type"] == "application/json"
+        return
+    assert r.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(r.content)[0]["name"] == "Category 0"
+
+
+@pytest.mark.asyncio
+async def test_event_detail_negotiates_msgpack(client, db):
+    from datetime import datetime
+
+    from app.core.serialization import msgpack
+    from app.db.models import Epoch, Event
+
+    era = Epoch(name="Antiquity", start_date=datetime(1, 1, 1), end_date=datetime(500, 1, 1))
+    db.add(era)
+    await db.flush()
+    db.add(Event(title="Founding", date=datetime(100, 1, 1), epoch_id=era.id))
+    await db.commit()
+
+    r = await client.get("/api/v1/events/1")
+    assert r.headers["content-type"] == "application/json" and r.json()["title"] == "Founding"
+    assert "Accept" in r.headers["vary"].split(", ")
+    json_etag = r.headers["etag"]
+
+    r = await client.get("/api/v1/events/1", headers={"Accept": "application/msgpack"})
+    assert "Accept" in r.headers["vary"].split(", ")
+    if msgpack is None:
+        # Without the optional package the client gets JSON under the JSON validator
+        assert r.headers["content-type"] == "application/json"
+        assert r.headers["etag"] == json_etag
+        return
+    assert r.headers["content-type"] == "application/msgpack"
+    assert r.headers["etag"] != json_etag
+    assert msgpack.unpackb(r.content)["title"] == "Founding"
@@ -0,0 +1,540 @@
+import json
+import struct
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db.models import Category, Event, Epoch
+
+
+async def seed_events(db, count=25):
+    era = Epoch(
+        name="Antiquity",
+        description="",
+        color="#aa7744",
+        start_date=datetime(1, 1, 1),
+        end_date=datetime(500, 1, 1),
+    )
+    db.add(era)
+    await db.flush()
+    base = datetime(100, 1, 1)
+    # Every other pair of events shares a date so ordering has to fall back on id
+    for i in range(count):
+        db.add(Event(
+            title=f"Event {i}",
+            description="",
+            location="",
+            media_url="",
+            date=base + timedelta(days=i // 2),
+            epoch_id=era.id,
+        ))
+    await db.commit()
+    return era
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_walks_all_events_in_order(client, db):
+    await seed_events(db)
+
+    seen = []
+    params = {"limit": 10}
+    while True:
+        r = await client.get("/api/v1/events/", params=params)
+        assert r.status_code == 200
+        seen.extend(e["id"] for e in r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params = {"limit": 10, "cursor": cursor}
+
+    r = await client.get("/api/v1/events/", params={"limit": 100})
+    assert seen == [e["id"] for e in r.json()]
+    assert len(seen) == 25
+    assert "X-Next-Cursor" not in r.headers
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_rejects_malformed_cursor(client):
+    r = await client.get("/api/v1/events/", params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_multi_value_category_and_epoch_filters(client, db):
+    ancient = Epoch(name="Ancient", start_date=datetime(1, 1, 1), end_date=datetime(500, 1, 1))
+    medieval = Epoch(name="Medieval", start_date=datetime(500, 1, 1), end_date=datetime(1500, 1, 1))
+    war, art, science = Category(name="War"), Category(name="Art"), Category(name="Science")
+    db.add_all([ancient, medieval, war, art, science])
+    await db.flush()
+    db.add_all([
+        Event(title="A", date=datetime(100, 1, 1), epoch_id=ancient.id, categories=[war, art]),
+        Event(title="B", date=datetime(200, 1, 1), epoch_id=ancient.id, categories=[war]),
+        Event(title="C", date=datetime(900, 1, 1), epoch_id=medieval.id, categories=[art, science]),
+        Event(title="D", date=datetime(1000, 1, 1), epoch_id=medieval.id, categories=[]),
+    ])
+    await db.commit()
+
+    async def titles(**params):
+        r = await client.get("/api/v1/events/", params=params)
+        assert r.status_code == 200
+        return [e["title"] for e in r.json()]
+
+    assert await titles(category_id=[war.id, art.id]) == ["A", "B", "C"]
+    assert await titles(category_id=[war.id, art.id], category_match="all") == ["A"]
+    assert await titles(epoch_id=[ancient.id, medieval.id]) == ["A", "B", "C", "D"]
+    assert await titles(epoch_id=[medieval.id], category_id=[art.id, war.id]) == ["C"]
+    # An event in several requested categories must count once towards the limit
+    assert await titles(category_id=[war.id, art.id], limit=2) == ["A", "B"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_reports_row_errors_and_keeps_going(client, db):
+    era = Epoch(name="Modern", start_date=datetime(1800, 1, 1), end_date=datetime(2000, 1, 1))
+    science = Category(name="Science")
+    db.add_all([era, science])
+    await db.commit()
+
+    rows = [
+        {"title": "Telephone", "date": "1876-03-10T00:00:00", "epoch_id": era.id, "category_ids": [science.id]},
+        {"title": "No date", "epoch_id": era.id},
+        {"title": "Lost epoch", "date": "1900-01-01T00:00:00", "epoch_id": 999},
+        {"title": "Radio", "date": "1895-01-01T00:00:00", "epoch_id": era.id, "category_ids": [science.id, 42]},
+        {"title": "Flight", "date": "1903-12-17T00:00:00", "epoch_id": era.id},
+    ]
+    r = await client.post("/api/v1/events/bulk", params={"chunk_size": 2}, json=rows)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["created"] == 2
+    assert [e["index"] for e in body["errors"]] == [1, 2, 3]
+
+    ndjson = "\n".join(json.dumps(row) for row in rows[:1]) + "\n{not json\n"
+    r = await client.post(
+        "/api/v1/events/bulk",
+        content=ndjson,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    body = r.json()
+    assert body["created"] == 1
+    assert body["errors"][0]["index"] == 1
+
+    r = await client.get("/api/v1/events/", params={"category_id": science.id})
+    assert [e["title"] for e in r.json()] == ["Telephone", "Telephone"]
+
+
+@pytest.mark.asyncio
+async def test_export_streams_ndjson_and_csv(client, db):
+    era = await seed_events(db, count=5)
+    science, art = Category(name="Science"), Category(name="Art")
+    db.add_all([science, art])
+    db.add(Event(title="Linked", date=datetime(400, 1, 1), epoch_id=era.id, categories=[science, art]))
+    await db.commit()
+
+    r = await client.get("/api/v1/events/export", params={"format": "ndjson"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["title"] for row in rows] == [f"Event {i}" for i in range(5)] + ["Linked"]
+    assert rows[-1]["category_ids"] == sorted([science.id, art.id])
+
+    r = await client.get("/api/v1/events/export", params={"format": "csv", "category_id": art.id})
+    lines = r.text.splitlines()
+    assert lines[0].startswith("id,title,")
+    assert len(lines) == 2
+    assert f"{min(science.id, art.id)};{max(science.id, art.id)}" in lines[1]
+
+
+@pytest.mark.asyncio
+async def test_timeline_columns_json_and_binary(client, db):
+    era = await seed_events(db, count=3)
+    science = Category(name="Science", color="#00ff00")
+    db.add(science)
+    db.add(Event(title="Linked", date=datetime(1970, 1, 2), importance=5, epoch_id=era.id, categories=[science]))
+    await db.commit()
+
+    r = await client.get("/api/v1/events/timeline")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["count"] == 4
+    assert body["dates"][-1] == 86_400_000
+    assert body["dates"][0] < 0
+    assert body["importance"] == [1, 1, 1, 5]
+    assert body["category_offsets"] == [0, 0, 0, 0, 1]
+    assert body["category_ids"] == [science.id]
+    assert body["epochs"] == {str(era.id): {
+        "name": "Antiquity", "color": "#aa7744",
+        "start_date": body["epochs"][str(era.id)]["start_date"],
+        "end_date": body["epochs"][str(era.id)]["end_date"],
+    }}
+    assert body["categories"][str(science.id)]["color"] == "#00ff00"
+
+    r = await client.get("/api/v1/events/timeline", headers={"Accept": "application/octet-stream"})
+    assert r.headers["content-type"] == "application/octet-stream"
+    data = r.content
+    magic, version, count, links, dict_len = struct.unpack_from("<4sIIII", data)
+    assert (magic, version, count, links) == (b"CSTL", 1, 4, 1)
+    offset = 20 + dict_len
+    offset += -offset % 8
+    dates = struct.unpack_from("<4q", data, offset)
+    assert list(dates) == body["dates"]
+    ids = struct.unpack_from("<4I", data, offset + 32)
+    assert list(ids) == body["ids"]
+    assert data[-4:] == bytes([1, 1, 1, 5])
+
+
+@pytest.mark.asyncio
+async def test_layout_serves_viewports_from_the_cached_layout(client, db):
+    from app.api.events import layout_cache
+
+    era = await seed_events(db, count=10)
+    r = await client.get("/api/v1/events/layout", params={"zoom": 20})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["count"] == body["total"] == 10
+    assert body["dates"] == sorted(body["dates"])
+    # Pairs share a date: each pair is split over two lanes
+    assert body["lanes"] == [0, 1] * 5 and body["lane_count"] == 2
+    assert layout_cache.stats()["misses"] == 1
+
+    # Panning: another viewport of the same layout, without touching the events
+    r = await client.get("/api/v1/events/layout", params={
+        "zoom": 20, "start_date": "0100-01-03T00:00:00", "end_date": "0100-01-04T00:00:00",
+    })
+    window = r.json()
+    assert window["ids"] == body["ids"][4:8]
+    assert window["x"] == body["x"][4:8] and window["lanes"] == [0, 1, 0, 1]
+    assert layout_cache.stats() == {"hits": 1, "misses": 1, "size": 1, "events": 10}
+
+    # Gaps are snapped, so nearly equal ones share the layout
+    r = await client.get("/api/v1/events/layout", params={"zoom": 20, "gap": 1.1})
+    assert r.json()["gap"] == 1.0 and r.json()["lanes"] == body["lanes"]
+    assert layout_cache.stats()["hits"] == 2
+
+    r = await client.get("/api/v1/events/layout", params={"zoom": 20}, headers={"If-None-Match": r.headers["etag"]})
+    assert r.status_code == 200
+    r = await client.get("/api/v1/events/layout", params={"zoom": 20}, headers={"If-None-Match": r.headers["etag"]})
+    assert r.status_code == 304
+
+    # A write changes the data version and with it the cache key
+    await client.post("/api/v1/events/", json={
+        "title": "Late", "date": "0300-01-01T00:00:00", "epoch_id": era.id,
+    })
+    r = await client.get("/api/v1/events/layout", params={"zoom": 20})
+    assert r.json()["total"] == 11
+    assert layout_cache.stats()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_histogram_buckets_counts_and_top_events(client, db):
+    era = await seed_events(db, count=0)
+    events = [
+        Event(title="a", date=datetime(1000, 1, 1), importance=2, epoch_id=era.id),
+        Event(title="b", date=datetime(1000, 6, 1), importance=5, epoch_id=era.id),
+        Event(title="c", date=datetime(1000, 9, 1), importance=3, epoch_id=era.id),
+        Event(title="d", date=datetime(1003, 1, 1), importance=1, epoch_id=era.id),
+    ]
+    db.add_all(events)
+    await db.commit()
+
+    r = await client.get("/api/v1/events/histogram", params={"buckets": 3, "top_k": 2})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["start_date"] == "1000-01-01T00:00:00"
+    assert body["end_date"] == "1003-01-01T00:00:00"
+    counts = [b["count"] for b in body["buckets"]]
+    assert counts == [3, 0, 1]
+    first = body["buckets"][0]
+    assert first["max_importance"] == 5
+    assert first["top_event_ids"] == [events[1].id, events[2].id]
+    assert body["buckets"][2]["top_event_ids"] == [events[3].id]
+
+    r = await client.get("/api/v1/events/histogram", params={
+        "start_date": "1000-01-01T00:00:00",
+        "end_date": "1001-01-01T00:00:00",
+        "bucket_seconds": 86400 * 100,
+    })
+    assert [b["count"] for b in r.json()["buckets"]] == [1, 1, 1, 0]
+
+
+@pytest.mark.asyncio
+async def test_histogram_of_a_single_date_is_one_bucket(client, db):
+    era = await seed_events(db, count=0)
+    db.add_all([
+        Event(title=title, date=datetime(1000, 1, 1), importance=importance, epoch_id=era.id)
+        for title, importance in (("a", 2), ("b", 4))
+    ])
+    await db.commit()
+
+    r = await client.get("/api/v1/events/histogram", params={"buckets": 10})
+    body = r.json()
+    assert body["start_date"] == body["end_date"] == "1000-01-01T00:00:00"
+    assert [(b["start"], b["end"], b["count"], b["max_importance"]) for b in body["buckets"]] == [
+        ("1000-01-01T00:00:00", "1000-01-01T00:00:00", 2, 4)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_matches_and_paginates(client, db):
+    era = await seed_events(db, count=0)
+    science = Category(name="Science")
+    db.add(science)
+    await db.flush()
+    db.add_all([
+        Event(title="Moon landing", description="Apollo 11", location="Moon",
+              date=datetime(1969, 7, 20), epoch_id=era.id, categories=[science]),
+        Event(title="Fall of Rome", description="The western empire ends", location="Rome",
+              date=datetime(476, 9, 4), epoch_id=era.id),
+        Event(title="Founding", description="Legend of the twins landing by the river",
+              location="Rome", date=datetime(753, 4, 21), epoch_id=era.id),
+    ])
+    await db.commit()
+
+    r = await client.get("/api/v1/events/search", params={"q": "landing"})
+    assert r.status_code == 200
+    # A title match outranks a description match
+    assert [e["title"] for e in r.json()] == ["Moon landing", "Founding"]
+
+    r = await client.get("/api/v1/events/search", params={"q": "landing", "category_id": science.id})
+    assert [e["title"] for e in r.json()] == ["Moon landing"]
+
+    r = await client.get("/api/v1/events/search", params={"q": "rome", "limit": 1})
+    first = r.json()
+    r = await client.get("/api/v1/events/search", params={
+        "q": "rome", "limit": 1, "cursor": r.headers["X-Next-Cursor"],
+    })
+    assert {e["title"] for e in first + r.json()} == {"Fall of Rome", "Founding"}
+    assert "X-Next-Cursor" not in r.headers
+
+    r = await client.get("/api/v1/events/search", params={"q": 'rome" OR *'})
+    assert r.status_code == 200
+
+    # Deleting an event removes it from the index
+    rome = first[0]
+    assert (await client.delete(f"/api/v1/events/{rome['id']}")).status_code == 200
+    r = await client.get("/api/v1/events/search", params={"q": "rome"})
+    assert rome["id"] not in [e["id"] for e in r.json()]
+
+
+@pytest.mark.asyncio
+async def test_bbox_and_radius_filters(client, db):
+    era = await seed_events(db, count=0)
+    db.add_all([
+        Event(title="Paris", latitude=48.8566, longitude=2.3522, date=datetime(1789, 7, 14), epoch_id=era.id),
+        Event(title="Versailles", latitude=48.8049, longitude=2.1204, date=datetime(1919, 6, 28), epoch_id=era.id),
+        Event(title="London", latitude=51.5072, longitude=-0.1276, date=datetime(1666, 9, 2), epoch_id=era.id),
+        Event(title="Fiji", latitude=-17.7, longitude=179.9, date=datetime(1874, 10, 10), epoch_id=era.id),
+        Event(title="Nowhere", date=datetime(1800, 1, 1), epoch_id=era.id),
+    ])
+    await db.commit()
+
+    async def titles(**params):
+        r = await client.get("/api/v1/events/", params=params)
+        assert r.status_code == 200, r.text
+        return [e["title"] for e in r.json()]
+
+    assert await titles(bbox="-1,48,3,52") == ["London", "Paris", "Versailles"]
+    assert await titles(bbox="-1,48,3,52", start_date="1700-01-01T00:00:00") == ["Paris", "Versailles"]
+    # Across the antimeridian
+    assert await titles(bbox="179,-20,-179,-15") == ["Fiji"]
+    assert await titles(near="48.8566,2.3522", radius_km=25) == ["Paris", "Versailles"]
+    assert await titles(near="48.8566,2.3522", radius_km=10) == ["Paris"]
+    assert await titles(near="-17.7,-179.95", radius_km=50) == ["Fiji"]
+
+    r = await client.get("/api/v1/events/", params={"near": "48,2"})
+    assert r.status_code == 400
+    r = await client.get("/api/v1/events/", params={"radius_km": 10})
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_radius_filter_uses_great_circle_distance(client, db):
+    era = await seed_events(db, count=0)
+    db.add_all([
+        # 2127 km and 2927 km from (60, 0)
+        Event(title="Near", latitude=70, longitude=40, date=datetime(1800, 1, 1), epoch_id=era.id),
+        Event(title="Far", latitude=80, longitude=60, date=datetime(1900, 1, 1), epoch_id=era.id),
+    ])
+    await db.commit()
+
+    async def titles(radius_km):
+        r = await client.get("/api/v1/events/", params={"near": "60,0", "radius_km": radius_km})
+        assert r.status_code == 200, r.text
+        return [e["title"] for e in r.json()]
+
+    assert await titles(2100) == []
+    assert await titles(2150) == ["Near"]
+    assert await titles(2950) == ["Near", "Far"]
+
+
+@pytest.mark.asyncio
+async def test_batch_get_keeps_request_order_and_marks_missing(client, db):
+    era = await seed_events(db, count=3)
+    science = Category(name="Science")
+    db.add(science)
+    await db.flush()
+    r = await client.get("/api/v1/events/")
+    ids = [e["id"] for e in r.json()]
+
+    r = await client.post("/api/v1/events/batch", json={"ids": [ids[2], 999, ids[0], 999]})
+    assert r.status_code == 200
+    body = r.json()
+    assert [item and item["id"] for item in body["items"]] == [ids[2], None, ids[0], None]
+    assert body["items"][0]["epoch"]["name"] == "Antiquity"
+    assert body["missing"] == [999]
+
+    await db.commit()
+    r = await client.post("/api/v1/categories/batch", json={"ids": [998, science.id]})
+    body = r.json()
+    assert body["items"][0] is None and body["items"][1]["name"] == "Science"
+    assert body["missing"] == [998]
+    r = await client.post("/api/v1/epochs/batch", json={"ids": [era.id]})
+    assert r.json()["items"][0]["name"] == "Antiquity"
+
+    assert (await client.post("/api/v1/events/batch", json={"ids": []})).status_code == 422
+    assert (await client.post("/api/v1/events/batch", json={"ids": list(range(501))})).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_event_endpoints_issue_a_fixed_number_of_queries(client, db, count_queries):
+    era = await seed_events(db, count=20)
+    science, art = Category(name="Science"), Category(name="Art")
+    db.add_all([science, art])
+    await db.commit()
+
+    with count_queries() as statements:
+        r = await client.post("/api/v1/events/", json={
+            "title": "Eclipse", "date": "0150-06-01T00:00:00",
+            "epoch_id": era.id, "category_ids": [science.id, art.id],
+        })
+    assert r.status_code == 200, r.text
+    created = r.json()
+    assert created["epoch"]["name"] == "Antiquity"
+    assert sorted(c["name"] for c in created["categories"]) == ["Art", "Science"]
+    # epoch and categories, table version, event and link inserts, stats
+    # upsert, change log, then the event with its two relationships
+    assert len(statements) == 10, statements
+
+    with count_queries() as statements:
+        r = await client.get(f"/api/v1/events/{created['id']}")
+    assert r.status_code == 200
+    assert r.json()["categories"] == created["categories"]
+    # validator (event row, table versions), then the event with its two relationships
+    assert len(statements) == 5, statements
+
+    for limit in (2, 21):
+        with count_queries() as statements:
+            r = await client.get("/api/v1/events/", params={"limit": limit})
+        assert len(r.json()) == limit
+        # table versions, events, categories, epochs: independent of the page size
+        assert len(statements) == 4, statements
+
+    with count_queries() as statements:
+        r = await client.post("/api/v1/events/batch", json={"ids": [e["id"] for e in r.json()]})
+    assert len(statements) == 3, statements
+
+
+@pytest.mark.asyncio
+async def test_patch_diffs_categories_and_honours_if_match(client, db):
+    era = await seed_events(db, count=0)
+    science, art, music = Category(name="Science"), Category(name="Art"), Category(name="Music")
+    db.add_all([science, art, music])
+    await db.commit()
+    r = await client.post("/api/v1/events/", json={
+        "title": "Concert", "date": "0150-06-01T00:00:00", "epoch_id": era.id,
+        "category_ids": [science.id, art.id], "latitude": 41.9, "longitude": 12.5,
+    })
+    created = r.json()
+    assert created["version"] == 1
+    url = f"/api/v1/events/{created['id']}"
+    etag = (await client.get(url)).headers["ETag"]
+
+    r = await client.patch(url, headers={"If-Match": etag}, json={
+        "title": "Symphony", "category_ids": [art.id, music.id], "latitude": 48.2, "longitude": 16.4,
+    })
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert (body["title"], body["version"], body["description"]) == ("Symphony", 2, None)
+    assert sorted(c["name"] for c in body["categories"]) == ["Art", "Music"]
+    assert r.headers["ETag"] != etag
+    assert (await client.get(url, headers={"If-None-Match": r.headers["ETag"]})).status_code == 304
+
+    # A writer holding the old ETag is refused
+    r = await client.patch(url, headers={"If-Match": etag}, json={"title": "Overwritten"})
+    assert r.status_code == 412
+
+    # The search and spatial indexes follow the update
+    r = await client.get("/api/v1/events/search", params={"q": "symphony"})
+    assert [e["id"] for e in r.json()] == [created["id"]]
+    r = await client.get("/api/v1/events/", params={"bbox": "16,48,17,49"})
+    assert [e["id"] for e in r.json()] == [created["id"]]
+
+    # Sending the current values again is not a write
+    r = await client.patch(url, json={"title": "Symphony", "category_ids": [music.id, art.id]})
+    assert r.json()["version"] == 2
+
+    assert (await client.patch(url, json={"title": None})).status_code == 422
+    assert (await client.patch(url, json={"epoch_id": 999})).status_code == 400
+    assert (await client.patch("/api/v1/events/999", json={"title": "x"})).status_code == 404
+
+    changes = (await client.get("/api/v1/events/changes")).json()["changes"]
+    assert [c["op"] for c in changes] == ["create", "update"]
+
+
+@pytest.mark.asyncio
+async def test_create_reports_unknown_references_and_taken_external_ids(client, db):
+    era = await seed_events(db, count=0)
+    row = {"title": "Bridge", "date": "0150-01-01T00:00:00", "epoch_id": era.id, "external_id": "wiki:1"}
+
+    r = await client.post("/api/v1/events/", json={**row, "epoch_id": 999})
+    assert (r.status_code, r.json()["detail"]) == (400, "Epoch 999 not found")
+    r = await client.post("/api/v1/events/", json={**row, "category_ids": [999]})
+    assert (r.status_code, r.json()["detail"]) == (400, "Categories not found: [999]")
+
+    assert (await client.post("/api/v1/events/", json=row)).status_code == 200
+    r = await client.post("/api/v1/events/", json=row)
+    assert (r.status_code, r.json()["detail"]) == (400, "external_id 'wiki:1' is already in use")
+
+
+@pytest.mark.asyncio
+async def test_upsert_by_external_id_is_idempotent(client, db):
+    from app.db.stats import rebuild_stats
+
+    era = await seed_events(db, count=0)
+    science, art = Category(name="Science"), Category(name="Art")
+    db.add_all([science, art])
+    await db.commit()
+    rows = [
+        {"external_id": "wiki:1", "title": "Bridge", "date": "0150-01-01T00:00:00",
+         "epoch_id": era.id, "category_ids": [science.id]},
+        {"external_id": "wiki:2", "title": "Temple", "date": "0300-01-01T00:00:00",
+         "epoch_id": era.id, "category_ids": [art.id]},
+    ]
+    r = await client.post("/api/v1/events/upsert", json={"events": rows})
+    assert r.status_code == 200, r.text
+    first = r.json()
+    assert (first["created"], first["updated"], first["errors"]) == (2, 0, [])
+
+    r = await client.post("/api/v1/events/upsert", json={"events": rows})
+    assert r.json()["unchanged"] == 2 and r.json()["ids"] == first["ids"]
+
+    rows[0] = {**rows[0], "title": "Stone bridge", "category_ids": [science.id, art.id], "version": 1}
+    r = await client.post("/api/v1/events/upsert", json={"events": rows + [
+        {**rows[1], "external_id": "wiki:3", "epoch_id": 999},
+        rows[0],
+    ]})
+    result = r.json()
+    assert (result["created"], result["updated"], result["unchanged"]) == (0, 1, 1)
+    assert result["ids"] == first["ids"] + [None, None]
+    assert [(e["index"], e["detail"]) for e in result["errors"]] == [
+        (3, "Duplicate external_id in request"), (2, "Epoch 999 not found"),
+    ]
+
+    # Conditioned on a version the event is no longer at
+    r = await client.post("/api/v1/events/upsert", json={"events": [{**rows[0], "title": "Stale"}]})
+    assert r.json()["errors"] == [{"index": 0, "detail": "Version conflict: expected 1, found 2"}]
+
+    r = await client.get(f"/api/v1/events/{first['ids'][0]}")
+    assert (r.json()["title"], r.json()["version"]) == ("Stone bridge", 2)
+    assert len(r.json()["categories"]) == 2
+    assert await rebuild_stats(db, check_only=True) == []
+    changes = (await client.get("/api/v1/events/changes")).json()["changes"]
+    assert [c["op"] for c in changes] == ["create", "create", "update"]
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+from email.utils import format_datetime, parsedate_to_datetime
+
+import pytest
+
+from app.db.models import Epoch
+from app.db.crud import event as crud_event
+from app.schemas.event import EventCreate
+
+
+async def create_epoch(db):
+    era = Epoch(name="Modern", start_date=datetime(1800, 1, 1), end_date=datetime(2000, 1, 1))
+    db.add(era)
+    await db.commit()
+    return era
+
+
+@pytest.mark.asyncio
+async def test_event_list_revalidates_until_a_write(client, db):
+    era = await create_epoch(db)
+    event = {"title": "Flight", "date": "1903-12-17T00:00:00", "epoch_id": era.id}
+    await crud_event.create(db, obj_in=EventCreate(**event))
+
+    r = await client.get("/api/v1/events/", params={"epoch_id": era.id})
+    etag = r.headers["ETag"]
+    assert r.status_code == 200
+    assert "Last-Modified" in r.headers
+
+    r = await client.get("/api/v1/events/", params={"epoch_id": era.id}, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+
+    r = await client.get("/api/v1/events/", headers={"If-None-Match": etag})
+    assert r.status_code == 200, "different filters must not share a validator"
+
+    # Last-Modified drops the sub-second part of the write time, so that
+    # date may precede a second write in the same second: not a match
+    last_modified = parsedate_to_datetime(r.headers["Last-Modified"])
+    r = await client.get(
+        "/api/v1/events/",
+        params={"epoch_id": era.id},
+        headers={"If-Modified-Since": r.headers["Last-Modified"]},
+    )
+    assert r.status_code == 200
+    r = await client.get(
+        "/api/v1/events/",
+        params={"epoch_id": era.id},
+        headers={"If-Modified-Since": format_datetime(last_modified + timedelta(seconds=1), usegmt=True)},
+    )
+    assert r.status_code == 304
+
+    await crud_event.create(db, obj_in=EventCreate(**{**event, "title": "Radio"}))
+    r = await client.get("/api/v1/events/", params={"epoch_id": era.id}, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert len(r.json()) == 2
+
+
+@pytest.mark.asyncio
+async def test_reference_data_validators(client, db):
+    await create_epoch(db)
+    assert (await client.get("/api/v1/events/9999", headers={"If-None-Match": "*"})).status_code == 404
+
+    r = await client.get("/api/v1/epochs/")
+    etag = r.headers["ETag"]
+    assert (await client.get("/api/v1/epochs/", headers={"If-None-Match": etag})).status_code == 304
+    await client.post("/api/v1/epochs/", json={
+        "name": "Future", "start_date": "2000-01-01T00:00:00", "end_date": "3000-01-01T00:00:00",
+    })
+    assert (await client.get("/api/v1/epochs/", headers={"If-None-Match": etag})).status_code == 200
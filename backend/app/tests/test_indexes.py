@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event as sa_event
+
+from app.db.models import Category, Event, Epoch
+
+
+async def query_plans(engine, run):
+    """Run ``run()`` and return the SQLite query plan of every SELECT it issued."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    sa_event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        await run()
+    finally:
+        sa_event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    plans = []
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+            plans.append(" | ".join(row[-1] for row in result.all()))
+    return plans
+
+
+@pytest.mark.asyncio
+async def test_filtered_event_list_uses_indexes(client, db, engine):
+    era = Epoch(name="Modern", start_date=datetime(1800, 1, 1), end_date=datetime(2000, 1, 1))
+    science = Category(name="Science")
+    db.add_all([era, science])
+    await db.flush()
+    db.add(Event(title="Moon landing", date=datetime(1969, 7, 20), epoch_id=era.id, categories=[science]))
+    await db.commit()
+
+    async def run():
+        r = await client.get("/api/v1/events/", params={
+            "epoch_id": era.id,
+            "start_date": "1900-01-01T00:00:00",
+            "end_date": "1999-12-31T00:00:00",
+        })
+        assert r.status_code == 200
+        assert len(r.json()) == 1
+
+    plans = await query_plans(engine, run)
+    list_plan = next(p for p in plans if " events " in p)
+    assert "ix_events_epoch_id_date" in list_plan
+    categories_plan = next(p for p in plans if "event_category" in p)
+    assert "SCAN event_category" not in categories_plan
+    assert "ix_event_category_event_id_category_id" in categories_plan
+
+    async def run_range():
+        r = await client.get("/api/v1/events/", params={"start_date": "1900-01-01T00:00:00"})
+        assert r.status_code == 200
+
+    range_plan = next(p for p in await query_plans(engine, run_range) if " events " in p)
+    assert "ix_events_date_id" in range_plan
@@ -0,0 +1,63 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.layout import LayoutCache, assign_lanes, compute_layout, ms_per_unit, snap_gap, viewport_payload
+
+
+def test_lanes_never_collide_and_use_the_fewest_lanes():
+    import numpy as np
+
+    rng = random.Random(7)
+    x = np.sort(np.array([rng.uniform(0, 50) for _ in range(400)] + [10.0] * 5))
+    lanes = assign_lanes(x, 1.0, max_lanes=1000)
+
+    for lane in set(lanes.tolist()):
+        assert (np.diff(x[lanes == lane]) >= 1.0).all()
+    # The largest set of mutually colliding events needs a lane each
+    crowd = max(int(((x > value - 1.0) & (x <= value)).sum()) for value in x)
+    assert lanes.max() + 1 == crowd
+    # A sparse chain alternates between two lanes instead of piling up
+    assert assign_lanes(np.arange(6) * 0.9, 1.0, 64).tolist() == [0, 1, 0, 1, 0, 1]
+    assert assign_lanes(np.zeros(5), 1.0, 2).tolist() == [0, 1, 0, 1, 0]
+
+
+def test_layout_is_date_proportional_and_viewport_independent():
+    base = datetime(1900, 1, 1)
+    dates = [base, base + timedelta(days=1), base + timedelta(days=3650)]
+    layout = compute_layout([1, 2, 3], dates, zoom=10)
+
+    assert layout.x[2] - layout.x[0] == pytest.approx(timedelta(days=3650) / timedelta(milliseconds=1) / ms_per_unit(10))
+    # One day apart is far below one unit at zoom 10: the first two share the axis position
+    assert layout.lanes.tolist() == [0, 1, 0]
+    assert (layout.y[0], layout.z[0]) == (0, 0) and (layout.y[1], layout.z[1]) != (0, 0)
+
+    window = viewport_payload(layout, int(layout.dates[1]), None)
+    assert window["ids"] == [2, 3] and window["total"] == 3
+    assert window["x"] == layout.x[1:].tolist()
+    assert viewport_payload(compute_layout([], [], zoom=0))["count"] == 0
+
+
+def _layout(count):
+    return compute_layout(list(range(count)), [datetime(2000, 1, 1)] * count, zoom=0)
+
+
+def test_layout_cache_evicts_least_recently_used_by_event_count():
+    cache = LayoutCache(max_events=5)
+    a, b, c = _layout(2), _layout(2), _layout(3)
+    cache.put("a", a)
+    cache.put("b", b)
+    assert cache.get("a") is a
+    # Five events at most: the least recently used layout makes room
+    cache.put("c", c)
+    assert cache.get("b") is None and cache.get("c") is c
+    assert cache.stats() == {"hits": 2, "misses": 1, "size": 2, "events": 5}
+    # Too large on its own: served but not cached
+    cache.put("d", _layout(6))
+    assert cache.get("d") is None and cache.stats()["events"] == 5
+
+
+def test_gap_snaps_to_a_power_of_two():
+    assert [snap_gap(gap) for gap in (1.0, 1.3, 1.5, 0.3, 1000)] == [1.0, 1.0, 2.0, 0.25, 1024.0]
+    assert snap_gap(1e-9) == 2.0 ** -6
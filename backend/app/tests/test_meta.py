@@ -12,3 +12,70 @@ async def test_health_endpoint():
         r = await ac.get("/health")
     assert r.status_code == 200
     assert r.json().get("status") == "ok"
+
+
+@pytest.mark.asyncio
+async def test_db_diagnostics_reports_pool_statistics():
+    from app.app_main import app
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.get("/diagnostics/db")
+    assert r.status_code == 200
+    pool = r.json()["pool"]
+    assert pool["class"] == "InstrumentedAsyncQueuePool"
+    assert {"checked_out", "overflow", "waits"} <= pool.keys()
+
+
+@pytest.mark.asyncio
+async def test_metrics_report_route_latency_and_sql(client):
+    from app.core.metrics import metrics
+
+    metrics.clear()
+    for _ in range(2):
+        assert (await client.get("/api/v1/events/", params={"limit": 5})).status_code == 200
+    assert (await client.get("/api/v1/events/12345")).status_code == 404
+
+    r = await client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = r.text.splitlines()
+    list_labels = 'method="GET",route="/api/v1/events/"'
+    assert f'chronospace_http_requests_total{{{list_labels},status="200"}} 2' in lines
+    assert 'chronospace_http_requests_total{method="GET",route="/api/v1/events/{event_id}",status="404"} 1' in lines
+    assert f'chronospace_http_request_duration_seconds_count{{{list_labels}}} 2' in lines
+    # Two statements per list request: the table versions and the (empty) page
+    assert f'chronospace_db_statements_per_request_sum{{{list_labels}}} 4.0' in lines
+    assert "chronospace_http_requests_in_flight 1" in lines
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header_and_slow_request_log(engine, caplog):
+    from fastapi import FastAPI
+    from sqlalchemy import text
+
+    from app.core.metrics import Metrics, MetricsMiddleware
+
+    app = FastAPI()
+    registry = Metrics()
+    app.add_middleware(MetricsMiddleware, registry=registry, server_timing=True, slow_request_seconds=0)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await conn.execute(text("SELECT :id"), {"id": item_id})
+        return {"id": item_id}
+
+    transport = ASGITransport(app=app)
+    with caplog.at_level("WARNING", logger="chronospace.slow_requests"):
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            r = await ac.get("/items/7?verbose=1")
+    assert r.json() == {"id": 7}
+    assert 'db;dur=' in r.headers["server-timing"]
+    assert 'desc="2 statements"' in r.headers["server-timing"]
+    assert registry.requests == {("GET", "/items/{item_id}", 200): 1}
+
+    message = caplog.records[-1].getMessage()
+    assert message.startswith("slow request GET /items/7?verbose=1 -> 200")
+    assert "SELECT ?" in message
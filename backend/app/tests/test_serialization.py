@@ -0,0 +1,22 @@
+import json
+
+from app.benchmarks.serialization import fast_path, make_events, response_model_path
+from app.core.serialization import EventEncoder
+
+
+def test_fast_path_matches_response_model_output():
+    events = make_events(50)
+    events[3].latitude = events[3].longitude = None
+    events[4].categories = []
+    fast, slow = json.loads(fast_path(events)), json.loads(response_model_path(events))
+    assert fast == slow
+    # Same field order, so clients diffing raw bodies see no change either
+    assert list(fast[0]) == list(slow[0])
+    assert list(fast[0]["epoch"]) == list(slow[0]["epoch"])
+
+
+def test_shared_epochs_and_categories_are_encoded_once():
+    events = make_events(30)
+    payloads = EventEncoder().events(events + [None])
+    assert payloads[-1] is None
+    assert payloads[0]["epoch"] is payloads[10]["epoch"]
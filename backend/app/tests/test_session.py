@@ -0,0 +1,159 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app.core.config import Settings
+from app.db.session import READ_YOUR_WRITES_COOKIE, DatabaseRouter, ReplicaPool, build_engine
+
+
+def test_profiles_fill_unset_settings_only():
+    production = Settings(ENVIRONMENT="production")
+    assert production.DB_ECHO is False
+    assert production.DB_POOL_SIZE == 20
+    assert Settings(ENVIRONMENT="production", DB_POOL_SIZE=3).DB_POOL_SIZE == 3
+    assert Settings(ENVIRONMENT="development").DB_ECHO is False
+
+
+@pytest.mark.asyncio
+async def test_sqlite_wal_pragmas(tmp_path):
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'wal.db'}", Settings(ENVIRONMENT="production"))
+    async with engine.connect() as conn:
+        assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+        assert (await conn.execute(text("PRAGMA synchronous"))).scalar() == 1
+        assert (await conn.execute(text("PRAGMA foreign_keys"))).scalar() == 1
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pool_counts_waits_when_exhausted(tmp_path):
+    config = Settings(ENVIRONMENT="test", DB_POOL_SIZE=1, DB_MAX_OVERFLOW=0)
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", config)
+    held = await engine.connect()
+
+    async def checkout():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    waiter = asyncio.create_task(checkout())
+    await asyncio.sleep(0.05)
+    assert engine.pool.checkedout() == 1
+    await held.close()
+    await waiter
+    assert engine.pool.waits == 1
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pool_with_unbounded_overflow_never_counts_waits(tmp_path):
+    config = Settings(ENVIRONMENT="test", DB_POOL_SIZE=1, DB_MAX_OVERFLOW=-1)
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", config)
+    held = [await engine.connect() for _ in range(3)]
+    assert engine.pool.checkedout() == 3
+    assert engine.pool.waits == 0 and engine.pool.wait_seconds == 0.0
+    for conn in held:
+        await conn.close()
+    await engine.dispose()
+
+
+def test_replica_pool_round_robin_skips_replicas_marked_down():
+    first, second = object(), object()
+    pool = ReplicaPool([first, second], retry_after=60)
+    assert pool.candidates() == [first, second]
+    assert pool.candidates() == [second, first]
+    pool.mark_down(first)
+    assert pool.candidates() == [second]
+    assert pool.candidates() == [second]
+
+
+@pytest.mark.asyncio
+async def test_reads_use_a_replica_until_the_client_writes(tmp_path):
+    from httpx import ASGITransport, AsyncClient
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    from app.app_main import app
+    from app.db.base import Base
+    from app.db.models import Epoch, Event
+    from app.db.session import get_db, get_read_db, read_your_writes
+
+    primary = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    unreachable = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    # The replica holds what was replicated so far; later writes only reach the primary
+    for engine in (primary, replica):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, class_=AsyncSession)() as session:
+            session.add(Epoch(id=1, name="Antiquity", start_date=datetime(1, 1, 1), end_date=datetime(500, 1, 1)))
+            session.add(Event(title="Replicated", date=datetime(100, 1, 1), epoch_id=1))
+            await session.commit()
+
+    router = DatabaseRouter(primary, [unreachable, replica], read_your_writes=60, retry_after=60)
+
+    async def primary_session():
+        async with router.primary_sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = primary_session
+    app.dependency_overrides[get_read_db] = router.read_session
+    app.dependency_overrides[read_your_writes] = router.start_read_your_writes
+    transport = ASGITransport(app=app)
+    try:
+        async with AsyncClient(transport=transport, base_url="http://test") as writer, \
+                AsyncClient(transport=transport, base_url="http://test") as reader:
+            r = await writer.post("/api/v1/events/", json={
+                "title": "Fresh", "date": "0200-01-01T00:00:00", "epoch_id": 1,
+            })
+            assert r.status_code == 200 and READ_YOUR_WRITES_COOKIE in r.cookies
+
+            # The writer sees its write; everyone else reads the lagging replica
+            r = await writer.get("/api/v1/events/")
+            assert [e["title"] for e in r.json()] == ["Replicated", "Fresh"]
+            r = await reader.get("/api/v1/events/")
+            assert [e["title"] for e in r.json()] == ["Replicated"]
+            assert READ_YOUR_WRITES_COOKIE not in r.cookies
+
+            # Batch lookups are POSTs but only read: they do not pin the client
+            for path in ("/api/v1/events/batch", "/api/v1/categories/batch", "/api/v1/epochs/batch"):
+                r = await reader.post(path, json={"ids": [1]})
+                assert r.status_code == 200 and READ_YOUR_WRITES_COOKIE not in r.cookies
+            r = await reader.get("/api/v1/events/")
+            assert [e["title"] for e in r.json()] == ["Replicated"]
+    finally:
+        app.dependency_overrides.clear()
+
+    # The unreachable replica was skipped and marked down
+    assert [status["up"] for status in await router.replicas.check()] == [False, True]
+    for engine in (primary, replica, unreachable):
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_and_prepares_pooled_connections(tmp_path):
+    from sqlalchemy.pool import StaticPool
+
+    from app.db.base import Base
+
+    primary = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    unreachable = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    memory = build_engine("sqlite+aiosqlite:///:memory:")
+    async with primary.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    prepared = []
+
+    async def prepare(session):
+        prepared.append((await session.execute(text("SELECT count(*) FROM events"))).scalar())
+
+    router = DatabaseRouter(primary, [unreachable], retry_after=60)
+    await router.warm_up(2, prepare)
+    # Both connections were open at once, so the pool now holds two
+    assert prepared == [0, 0]
+    assert primary.pool.checkedin() == 2
+    assert router.replicas.candidates() == []
+
+    # A single shared in-memory connection is warmed once
+    assert isinstance(memory.pool, StaticPool)
+    await DatabaseRouter(memory).warm_up(4)
+    for engine in (primary, unreachable, memory):
+        await engine.dispose()
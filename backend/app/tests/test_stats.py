@@ -0,0 +1,168 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import update
+
+from app.db import crud
+from app.db.models import Category, Epoch, Event, EventStats
+from app.db.stats import rebuild_stats
+from app.schemas.event import EventCreate
+
+
+async def _seed_reference(db):
+    era = Epoch(name="Antiquity", start_date=datetime(1, 1, 1), end_date=datetime(500, 1, 1))
+    science, art = Category(name="Science"), Category(name="Art")
+    db.add_all([era, science, art])
+    await db.commit()
+    return era, science, art
+
+
+@pytest.mark.asyncio
+async def test_stats_follow_creates_bulk_loads_and_deletes(client, db):
+    era, science, art = await _seed_reference(db)
+    first = await crud.event.create(db, obj_in=EventCreate(
+        title="Founding", date=datetime(100, 1, 1), importance=5,
+        epoch_id=era.id, category_ids=[science.id]
+    ))
+    await crud.event.create_bulk(db, rows=[
+        {"title": "Bridge", "date": "0150-01-01T00:00:00", "importance": 2,
+         "epoch_id": era.id, "category_ids": [science.id, art.id]},
+        {"title": "Temple", "date": "0300-01-01T00:00:00", "importance": 2,
+         "epoch_id": era.id, "category_ids": [art.id]},
+    ])
+
+    r = await client.get(f"/api/v1/epochs/{era.id}/stats")
+    assert r.status_code == 200
+    assert r.json() == {
+        "id": era.id, "event_count": 3,
+        "first_date": "0100-01-01T00:00:00", "last_date": "0300-01-01T00:00:00",
+        "importance": {"1": 0, "2": 2, "3": 0, "4": 0, "5": 1},
+    }
+
+    # Deleting the earliest event moves the lower bounds
+    assert await crud.event.delete(db, id=first.id)
+    r = await client.get("/api/v1/categories/stats")
+    by_name = {
+        name: body for name, body in zip(["Science", "Art"], r.json())
+    }
+    assert by_name["Science"]["event_count"] == 1
+    assert by_name["Science"]["first_date"] == "0150-01-01T00:00:00"
+    assert by_name["Science"]["importance"]["5"] == 0
+    assert by_name["Art"]["event_count"] == 2
+    assert by_name["Art"]["last_date"] == "0300-01-01T00:00:00"
+
+    assert await rebuild_stats(db, check_only=True) == []
+    assert (await client.get("/api/v1/epochs/999/stats")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_rebuild_reports_and_repairs_drift(client, db):
+    era, science, _ = await _seed_reference(db)
+    await crud.event.create(db, obj_in=EventCreate(
+        title="Founding", date=datetime(100, 1, 1), epoch_id=era.id, category_ids=[science.id]
+    ))
+    await db.execute(update(EventStats).where(EventStats.scope == "epoch").values(event_count=7))
+    await db.commit()
+
+    problems = await rebuild_stats(db, check_only=True)
+    assert problems == [f"epoch {era.id}: event_count 7 != 1"]
+    assert (await client.get(f"/api/v1/epochs/{era.id}/stats")).json()["event_count"] == 7
+
+    assert await rebuild_stats(db) == problems
+    assert await rebuild_stats(db, check_only=True) == []
+    assert (await client.get(f"/api/v1/epochs/{era.id}/stats")).json()["event_count"] == 1
+
+    # A category without events reports zeros
+    await crud.category.delete(db, id=science.id)
+    r = await client.get("/api/v1/categories/stats")
+    assert [(c["event_count"], c["first_date"]) for c in r.json()] == [(0, None)]
+
+
+async def _seed_events(db, era, count, category_ids):
+    await crud.event.create_bulk(db, rows=[
+        {"title": f"Event {i}", "date": f"{100 + i:04d}-01-01T00:00:00", "importance": i % 5 + 1,
+         "epoch_id": era.id, "category_ids": category_ids}
+        for i in range(count)
+    ])
+
+
+@pytest.mark.asyncio
+async def test_range_delete_is_set_based_and_keeps_stats_consistent(client, db, count_queries):
+    era, science, art = await _seed_reference(db)
+    later = Epoch(name="Middle Ages", start_date=datetime(500, 1, 1), end_date=datetime(1500, 1, 1))
+    db.add(later)
+    await db.commit()
+    await _seed_events(db, era, 30, [science.id, art.id])
+    await _seed_events(db, later, 5, [science.id])
+    last_seq = (await client.get("/api/v1/events/changes")).json()["last_seq"]
+
+    assert (await client.delete("/api/v1/events/")).status_code == 400
+
+    counts = []
+    for before, expected in (("0102-01-01T00:00:00", 2), ("0120-01-01T00:00:00", 18)):
+        with count_queries() as statements:
+            r = await client.delete("/api/v1/events/", params={"epoch_id": era.id, "before": before})
+        assert r.status_code == 200, r.text
+        assert r.json() == {"status": "success", "deleted": expected}
+        counts.append(len(statements))
+    # The statements do not depend on how many events match
+    assert counts[0] == counts[1]
+
+    r = await client.get(f"/api/v1/epochs/{era.id}/stats")
+    assert r.json()["event_count"] == 10
+    assert r.json()["first_date"] == "0120-01-01T00:00:00"
+    assert await rebuild_stats(db, check_only=True) == []
+
+    changes = (await client.get("/api/v1/events/changes", params={"since": last_seq})).json()["changes"]
+    assert [c["op"] for c in changes] == ["delete"] * 20
+    assert [c["seq"] for c in changes] == sorted(c["seq"] for c in changes)
+
+    # Nothing matches any more: no writes at all
+    r = await client.delete("/api/v1/events/", params={"epoch_id": era.id, "before": "0110-01-01T00:00:00"})
+    assert r.json()["deleted"] == 0
+
+
+@pytest.mark.asyncio
+async def test_epoch_and_category_deletes_take_their_events_along(client, db):
+    era, science, art = await _seed_reference(db)
+    await _seed_events(db, era, 4, [science.id, art.id])
+
+    # Category links go with the category; the events stay
+    assert (await client.delete(f"/api/v1/categories/{science.id}")).status_code == 200
+    r = await client.get("/api/v1/events/")
+    assert [[c["name"] for c in e["categories"]] for e in r.json()] == [["Art"]] * 4
+    assert await rebuild_stats(db, check_only=True) == []
+    # Their payload changed, so followers of the change log hear about it
+    changes = (await client.get("/api/v1/events/changes")).json()["changes"]
+    updated = [c["event_id"] for c in changes if c["op"] == "update"]
+    assert updated == [e["id"] for e in r.json()]
+
+    r = await client.delete(f"/api/v1/epochs/{era.id}")
+    assert r.status_code == 409
+    assert len((await client.get("/api/v1/events/")).json()) == 4
+
+    r = await client.delete(f"/api/v1/epochs/{era.id}", params={"cascade": True})
+    assert r.json() == {"status": "success", "deleted_events": 4}
+    assert (await client.get("/api/v1/events/")).json() == []
+    assert (await client.get(f"/api/v1/epochs/{era.id}")).status_code == 404
+    assert (await client.get("/api/v1/categories/stats")).json()[0]["event_count"] == 0
+    assert await rebuild_stats(db, check_only=True) == []
+    assert (await client.delete(f"/api/v1/epochs/{era.id}")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_epoch_delete_racing_an_event_insert_is_a_conflict(client, db, monkeypatch):
+    era, _, _ = await _seed_reference(db)
+    touch_tables = crud.touch_tables
+
+    async def touch_after_insert(session, *tables):
+        # An event lands in the epoch between the emptiness check and the delete
+        session.add(Event(title="Late", date=datetime(100, 1, 1), epoch_id=era.id))
+        await session.flush()
+        await touch_tables(session, *tables)
+
+    monkeypatch.setattr(crud, "touch_tables", touch_after_insert)
+    r = await client.delete(f"/api/v1/epochs/{era.id}")
+    monkeypatch.undo()
+    assert r.status_code == 409, r.text
+    assert (await client.get(f"/api/v1/epochs/{era.id}")).status_code == 200